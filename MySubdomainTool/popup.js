@@ -1,16 +1,46 @@
+// Daemon cục bộ (scan_daemon.py): gộp các lần quét trùng domain, trả kết quả đã cache
+const DAEMON_URL = 'http://127.0.0.1:8787';
+// Token của daemon, gửi kèm mọi request: dán token mà scan_daemon.py in ra khi khởi động
+// (lưu ở ~/.cache/subdomainfinder/daemon.token). Để trống thì không dùng daemon.
+const DAEMON_TOKEN = '';
+
+// Bảng ảo: chỉ tạo DOM cho các dòng đang nhìn thấy, thêm OVERSCAN dòng đệm mỗi phía.
+// ROW_HEIGHT phải khớp với chiều cao dòng trong popup.html.
+const ROW_HEIGHT = 30;
+const OVERSCAN = 10;
+// Số request kiểm tra cloud chạy cùng lúc
+const MAX_PROBES = 6;
+const PROBE_TIMEOUT_MS = 5000;
+// Kết quả kiểm tra được lưu trong storage, hết hạn sau 6 giờ
+const VERDICT_TTL_MS = 6 * 60 * 60 * 1000;
+const MAX_VERDICTS = 20000;
+
 document.addEventListener('DOMContentLoaded', () => {
     const scanBtn = document.getElementById('scanBtn');
     const copyBtn = document.getElementById('copyBtn');
     const clearBtn = document.getElementById('clearBtn');
     const domainInput = document.getElementById('domainInput');
     const status = document.getElementById('status');
+    const tableWrap = document.getElementById('tableWrap');
     const tbody = document.querySelector('#resultTable tbody');
 
+    let subs = [];            // toàn bộ kết quả, theo thứ tự hiển thị
+    let verdicts = {};        // host -> [chữ hiển thị, class, thời điểm kiểm tra]
+    let probeAll = false;     // true: kiểm tra cả các dòng chưa cuộn tới (sau một lần quét mới)
+    let backgroundIndex = 0;  // vị trí kế tiếp cần kiểm tra khi probeAll
+    const inFlight = new Set();
+    let renderPending = false;
+    let saveTimer = null;
+
+    tableWrap.addEventListener('scroll', scheduleRender);
+
     // 1. KHI MỞ EXTENSION: TỰ ĐỘNG LẤY DỮ LIỆU CŨ RA
-    chrome.storage.local.get(['savedResults', 'savedDomain'], (result) => {
+    chrome.storage.local.get(['savedResults', 'savedDomain', 'probeVerdicts'], (result) => {
+        verdicts = freshVerdicts(result.probeVerdicts || {});
         if (result.savedResults && result.savedResults.length > 0) {
             domainInput.value = result.savedDomain || "";
-            renderTable(result.savedResults, false); // false = không check lại cloud ngay để đỡ lag
+            // false = chỉ kiểm tra các dòng đang nhìn thấy mà chưa có kết quả còn hạn
+            showResults(result.savedResults, false);
             status.innerText = `Đã khôi phục ${result.savedResults.length} kết quả cũ.`;
             copyBtn.disabled = false;
             clearBtn.style.display = 'block';
@@ -22,9 +52,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // 3. NÚT COPY
     copyBtn.addEventListener('click', async () => {
-        const links = tbody.querySelectorAll('tr td:first-child a');
-        if (links.length === 0) return;
-        const textToCopy = Array.from(links).map(link => link.innerText).join('\n');
+        if (subs.length === 0) return;
+        const textToCopy = subs.join('\n');
         await navigator.clipboard.writeText(textToCopy);
         const originalText = copyBtn.innerText;
         copyBtn.innerText = "✅ Đã Copy!";
@@ -34,7 +63,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // 4. NÚT XÓA (MỚI)
     clearBtn.addEventListener('click', () => {
         chrome.storage.local.remove(['savedResults', 'savedDomain']); // Xóa trong kho
-        tbody.innerHTML = ''; // Xóa giao diện
+        showResults([], false); // Xóa giao diện
         domainInput.value = '';
         status.innerText = "Sẵn sàng";
         copyBtn.disabled = true;
@@ -53,23 +82,28 @@ document.addEventListener('DOMContentLoaded', () => {
         copyBtn.disabled = true;
         clearBtn.style.display = 'none';
         scanBtn.innerText = "⏳...";
-        tbody.innerHTML = '';
+        showResults([], true);
         status.innerText = `Đang kết nối...`;
 
         // Xóa dữ liệu cũ trước khi scan mới
         chrome.storage.local.remove(['savedResults', 'savedDomain']);
 
         try {
-            const [hackertarget, crtsh, otx] = await Promise.all([
-                fetchHackerTarget(domain),
-                fetchCrtSh(domain),
-                fetchOtx(domain)
-            ]);
-
-            const allSubs = new Set([...hackertarget, ...crtsh, ...otx]);
-            const finalSubs = Array.from(allSubs)
-                .filter(s => s.includes('.') && !s.startsWith('.'))
-                .sort();
+            let finalSubs = await scanViaDaemon(domain);
+            if (finalSubs === null) {
+                // Không có daemon: tự gọi các nguồn như trước
+                status.innerText = `Đang quét trực tiếp...`;
+                const [hackertarget, crtsh, otx] = await Promise.all([
+                    fetchHackerTarget(domain),
+                    fetchCrtSh(domain),
+                    fetchOtx(domain)
+                ]);
+                const allSubs = new Set([...hackertarget, ...crtsh, ...otx]);
+                finalSubs = Array.from(allSubs)
+                    .filter(s => s.includes('.') && !s.startsWith('.'))
+                    .sort();
+            }
+            showResults(finalSubs, true); // true = kiểm tra cloud cho mọi dòng, ưu tiên dòng đang nhìn thấy
 
             if (finalSubs.length === 0) {
                 status.innerText = "Không tìm thấy kết quả nào.";
@@ -83,9 +117,6 @@ document.addEventListener('DOMContentLoaded', () => {
                 savedDomain: domain
             });
 
-            // Hiển thị ra bảng
-            renderTable(finalSubs, true); // true = check cloud ngay
-
             status.innerText = `Tìm thấy ${finalSubs.length} kết quả.`;
             copyBtn.disabled = false;
             clearBtn.style.display = 'block';
@@ -98,31 +129,180 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // Hàm hiển thị bảng (Tách ra để dùng lại lúc khôi phục)
-    function renderTable(subdomains, checkCloudNow) {
-        tbody.innerHTML = ''; // Reset bảng cũ nếu có
-        for (const sub of subdomains) {
-            const row = tbody.insertRow();
-            const cellName = row.insertCell(0);
-            const cellCloud = row.insertCell(1);
-            cellCloud.className = "status-cell";
-
-            const link = document.createElement('a');
-            link.href = `http://${sub}`;
-            link.target = '_blank';
-            link.innerText = sub;
-            cellName.appendChild(link);
-
-            if (checkCloudNow) {
-                cellCloud.innerText = "⏳";
-                detectCloud(sub, cellCloud);
-            } else {
-                // Nếu là khôi phục từ storage thì chưa check vội cho đỡ lag
-                cellCloud.innerText = "-"; 
-                // Nếu muốn check lại khi khôi phục, bỏ comment dòng dưới:
-                detectCloud(sub, cellCloud); 
+    // Quét qua daemon, hiển thị từng đợt kết quả ngay khi nhận được.
+    // Trả về null nếu daemon không chạy hoặc chưa đặt DAEMON_TOKEN.
+    async function scanViaDaemon(domain) {
+        if (!DAEMON_TOKEN) return null;
+        let res;
+        try {
+            res = await fetch(`${DAEMON_URL}/scan?domain=${encodeURIComponent(domain)}`, {
+                headers: { 'X-SubdomainFinder': DAEMON_TOKEN }
+            });
+        } catch {
+            return null;
+        }
+        if (!res.ok) {
+            const body = await res.json().catch(() => ({}));
+            throw new Error(body.error || `daemon HTTP ${res.status}`);
+        }
+        const found = [];
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let finished = false;
+        while (!finished) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffer.split('\n');
+            buffer = done ? '' : lines.pop();
+            for (const line of lines) {
+                if (!line) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'start') {
+                    status.innerText = event.cached ? `Đang tải kết quả đã lưu...`
+                        : event.joined ? `Đang theo dõi lần quét đang chạy...` : `Đang quét...`;
+                } else if (event.type === 'hosts') {
+                    // Thêm ngay vào bảng; startScan thay bảng bằng danh sách đã sắp xếp khi quét xong
+                    const batch = event.hosts.map(([host]) => host);
+                    found.push(...batch);
+                    addResults(batch);
+                    status.innerText = `Đang quét... ${found.length} kết quả`;
+                } else if (event.type === 'error') {
+                    throw new Error(event.error);
+                } else if (event.type === 'done') {
+                    finished = true;
+                }
             }
+            if (done) break;
+        }
+        return found.sort();
+    }
+
+    // Hàm hiển thị bảng (Tách ra để dùng lại lúc khôi phục)
+    function showResults(list, checkAll) {
+        subs = list.slice();
+        probeAll = checkAll;
+        backgroundIndex = 0;
+        scheduleRender();
+    }
+
+    function addResults(list) {
+        subs.push(...list);
+        scheduleRender();
+    }
+
+    function scheduleRender() {
+        if (renderPending) return;
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            renderRows();
+        });
+    }
+
+    function visibleRange() {
+        const first = Math.max(0, Math.floor(tableWrap.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        const last = Math.min(subs.length,
+            Math.ceil((tableWrap.scrollTop + tableWrap.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        return [first, last];
+    }
+
+    // Hai dòng đệm trên/dưới giữ chiều cao thật của bảng để thanh cuộn đúng
+    function renderRows() {
+        const [first, last] = visibleRange();
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(spacerRow(first * ROW_HEIGHT));
+        for (let i = first; i < last; i++) {
+            fragment.appendChild(resultRow(subs[i]));
+        }
+        fragment.appendChild(spacerRow(Math.max(0, subs.length - last) * ROW_HEIGHT));
+        tbody.replaceChildren(fragment);
+        pumpProbes();
+    }
+
+    function spacerRow(height) {
+        const row = document.createElement('tr');
+        row.className = 'spacer';
+        const cell = document.createElement('td');
+        cell.colSpan = 2;
+        cell.style.height = `${height}px`;
+        row.appendChild(cell);
+        return row;
+    }
+
+    function resultRow(sub) {
+        const row = document.createElement('tr');
+        row.dataset.host = sub;
+        const cellName = document.createElement('td');
+        const cellCloud = document.createElement('td');
+
+        const link = document.createElement('a');
+        link.href = `http://${sub}`;
+        link.target = '_blank';
+        link.innerText = sub;
+        cellName.appendChild(link);
+
+        showVerdict(cellCloud, sub);
+        row.appendChild(cellName);
+        row.appendChild(cellCloud);
+        return row;
+    }
+
+    function showVerdict(cell, sub) {
+        const verdict = verdicts[sub];
+        if (isFresh(verdict)) {
+            cell.innerText = verdict[0];
+            cell.className = verdict[1];
+        } else {
+            // Dòng đang hiển thị luôn được đưa vào hàng đợi kiểm tra
+            cell.innerText = "⏳";
+            cell.className = "status-cell";
+        }
+    }
+
+    // Hàng đợi kiểm tra: tối đa MAX_PROBES request, dòng đang nhìn thấy được kiểm tra trước
+    function pumpProbes() {
+        while (inFlight.size < MAX_PROBES) {
+            const sub = nextProbe();
+            if (sub === null) return;
+            inFlight.add(sub);
+            detectCloud(sub).then(([text, className]) => {
+                inFlight.delete(sub);
+                verdicts[sub] = [text, className, Date.now()];
+                scheduleSave();
+                for (const row of tbody.children) {
+                    if (row.dataset.host === sub) showVerdict(row.lastChild, sub);
+                }
+                pumpProbes();
+            });
+        }
+    }
+
+    function nextProbe() {
+        const [first, last] = visibleRange();
+        for (let i = first; i < last; i++) {
+            if (needsProbe(subs[i])) return subs[i];
         }
+        if (!probeAll) return null;
+        while (backgroundIndex < subs.length) {
+            const sub = subs[backgroundIndex++];
+            if (needsProbe(sub)) return sub;
+        }
+        return null;
+    }
+
+    function needsProbe(sub) {
+        return !inFlight.has(sub) && !isFresh(verdicts[sub]);
+    }
+
+    // Gom nhiều kết quả kiểm tra vào một lần ghi storage
+    function scheduleSave() {
+        if (saveTimer) return;
+        saveTimer = setTimeout(() => {
+            saveTimer = null;
+            verdicts = freshVerdicts(verdicts);
+            chrome.storage.local.set({ probeVerdicts: verdicts });
+        }, 1000);
     }
 
     function resetButtons() {
@@ -155,24 +335,41 @@ async function fetchOtx(domain) {
     } catch { return []; }
 }
 
-async function detectCloud(subdomain, cellElement) {
+function isFresh(verdict) {
+    return Boolean(verdict) && Date.now() - verdict[2] < VERDICT_TTL_MS;
+}
+
+// Bỏ kết quả hết hạn; nếu quá MAX_VERDICTS thì giữ những kết quả mới nhất
+function freshVerdicts(all) {
+    let entries = Object.entries(all).filter(([, verdict]) => isFresh(verdict));
+    if (entries.length > MAX_VERDICTS) {
+        entries.sort((a, b) => b[1][2] - a[1][2]);
+        entries = entries.slice(0, MAX_VERDICTS);
+    }
+    return Object.fromEntries(entries);
+}
+
+// Trả về [chữ hiển thị, class] cho cột Server / Cloud
+async function detectCloud(subdomain) {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), PROBE_TIMEOUT_MS);
     try {
-        const controller = new AbortController();
-        setTimeout(() => controller.abort(), 5000);
         const res = await fetch(`http://${subdomain}`, { method: 'HEAD', signal: controller.signal, mode: 'no-cors' });
         
         const server = (res.headers.get('server') || '').toLowerCase();
         
         if (server.includes('cloudflare')) {
-            cellElement.innerText = "Cloudflare"; cellElement.className = "cloudflare";
+            return ["Cloudflare", "cloudflare"];
         } else if (server.includes('cloudfront') || server.includes('amazon')) {
-            cellElement.innerText = "AWS"; cellElement.className = "aws";
+            return ["AWS", "aws"];
         } else if (server) {
-            cellElement.innerText = server.length > 15 ? server.substring(0, 15) + '...' : server;
+            return [server.length > 15 ? server.substring(0, 15) + '...' : server, "status-cell"];
         } else {
-            cellElement.innerText = "Online";
+            return ["Online", "status-cell"];
         }
     } catch (e) {
-        cellElement.innerText = "Unreachable";
+        return ["Unreachable", "status-cell"];
+    } finally {
+        clearTimeout(timer);
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,85 @@
+# benchmarks/bench_clean.py
+# Usage:
+#   python benchmarks/bench_clean.py [millions_of_candidates]
+#
+# Compares the per-candidate regex validation the cleaners used to do with the
+# shared precompiled SubdomainValidator on a synthetic crt.sh-like dump.
+
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from subdomainfinder.utils import validator_for
+
+DOMAIN = "example.com"
+
+def legacy_is_valid_subdomain(subdomain, base_domain):
+    if not subdomain or '*' in subdomain:
+        return False
+    if '@' in subdomain:
+        return False
+    if not subdomain.endswith(base_domain):
+        return False
+    if subdomain == base_domain:
+        return False
+    subdomain_pattern = f"^[a-zA-Z0-9][-a-zA-Z0-9]*[a-zA-Z0-9]\\.{base_domain}$"
+    return bool(re.match(subdomain_pattern, subdomain))
+
+def legacy_clean(subdomains, base_domain):
+    valid = {
+        s.lower() for s in subdomains
+        if is_str(s) and legacy_is_valid_subdomain(s.lower(), base_domain)
+    }
+    return sorted(valid)
+
+def is_str(s):
+    return isinstance(s, str)
+
+def make_candidates(n, seed=1, repeat=8):
+    # crt.sh repeats each name once per certificate: draw n candidates from a
+    # pool of n / repeat distinct strings
+    rnd = random.Random(seed)
+    labels = ["".join(rnd.choices(string.ascii_lowercase + string.digits, k=rnd.randint(3, 12)))
+              for _ in range(max(1000, n // 20))]
+    pool = []
+    for _ in range(max(1, n // repeat)):
+        r = rnd.random()
+        host = f"{rnd.choice(labels)}.{DOMAIN}"
+        if r < 0.15:
+            host = f"{rnd.choice(labels)}.{host}"
+        elif r < 0.20:
+            host = f"*.{host}"
+        elif r < 0.23:
+            host = f"admin@{host}"
+        elif r < 0.26:
+            host = f"{rnd.choice(labels)}.evil{DOMAIN}"
+        elif r < 0.36:
+            host = host.upper()
+        elif r < 0.46:
+            host = f"{host}\n{rnd.choice(labels)}.{DOMAIN}"
+        pool.append(host)
+    return [rnd.choice(pool) for _ in range(n)]
+
+def bench(name, func, candidates):
+    start = time.perf_counter()
+    result = func(candidates, DOMAIN)
+    elapsed = time.perf_counter() - start
+    rate = len(candidates) / elapsed / 1e6
+    print(f"{name:<28} {elapsed:8.3f}s  {rate:6.2f} M candidates/s  {len(result)} kept")
+    return elapsed
+
+def main():
+    millions = float(sys.argv[1]) if len(sys.argv) >= 2 else 2
+    candidates = make_candidates(int(millions * 1_000_000))
+    print(f"[+] {len(candidates)} synthetic candidates for {DOMAIN}")
+    legacy = bench("legacy is_valid_subdomain", legacy_clean, candidates)
+    shared = bench("SubdomainValidator.clean", lambda c, d: validator_for(d).clean(c), candidates)
+    print(f"[+] Speed-up: {legacy / shared:.1f}x")
+
+if __name__ == "__main__":
+    main()
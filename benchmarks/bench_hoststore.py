@@ -0,0 +1,97 @@
+# benchmarks/bench_hoststore.py
+# Usage:
+#   python benchmarks/bench_hoststore.py [--hosts 5000000]
+#
+# Memory and speed of HostStore against the set of full hostnames scans
+# used to keep. Each container is built in a fresh process from a generator,
+# so a set owns its strings as it would in a scan, and the resident memory
+# it adds is measured. Two shapes of data:
+#
+#   wordlist  brute force / permutation output: a few thousand words under
+#             thousands of sub-zones, so labels repeat heavily
+#   unique    crt.sh-like: a unique random label per host under 500 zones
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from subdomainfinder.hoststore import HostStore
+
+DOMAIN = "example.com"
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+def wordlist_hosts(count):
+    words = [f"{w}{i}" for i in range(50) for w in ("api", "dev", "www", "mail", "app", "test", "cdn",
+                                                   "vpn", "db", "ci", "auth", "img", "m", "shop", "admin",
+                                                   "beta", "old", "new", "edge", "int")][:1000]
+    regions = ["us-east-1", "eu-west-1", "ap-south-1", "corp", "prod", "staging"]
+    zones = [f"{w}.{r}.{DOMAIN}" for r in regions for w in words]
+    for i in range(count):
+        yield f"{words[i % len(words)]}.{zones[i // len(words) % len(zones)]}"
+
+def unique_hosts(count):
+    rng = random.Random(1)
+    zones = [f"z{i}.{DOMAIN}" for i in range(500)]
+    for i in range(count):
+        yield f"host-{rng.getrandbits(40):010x}.{zones[i % len(zones)]}"
+
+DATASETS = {"wordlist": wordlist_hosts, "unique": unique_hosts}
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE
+
+def measure(kind, dataset, count):
+    hosts = DATASETS[dataset](count)
+    before = rss()
+    start = time.perf_counter()
+    if kind == "set":
+        container = set(hosts)
+    else:
+        container = HostStore(hosts)
+    build = time.perf_counter() - start
+    used = rss() - before
+    probes = list(DATASETS[dataset](200_000))
+    start = time.perf_counter()
+    assert all(h in container for h in probes)
+    lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    zone = f"z7.{DOMAIN}" if dataset == "unique" else f"corp.{DOMAIN}"
+    if kind == "set":
+        suffix = "." + zone
+        in_zone = sum(1 for h in container if h.endswith(suffix))
+    else:
+        in_zone = container.count(zone)
+    zone_count = time.perf_counter() - start
+    return {"hosts": len(container), "bytes": used, "build_s": build,
+            "lookup_us": lookup / len(probes) * 1e6, "zone_count_s": zone_count, "in_zone": in_zone}
+
+def main():
+    parser = argparse.ArgumentParser(description="HostStore against a set of hostnames.")
+    parser.add_argument("--hosts", type=int, default=5_000_000)
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "DATASET"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(*args.child, args.hosts)))
+        return
+    print(f"{'dataset':<10} {'container':<10} {'hosts':>9} {'MB':>8} {'B/host':>7} {'build s':>8}"
+          f" {'lookup us':>10} {'zone count s':>13}")
+    for dataset in DATASETS:
+        for kind in ("set", "hoststore"):
+            out = subprocess.run([sys.executable, __file__, "--hosts", str(args.hosts),
+                                  "--child", kind, dataset],
+                                 check=True, capture_output=True, text=True).stdout
+            r = json.loads(out)
+            print(f"{dataset:<10} {kind:<10} {r['hosts']:>9} {r['bytes'] / 2 ** 20:>8.1f}"
+                  f" {r['bytes'] / r['hosts']:>7.1f} {r['build_s']:>8.2f} {r['lookup_us']:>10.2f}"
+                  f" {r['zone_count_s']:>13.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_parse_lag.py
+# Usage:
+#   python benchmarks/bench_parse_lag.py [--rows 5000] [--crtsh-mb 50]
+#
+# Event-loop lag while a large response is parsed. A ticker coroutine asks
+# to wake up every millisecond and records how late it actually runs, which
+# is how long every other coroutine (DNS queries, other sources) would have
+# been stuck. Each parsing strategy runs next to the ticker:
+#
+#   DNSDumpster page  BeautifulSoup html.parser on the whole page (before),
+#                     the same through ParseExecutor, and TableCellsParser
+#                     fed as the body streams in (after)
+#   crt.sh JSON       json.loads of the whole body (before), and
+#                     JSONStringsParser fed as the body streams in (after)
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+
+from subdomainfinder.parsing import ParseExecutor
+from subdomainfinder.sources import BodyParser, SOURCES, TableCellsParser
+
+DOMAIN = "example.com"
+CHUNK_SIZE = 1 << 16
+TICK = 0.001
+
+def dnsdumpster_page(rows):
+    cells = "".join(f'<tr><td class="col-md-4">host{i}.{DOMAIN}<br><span>HTTP: nginx</span></td>'
+                    f'<td class="col-md-3">10.0.{i >> 8 & 255}.{i & 255}</td>'
+                    f'<td class="col-md-3">AS13335</td></tr>\n' for i in range(rows))
+    return f"<html><body><table class='table'><tbody>{cells}</tbody></table></body></html>".encode()
+
+def crtsh_body(megabytes):
+    entries, size, i = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        entry = json.dumps({"issuer_ca_id": 16418, "issuer_name": "C=US, O=Let's Encrypt, CN=R3",
+                            "common_name": f"host{i}.{DOMAIN}",
+                            "name_value": f"host{i}.{DOMAIN}\nwww{i}.{DOMAIN}", "id": i})
+        entries.append(entry)
+        size += len(entry) + 1
+        i += 1
+    return ("[" + ",".join(entries) + "]").encode()
+
+def legacy_table_first_cells(html):
+    soup = BeautifulSoup(html, "html.parser")
+    hosts = []
+    for table in soup.find_all("table"):
+        for row in table.find_all("tr"):
+            cols = row.find_all("td")
+            if cols:
+                hosts.append(cols[0].text)
+    return hosts
+
+def chunks(body):
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+async def streamed(parser, body):
+    # As ServiceScanner does it: parse each chunk as it arrives, yielding in between
+    found = []
+    for chunk in chunks(body):
+        found.extend(parser.feed(chunk))
+        await asyncio.sleep(0)
+    found.extend(parser.finish())
+    return found
+
+async def through_executor(executor, parser, body):
+    for chunk in chunks(body):
+        await executor.feed(parser, chunk)
+    return list(await executor.finish(parser))
+
+async def inline(func, *args):
+    return func(*args)
+
+async def measure(name, make_work):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            expected = loop.time() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, loop.time() - expected))
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.05)
+    lags.clear()
+    start = time.perf_counter()
+    result = await make_work()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+    lags.sort()
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else elapsed
+    worst = lags[-1] if lags else elapsed
+    print(f"{name:<42} {elapsed:8.3f}s  lag p99 {p99 * 1000:9.1f} ms  max {worst * 1000:9.1f} ms"
+          f"  {len(result)} items")
+
+async def run(args):
+    executor = ParseExecutor()
+    page = dnsdumpster_page(args.rows)
+    print(f"[+] DNSDumpster page: {args.rows} rows, {len(page) / 2 ** 20:.1f} MB")
+    await measure("html.parser DOM, inline (before)",
+                  lambda: inline(legacy_table_first_cells, page.decode()))
+    await measure("html.parser DOM, ParseExecutor",
+                  lambda: through_executor(executor, BodyParser(legacy_table_first_cells), page))
+    await measure("TableCellsParser, streamed (after)", lambda: streamed(TableCellsParser(), page))
+
+    body = crtsh_body(args.crtsh_mb)
+    print(f"[+] crt.sh body: {len(body) / 2 ** 20:.1f} MB")
+    await measure("json.loads of the whole body (before)", lambda: inline(json.loads, body))
+    await measure("JSONStringsParser, streamed (after)",
+                  lambda: streamed(SOURCES["crtsh"].parser(DOMAIN), body))
+    executor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag of response parsing strategies.")
+    parser.add_argument("--rows", type=int, default=5000, help="rows in the DNSDumpster page")
+    parser.add_argument("--crtsh-mb", type=float, default=50.0, help="size of the crt.sh body")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# benchmarks/bench_scan.py
+# Usage:
+#   python benchmarks/bench_scan.py [--hosts 20000] [--crtsh-mb 50] [--latency-ms 20]
+#                                   [--words 20000] [--save-baseline] [--fail-on-regression 10]
+#
+# End-to-end scan benchmark that never leaves the machine. The source
+# emulator (emulator.py) and DNS stub (dns_stub.py) run in a child process
+# so their CPU and memory are not charged to the scanner. Three stages are
+# measured:
+#
+#   passive  ServiceScanner over every source, through the emulator
+#   clean    SubdomainValidator over everything the sources returned
+#   dns      BruteForcer against the DNS stub
+#
+# For each stage it reports wall time, throughput, p50/p99 latency of the
+# unit of work (HTTP request, clean batch, DNS lookup), peak RSS and CPU
+# seconds. Results are compared with benchmarks/baseline.json; pass
+# --save-baseline to replace it after an intended change.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiohttp
+
+import dns_stub
+import emulator
+from subdomainfinder.brute_force import BruteForcer
+from subdomainfinder.ratelimit import RequestLimiter
+from subdomainfinder.resolver import AsyncResolver
+from subdomainfinder.services import ServiceScanner
+from subdomainfinder.sources import SOURCES
+from subdomainfinder.utils import validator_for
+
+DOMAIN = emulator.DOMAIN
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+CLEAN_BATCH = 10000
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Metrics where a larger value is better; for the rest smaller is better
+HIGHER_IS_BETTER = {"throughput"}
+COMPARED = ("wall_s", "throughput", "p50_ms", "p99_ms", "peak_rss_mb", "cpu_s")
+
+# -----------------------------
+# Servers
+# -----------------------------
+def _run_servers(hosts, crtsh_mb, latency_ms, dns_latency_ms, ports):
+    async def main():
+        loop = asyncio.get_running_loop()
+        http_ready, dns_ready = loop.create_future(), loop.create_future()
+        tasks = [
+            asyncio.create_task(emulator.serve(emulator.Payloads(hosts, crtsh_mb, latency_ms),
+                                               ready=http_ready.set_result)),
+            asyncio.create_task(dns_stub.serve(latency_ms=dns_latency_ms, ready=dns_ready.set_result)),
+        ]
+        ports.put((await http_ready, await dns_ready))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+def start_servers(args):
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_run_servers, daemon=True,
+        args=(args.hosts, args.crtsh_mb, args.latency_ms, args.dns_latency_ms, ports))
+    process.start()
+    http_port, dns_port = ports.get(timeout=30)
+    return process, http_port, dns_port
+
+# -----------------------------
+# Measurement
+# -----------------------------
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        # ru_maxrss is the lifetime peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class RSSSampler(threading.Thread):
+    """Polls RSS in the background and keeps the peak since the last reset."""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._halt = threading.Event()
+
+    def reset(self):
+        self.peak = current_rss()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._halt.set()
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Stage:
+    """Times one stage: wall clock, CPU, peak RSS and per-item latencies."""
+
+    def __init__(self, name, sampler, unit):
+        self.name = name
+        self.sampler = sampler
+        self.unit = unit
+        self.latencies = []
+        self.items = 0
+
+    def __enter__(self):
+        self.sampler.reset()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = time.process_time() - self._cpu
+        self.peak = max(self.sampler.peak, current_rss())
+
+    def result(self):
+        return {
+            "wall_s": round(self.wall, 4),
+            "items": self.items,
+            "unit": self.unit,
+            "throughput": round(self.items / self.wall, 1) if self.wall else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+            "peak_rss_mb": round(self.peak / 2 ** 20, 1),
+            "cpu_s": round(self.cpu, 4),
+        }
+
+class TimedResolver:
+    """Resolver proxy recording how long each lookup takes."""
+
+    def __init__(self, resolver, latencies):
+        self._resolver = resolver
+        self._latencies = latencies
+
+    def __getattr__(self, name):
+        return getattr(self._resolver, name)
+
+    async def resolve(self, name, rdtype="A"):
+        start = time.perf_counter()
+        try:
+            return await self._resolver.resolve(name, rdtype)
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+# -----------------------------
+# Stages
+# -----------------------------
+async def bench_passive(stage, http_port, source_timeout):
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        stage.latencies.append(time.perf_counter() - ctx.start)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    # No rate limiting: the emulator answers as fast as the scanner asks
+    limiter = RequestLimiter(max_in_flight=100, source_rates={name: 0 for name in SOURCES})
+    async with aiohttp.ClientSession(trace_configs=[trace]) as session:
+        scanner = ServiceScanner(DOMAIN, session=session, limiter=limiter,
+                                 base_urls=emulator.base_urls("127.0.0.1", http_port))
+        found = {}
+        async for source, host in scanner.scan_iter(source_timeout=source_timeout):
+            found.setdefault(host, source)
+    stage.items = len(found)
+    failed = {s: status for s, status in scanner.source_status.items() if status != "ok"}
+    if failed:
+        print(f"[!] Sources that did not finish: {failed}")
+    return list(found)
+
+def bench_clean(stage, hosts):
+    validator = validator_for(DOMAIN)
+    kept = set()
+    for i in range(0, len(hosts), CLEAN_BATCH):
+        start = time.perf_counter()
+        kept.update(validator.clean(hosts[i:i + CLEAN_BATCH]))
+        stage.latencies.append(time.perf_counter() - start)
+    stage.items = len(hosts)
+    return kept
+
+async def bench_dns(stage, dns_port, words, concurrency):
+    wordlist = [f"w{i}" for i in range(words)]
+    async with AsyncResolver([f"127.0.0.1:{dns_port}"], timeout=2.0, retries=1) as resolver:
+        forcer = BruteForcer(DOMAIN, wordlist, resolver=TimedResolver(resolver, stage.latencies),
+                             concurrency=concurrency)
+        found = await forcer.scan()
+    stage.items = len(stage.latencies)
+    return found
+
+# -----------------------------
+# Baseline
+# -----------------------------
+def compare(results, baseline, threshold):
+    """Print deltas against the baseline; return the regressions beyond ``threshold`` percent."""
+    regressions = []
+    print(f"\n{'stage':<9} {'metric':<12} {'current':>12} {'baseline':>12} {'delta':>9}")
+    for stage, metrics in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric), metrics[metric]
+            if not old:
+                continue
+            delta = (new - old) / old * 100
+            worse = -delta if metric in HIGHER_IS_BETTER else delta
+            flag = ""
+            if threshold is not None and metric in ("wall_s", "throughput") and worse > threshold:
+                regressions.append(f"{stage}.{metric} {delta:+.1f}%")
+                flag = "  <- regression"
+            print(f"{stage:<9} {metric:<12} {new:>12} {old:>12} {delta:>+8.1f}%{flag}")
+    return regressions
+
+def print_results(results):
+    print(f"\n{'stage':<9} {'wall s':>8} {'items':>9} {'per s':>10} {'p50 ms':>9} "
+          f"{'p99 ms':>9} {'rss MB':>8} {'cpu s':>8}")
+    for stage, m in results["stages"].items():
+        print(f"{stage:<9} {m['wall_s']:>8.3f} {m['items']:>9} {m['throughput']:>10.1f} "
+              f"{m['p50_ms']:>9.2f} {m['p99_ms']:>9.2f} {m['peak_rss_mb']:>8.1f} {m['cpu_s']:>8.3f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark a full scan against local emulators.")
+    parser.add_argument("--hosts", type=int, default=20000, help="distinct hosts per source")
+    parser.add_argument("--crtsh-mb", type=float, default=50.0, help="size of the crt.sh body")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="emulated HTTP latency")
+    parser.add_argument("--dns-latency-ms", type=float, default=0.0, help="emulated DNS latency")
+    parser.add_argument("--words", type=int, default=20000, help="brute force wordlist size")
+    parser.add_argument("--concurrency", type=int, default=1000, help="DNS lookups in flight")
+    parser.add_argument("--source-timeout", type=float, default=300.0)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                        help="exit non-zero if wall time or throughput is PCT%% worse than baseline")
+    parser.add_argument("--output", type=Path, help="also write the results as JSON here")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    # The VirusTotal source is skipped without a key; the emulator accepts any
+    os.environ.setdefault("VIRUSTOTAL_API_KEY", "bench")
+    process, http_port, dns_port = start_servers(args)
+    sampler = RSSSampler()
+    sampler.start()
+    stages = {}
+    try:
+        print(f"[+] Emulator on :{http_port}, DNS stub on :{dns_port}")
+        with Stage("passive", sampler, "hosts") as passive:
+            hosts = asyncio.run(bench_passive(passive, http_port, args.source_timeout))
+        stages["passive"] = passive.result()
+        print(f"[+] passive: {len(hosts)} hosts")
+
+        with Stage("clean", sampler, "hosts") as clean:
+            kept = bench_clean(clean, hosts)
+        stages["clean"] = clean.result()
+        print(f"[+] clean: {len(kept)} valid")
+
+        with Stage("dns", sampler, "lookups") as dns:
+            found = asyncio.run(bench_dns(dns, dns_port, args.words, args.concurrency))
+        stages["dns"] = dns.result()
+        print(f"[+] dns: {len(found)} resolved")
+    finally:
+        sampler.stop()
+        process.terminate()
+        process.join()
+
+    results = {
+        "params": {k: getattr(args, k) for k in
+                   ("hosts", "crtsh_mb", "latency_ms", "dns_latency_ms", "words", "concurrency")},
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stages": stages,
+    }
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\n[+] Saved baseline to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"\n[*] No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("params") != results["params"]:
+        print(f"\n[!] Baseline was recorded with {baseline.get('params')}; deltas are not comparable")
+    regressions = compare(results, baseline, args.fail_on_regression)
+    if regressions:
+        print(f"\n[!] Regressions beyond {args.fail_on_regression}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/dns_stub.py
+# Usage:
+#   python benchmarks/dns_stub.py [--port 5353] [--hit-rate 0.1] [--latency-ms 0]
+#
+# Minimal authoritative DNS server for benchmarks. Any name under the zone
+# whose first label hashes into --hit-rate gets an A record (an address
+# derived from the name); everything else is NXDOMAIN with the zone's SOA,
+# whose 60 s minimum is the negative-caching TTL. Answers are
+# deterministic, so runs are comparable, and a wildcard zone
+# (*.wild.<zone>) is included to exercise wildcard filtering.
+
+import argparse
+import asyncio
+import socket
+import struct
+import zlib
+
+ZONE = "example.com"
+
+_HEADER = struct.Struct("!HHHHHH")
+_RR = struct.Struct("!HHIH")
+
+def exists(name, zone=ZONE, hit_rate=0.1):
+    if not name.endswith("." + zone):
+        return False
+    if name.endswith(".wild." + zone):
+        return True
+    return zlib.crc32(name.split(".", 1)[0].encode()) % 10000 < hit_rate * 10000
+
+def soa(zone):
+    # Authority record for negative answers; MINIMUM (last field) is the negative TTL
+    encoded = b"".join(bytes([len(label)]) + label.encode() for label in zone.split(".")) + b"\0"
+    rdata = b"\2ns" + encoded + b"\4host" + encoded + struct.pack("!IIIII", 1, 3600, 600, 86400, 60)
+    return encoded + _RR.pack(6, 1, 3600, len(rdata)) + rdata
+
+def address(name):
+    return socket.inet_aton("10.%d.%d.%d" % tuple(zlib.crc32(name.encode()).to_bytes(4, "big")[1:]))
+
+class StubProtocol(asyncio.DatagramProtocol):
+    def __init__(self, zone=ZONE, hit_rate=0.1, latency=0.0):
+        self.zone = zone
+        self.hit_rate = hit_rate
+        self.latency = latency
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def answer(self, data):
+        qid = _HEADER.unpack_from(data)[0]
+        offset, labels = 12, []
+        while data[offset]:
+            length = data[offset]
+            labels.append(data[offset + 1:offset + 1 + length].decode("ascii", "replace").lower())
+            offset += length + 1
+        question = data[12:offset + 5]
+        qtype = struct.unpack_from("!H", data, offset + 1)[0]
+        name = ".".join(labels)
+        if not exists(name, self.zone, self.hit_rate):
+            return _HEADER.pack(qid, 0x8583, 1, 0, 1, 0) + question + soa(self.zone)
+        answer = b""
+        if qtype == 1:
+            # wildcard names all share one address, like a real wildcard record
+            target = "wild." + self.zone if name.endswith(".wild." + self.zone) else name
+            answer = b"\xc0\x0c" + _RR.pack(1, 1, 300, 4) + address(target)
+        return _HEADER.pack(qid, 0x8580, 1, 1 if answer else 0, 0, 0) + question + answer
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        try:
+            response = self.answer(data)
+        except (IndexError, struct.error):
+            return
+        if self.latency:
+            asyncio.get_running_loop().call_later(self.latency, self.transport.sendto, response, addr)
+        else:
+            self.transport.sendto(response, addr)
+
+async def serve(host="127.0.0.1", port=0, zone=ZONE, hit_rate=0.1, latency_ms=0.0, ready=None):
+    """Run the stub until cancelled; ``ready(port)`` is called once it listens."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: StubProtocol(zone, hit_rate, latency_ms / 1000), local_addr=(host, port))
+    if ready is not None:
+        ready(transport.get_extra_info("sockname")[1])
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic DNS zone over UDP.")
+    parser.add_argument("--port", type=int, default=5353)
+    parser.add_argument("--zone", default=ZONE)
+    parser.add_argument("--hit-rate", type=float, default=0.1, help="share of names that exist")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each answer")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    print(f"[+] Serving {args.zone} on udp://127.0.0.1:{args.port}")
+    try:
+        asyncio.run(serve(port=args.port, zone=args.zone, hit_rate=args.hit_rate,
+                          latency_ms=args.latency_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
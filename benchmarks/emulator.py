@@ -0,0 +1,193 @@
+# benchmarks/emulator.py
+# Usage:
+#   python benchmarks/emulator.py [--port 8765] [--hosts 20000] [--crtsh-mb 300] [--latency-ms 20]
+#
+# Local aiohttp stand-in for every passive source in subdomainfinder.sources.
+# Each source is served under /<source name>/ with the same paths, query
+# parameters and response formats as the real service, filled with
+# synthetic hosts of example.com. Point a scanner at it with base_urls().
+# The crt.sh body is generated while it is written, so multi-hundred-MB
+# responses cost no memory on the server side.
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web
+
+from subdomainfinder.sources import OTX_PAGE_SIZE, SOURCES
+
+DOMAIN = "example.com"
+CHUNK_SIZE = 1 << 16
+CERTSPOTTER_PAGE_SIZE = 100
+WAYBACK_PAGE_SIZE = 5000
+
+class Payloads:
+    """Deterministic synthetic data: ``hosts`` distinct names per source."""
+
+    def __init__(self, hosts=20000, crtsh_mb=10.0, latency_ms=20.0, domain=DOMAIN):
+        self.hosts = hosts
+        self.crtsh_bytes = int(crtsh_mb * 1024 * 1024)
+        self.latency = latency_ms / 1000
+        self.domain = domain
+
+    def host(self, source, i):
+        # a few labels shared between sources so deduplication has work to do
+        prefix = "svc" if i % 4 == 0 else source[:4]
+        return f"{prefix}{i}.{self.domain}"
+
+    def names(self, source, start=0, stop=None):
+        stop = self.hosts if stop is None else min(stop, self.hosts)
+        return [self.host(source, i) for i in range(start, stop)]
+
+    @staticmethod
+    def ip(i):
+        return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+def make_app(payloads: Payloads) -> web.Application:
+    p = payloads
+
+    async def delay():
+        if p.latency:
+            await asyncio.sleep(p.latency)
+
+    async def virustotal(request):
+        await delay()
+        if not request.query.get("apikey"):
+            return web.Response(status=403)
+        return web.json_response({"subdomains": p.names("virustotal")})
+
+    async def dnsdumpster(request):
+        await delay()
+        if request.method == "GET":
+            return web.Response(text='<form><input name="csrfmiddlewaretoken" value="bench"></form>',
+                                content_type="text/html")
+        rows = "".join(f"<tr><td>{h}<br></td><td>{p.ip(i)}</td></tr>"
+                       for i, h in enumerate(p.names("dnsdumpster")))
+        return web.Response(text=f"<html><table>{rows}</table></html>", content_type="text/html")
+
+    async def crtsh(request):
+        await delay()
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        written, i, buf = 0, 0, [b"["]
+        size = 1
+        # crt.sh repeats names once per certificate: cycle until the body is big enough
+        while written + size < p.crtsh_bytes or i == 0:
+            a, b = p.host("crtsh", i % p.hosts), p.host("crtsh", (i + 1) % p.hosts)
+            entry = json.dumps({"issuer_ca_id": 16418, "issuer_name": "C=US, O=Let's Encrypt, CN=R3",
+                                "common_name": a, "name_value": f"{a}\n{b}", "id": 1000000 + i,
+                                "entry_timestamp": "2024-01-01T00:00:00.000", "serial_number": f"{i:032x}"})
+            chunk = (b"," if i else b"") + entry.encode()
+            buf.append(chunk)
+            size += len(chunk)
+            i += 1
+            if size >= CHUNK_SIZE:
+                await response.write(b"".join(buf))
+                written += size
+                buf, size = [], 0
+        buf.append(b"]")
+        await response.write(b"".join(buf))
+        await response.write_eof()
+        return response
+
+    async def wayback(request):
+        await delay()
+        pages = max(1, -(-p.hosts // WAYBACK_PAGE_SIZE))
+        if request.query.get("showNumPages"):
+            return web.Response(text=f"{pages}\n")
+        page = int(request.query.get("page", 0))
+        start = page * WAYBACK_PAGE_SIZE
+        rows = [["original"]] + [[f"http://{h}:80/index.html"]
+                                 for h in p.names("wayback", start, start + WAYBACK_PAGE_SIZE)]
+        return web.json_response(rows)
+
+    async def bufferover(request):
+        await delay()
+        return web.json_response({"FDNS_A": [f"{p.ip(i)},{h}" for i, h in enumerate(p.names("bufferover"))]})
+
+    async def threatcrowd(request):
+        await delay()
+        return web.json_response({"response_code": "1", "subdomains": p.names("threatcrowd")})
+
+    async def certspotter(request):
+        await delay()
+        after = int(request.query.get("after", 0))
+        issuances = [{"id": str(i + 1), "dns_names": [p.host("certspotter", i)]}
+                     for i in range(after, min(after + CERTSPOTTER_PAGE_SIZE, p.hosts))]
+        return web.json_response(issuances)
+
+    async def otx(request):
+        await delay()
+        limit = int(request.query.get("limit", OTX_PAGE_SIZE))
+        page = int(request.query.get("page", 1))
+        start = (page - 1) * limit
+        return web.json_response({"count": p.hosts, "passive_dns": [
+            {"hostname": h, "address": p.ip(start + i), "record_type": "A"}
+            for i, h in enumerate(p.names("otx", start, start + limit))]})
+
+    async def rapiddns(request):
+        await delay()
+        rows = "".join(f"<tr><td>{h}</td><td>A</td></tr>" for h in p.names("rapiddns"))
+        return web.Response(text=f"<table>{rows}</table>", content_type="text/html")
+
+    async def hackertarget(request):
+        await delay()
+        return web.Response(text="".join(f"{h},{p.ip(i)}\n" for i, h in enumerate(p.names("hackertarget"))))
+
+    handlers = {
+        "virustotal": virustotal, "dnsdumpster": dnsdumpster, "crtsh": crtsh, "wayback": wayback,
+        "bufferover": bufferover, "threatcrowd": threatcrowd, "certspotter": certspotter,
+        "otx": otx, "rapiddns": rapiddns, "hackertarget": hackertarget,
+    }
+    missing = set(SOURCES) - set(handlers)
+    if missing:
+        raise RuntimeError(f"No emulator for source(s): {', '.join(sorted(missing))}")
+
+    app = web.Application()
+    for name, source in SOURCES.items():
+        path = f"/{name}" + urlsplit(source.path.format(domain=p.domain)).path
+        app.router.add_route("*", path, handlers[name])
+    return app
+
+def base_urls(host, port):
+    return {name: f"http://{host}:{port}/{name}" for name in SOURCES}
+
+async def serve(payloads, host="127.0.0.1", port=0, ready=None):
+    """Run the emulator until cancelled; ``ready(port)`` is called once it listens."""
+    runner = web.AppRunner(make_app(payloads), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    if ready is not None:
+        ready(port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic passive-source payloads.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hosts", type=int, default=20000, help="distinct hosts per source")
+    parser.add_argument("--crtsh-mb", type=float, default=10.0, help="size of the crt.sh body")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay before each answer")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    payloads = Payloads(args.hosts, args.crtsh_mb, args.latency_ms)
+    print(f"[+] Emulating {len(SOURCES)} sources on http://127.0.0.1:{args.port}/<source>/")
+    try:
+        asyncio.run(serve(payloads, port=args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# build_cloud_index.py
+# Usage:
+#   python build_cloud_index.py [--fetch] [ranges_dir] [output.bin]
+#
+# Compiles provider range files into the binary index loaded by cloud_detector.
+# The range files live in cloud_ranges/, named by provider:
+#   aws.json            https://ip-ranges.amazonaws.com/ip-ranges.json
+#   gcp.json            https://www.gstatic.com/ipranges/cloud.json
+#   azure.json          ServiceTags_Public_*.json from the Microsoft download center
+#   cloudflare-v4.txt   https://www.cloudflare.com/ips-v4 (shipped)
+#   cloudflare-v6.txt   https://www.cloudflare.com/ips-v6 (shipped)
+#
+# --fetch downloads the current AWS, GCP and Azure files first. Addresses of a
+# provider without a range file are reported as Unknown.
+
+import argparse
+import re
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from subdomainfinder.cloud_ranges import DEFAULT_INDEX, RANGES_DIR, ProviderIndex
+
+RANGE_URLS = {
+    "aws.json": "https://ip-ranges.amazonaws.com/ip-ranges.json",
+    "gcp.json": "https://www.gstatic.com/ipranges/cloud.json",
+}
+# The Azure file name changes weekly; its current link is on the download page
+AZURE_DOWNLOAD_PAGE = "https://www.microsoft.com/en-us/download/details.aspx?id=56519"
+AZURE_FILE = re.compile(r"https://download\.microsoft\.com/download/[^\"']+/ServiceTags_Public_\d+\.json")
+
+def _get(url, timeout=30):
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+def fetch_ranges(ranges_dir):
+    urls = dict(RANGE_URLS)
+    match = AZURE_FILE.search(_get(AZURE_DOWNLOAD_PAGE).decode("utf-8", "replace"))
+    if match is None:
+        print("[!] Azure service tags link not found, keeping the current azure.json", file=sys.stderr)
+    else:
+        urls["azure.json"] = match.group(0)
+
+    for name, url in urls.items():
+        data = _get(url)
+        path = Path(ranges_dir) / name
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        print(f"[+] Fetched {name} ({len(data)} bytes) from {url}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile cloud provider ranges into a binary index.")
+    parser.add_argument("ranges_dir", nargs="?", default=str(RANGES_DIR))
+    parser.add_argument("output", nargs="?", default=str(DEFAULT_INDEX))
+    parser.add_argument("--fetch", action="store_true",
+                        help="download the published AWS, GCP and Azure ranges first")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_ranges(args.ranges_dir)
+
+    index = ProviderIndex.from_directory(args.ranges_dir)
+    index.save(args.output)
+    print(f"[+] Wrote {args.output} ({len(index)} ranges, providers: {', '.join(index.providers)})")
+
+    start = time.perf_counter()
+    ProviderIndex.load(args.output)
+    print(f"[+] Load time: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
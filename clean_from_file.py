@@ -1,59 +1,123 @@
 # clean_from_file.py
 # Usage:
 #   python clean_from_file.py results_new.json example.com
+#   python clean_from_file.py --stream raw_dump.ndjson example.com
 # Produces cleaned_results_<timestamp>.json and cleaned_results_<timestamp>.csv
+#
+# --stream handles inputs larger than RAM: JSON (any shape, e.g. one huge
+# array), NDJSON or plain text (one candidate per line) is read incrementally,
+# deduplicated with at most --max-items hosts in memory (sorted runs spill to
+# disk and are merged) and written out as it goes.
 
-import json, sys, re, datetime, os
-
-HOST_RE = re.compile(r"^[a-z0-9](?:[a-z0-9\-\.]{0,251}[a-z0-9])?$")
-
-def normalize_candidate(candidate: str):
-    out = []
-    if candidate is None:
-        return out
-    parts = re.split(r"[,;\n\r]+", str(candidate))
-    for p in parts:
-        for q in p.split():
-            q = q.strip().lower().strip('.')
-            if q:
-                out.append(q)
-    return out
-
-def is_valid_hostname(h: str, domain: str) -> bool:
-    if not h:
-        return False
-    if '@' in h:
-        return False
-    if h.startswith('*.'):
-        return False
-    if not h.endswith(domain):
-        return False
-    if not HOST_RE.match(h):
-        return False
-    return True
+import argparse, json, sys, datetime, os
+
+from subdomainfinder.jsonstream import JSONStringScanner
+from subdomainfinder.utils import external_sorted_unique, validator_for
+
+CHUNK_SIZE = 1 << 20
 
 def clean_and_dedupe(raw_iterable, domain):
-    seen = set()
-    cleaned = []
-    for item in raw_iterable:
-        for cand in normalize_candidate(item):
-            if is_valid_hostname(cand, domain) and cand not in seen:
-                seen.add(cand)
-                cleaned.append(cand)
-    cleaned.sort()
-    return cleaned
+    return validator_for(domain).clean(raw_iterable)
+
+# --------------------------
+# Streaming mode
+# --------------------------
+def detect_format(inpath):
+    with open(inpath, "rb") as f:
+        head = f.read(CHUNK_SIZE).lstrip()
+    if head[:1] not in (b"[", b"{"):
+        return "text"
+    first_line = head.split(b"\n", 1)[0].strip()
+    try:
+        json.loads(first_line)
+    except ValueError:
+        return "json"
+    # a whole JSON value on the first line followed by more lines
+    return "ndjson" if b"\n" in head.strip() else "json"
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+
+def read_candidates(inpath, fmt):
+    if fmt == "json":
+        scanner = JSONStringScanner()
+        with open(inpath, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                for _, value in scanner.feed(chunk):
+                    yield value
+    elif fmt == "ndjson":
+        with open(inpath, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield from _strings(json.loads(line))
+                    except ValueError:
+                        continue
+    else:
+        with open(inpath, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+
+def write_streaming(hosts, domain, json_name, csv_name):
+    count = 0
+    with open(json_name, "w", encoding="utf-8") as fj, open(csv_name, "w", encoding="utf-8") as fc:
+        # same layout as json.dump(..., indent=2)
+        fj.write('{\n  "domain": %s,\n  "subdomains": [' % json.dumps(domain, ensure_ascii=False))
+        fc.write("subdomain\n")
+        for s in hosts:
+            fj.write(("\n    " if count == 0 else ",\n    ") + json.dumps(s, ensure_ascii=False))
+            fc.write(s + "\n")
+            count += 1
+        fj.write("\n  ]\n}" if count else "]\n}")
+    return count
+
+def main_streaming(args, domain, json_name, csv_name):
+    fmt = args.format if args.format != "auto" else detect_format(args.input)
+    print(f"Streaming {args.input} as {fmt}")
+    valid = validator_for(domain).iter_valid(read_candidates(args.input, fmt))
+    hosts = external_sorted_unique(valid, max_items=args.max_items, tmp_dir=args.tmp_dir)
+    count = write_streaming(hosts, domain, json_name, csv_name)
+    print(f"Wrote {json_name} and {csv_name} ({count} hosts)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clean and deduplicate a results file.")
+    parser.add_argument("input")
+    parser.add_argument("domain")
+    parser.add_argument("--stream", action="store_true",
+                        help="constant-memory mode for inputs larger than RAM")
+    parser.add_argument("--format", choices=["auto", "json", "ndjson", "text"], default="auto",
+                        help="input format in --stream mode (default: detect)")
+    parser.add_argument("--max-items", type=int, default=500_000,
+                        help="distinct hosts held in memory before spilling to disk")
+    parser.add_argument("--tmp-dir", default=None, help="where to spill sorted runs")
+    return parser.parse_args(argv)
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python clean_from_file.py <input_results.json> <domain>")
-        sys.exit(1)
-
-    inpath = sys.argv[1]
-    domain = sys.argv[2].strip().lower()
+    args = parse_args()
+    inpath = args.input
+    domain = args.domain.strip().lower()
 
     # ✅ tạo timestamp
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
+    json_name = f"cleaned_results_{timestamp}.json"
+    csv_name = f"cleaned_results_{timestamp}.csv"
+
+    if args.stream:
+        try:
+            main_streaming(args, domain, json_name, csv_name)
+        except OSError as e:
+            print("Failed to process input file:", e)
+            sys.exit(1)
+        return
+
     try:
         with open(inpath, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -83,9 +147,6 @@ def main():
     cleaned = clean_and_dedupe(raw, domain)
     out_json = {"domain": domain, "subdomains": cleaned}
 
-    json_name = f"cleaned_results_{timestamp}.json"
-    csv_name = f"cleaned_results_{timestamp}.csv"
-
     with open(json_name, "w", encoding="utf-8") as f:
         json.dump(out_json, f, indent=2, ensure_ascii=False)
 
@@ -4,76 +4,196 @@
 # or
 #   python clean_results.py
 # If no arg given, default domain is "example.com" (change default as needed).
+#
+# Source responses are cached in ~/.cache/subdomainfinder/responses.sqlite:
+#   --refresh      revalidate every source (conditional requests where supported)
+#   --cache-only   never touch the network, use whatever is cached
+#   --no-cache     bypass the cache entirely
+#
+# --sources crtsh,wayback runs only those sources, --exclude-sources otx skips
+# some (defaults: SUBDOMAINFINDER_SOURCES / SUBDOMAINFINDER_DISABLED_SOURCES).
+#
+# Every run is recorded in ~/.cache/subdomainfinder/history.sqlite (first/last
+# seen and sources per host). --diff writes only what changed since the last
+# run (diff_results.json/.csv: added and removed hosts) instead of the full lists;
+# with --stream, only hosts that were not present in the last run are streamed
+# (and enriched).
+#
+# Batch mode scans many roots over one shared connection pool:
+#   python clean_results.py --domains-file roots.txt --out-dir results/
+# writes results/<domain>.json and results/<domain>.csv (with --diff,
+# results/<domain>.diff.json/.csv) as each domain finishes.
+#
+# --metrics-json metrics.json writes per-source costs (requests, latency,
+# bytes, parse time, raw/valid/unique hosts, errors) and per-stage timings;
+# --metrics-port 9464 serves them at http://127.0.0.1:9464/metrics in the
+# Prometheus text format while the scan runs.
+#
+# --stream results.ndjson appends each valid host (with the source that found
+# it) as soon as it is found, so an interrupted scan keeps what it had; the
+# extension picks the format (.txt, .ndjson, .csv, .sfa compressed archive)
+# unless --stream-format says otherwise. --enrich resolves and probes each
+# streamed host first (one A query and one HTTP request), filling in its ips,
+# cloud and server columns. --dns-cache dns.sqlite keeps those DNS answers
+# (for their TTL) across runs.
 
+import argparse
 import asyncio
 import json
-import re
-import sys
-from typing import List, Set
+import os
+from typing import Dict, List, Set, Tuple
 
 # import ServiceScanner from your package
+from subdomainfinder.batch import BatchScanner, load_domains
+from subdomainfinder.cache import DEFAULT_CACHE_PATH, ResponseCache
+from subdomainfinder.dnscache import DNSCache
+from subdomainfinder.enrichment import EnrichingWriter
+from subdomainfinder.enums import CacheMode, OutputFormat
+from subdomainfinder.history import DEFAULT_HISTORY_PATH, HistoryStore, HostDiff
+from subdomainfinder.metrics import Metrics, serve_metrics
 from subdomainfinder.services import ServiceScanner
+from subdomainfinder.utils import validator_for
+from subdomainfinder.writers import AsyncResultWriter, HostResult, open_writer
 
-# hostname validation: allow a-z0-9 - and dots, must start and end with alnum
-HOST_RE = re.compile(r"^[a-z0-9](?:[a-z0-9\-\.]{0,251}[a-z0-9])?$")
-
-def normalize_candidate(candidate: str) -> List[str]:
-    """
-    Break candidate into possible hostnames (split on commas/newlines/spaces),
-    strip and lowercase.
-    Returns list of cleaned strings.
-    """
-    out = []
-    if candidate is None:
-        return out
-    # split common separators
-    parts = re.split(r"[,;\n\r]+", str(candidate))
-    for p in parts:
-        # further split on whitespace (but avoid splitting hostnames with dots)
-        for q in p.split():
-            q = q.strip().lower().strip('.')
-            if q:
-                out.append(q)
-    return out
-
-def is_valid_hostname(h: str, domain: str) -> bool:
-    if not h:
-        return False
-    h = h.strip().lower()
-    # exclude emails
-    if '@' in h:
-        return False
-    # exclude wildcard entries
-    if h.startswith('*.'):
-        return False
-    # must end with the domain
-    if not h.endswith(domain):
-        return False
-    # must be composed of allowed chars
-    if not HOST_RE.match(h):
-        return False
-    return True
-
-async def scan_services(domain: str) -> Set[str]:
-    scanner = ServiceScanner(domain)
-    results = await scanner.scan()
-    # ensure it's a set/list
-    if results is None:
-        return set()
-    return set(results)
-
-def clean_and_dedupe(raw_iterable, domain):
-    seen = set()
-    cleaned = []
-    for item in raw_iterable:
-        for cand in normalize_candidate(item):
-            if is_valid_hostname(cand, domain) and cand not in seen:
-                seen.add(cand)
-                cleaned.append(cand)
-    # sort for consistent order
-    cleaned.sort()
+async def scan_services(domain: str, cache: ResponseCache = None,
+                        cache_mode: CacheMode = CacheMode.NORMAL,
+                        sources: List[str] = None,
+                        disabled: List[str] = None,
+                        metrics: Metrics = None,
+                        stream: AsyncResultWriter = None,
+                        skip: Set[str] = None) -> Tuple[Dict[str, Set[str]], Dict[str, str]]:
+    # host -> sources that reported it, plus each source's outcome; hosts in
+    # skip are not streamed
+    scanner = ServiceScanner(domain, cache=cache, cache_mode=cache_mode,
+                             sources=sources, disabled=disabled, metrics=metrics)
+    found = {}
+    streamed = set(skip or ())
+    validator = validator_for(domain)
+    async for source, host in scanner.scan_iter():
+        found.setdefault(host, set()).add(source)
+        if stream is not None:
+            for valid in validator.iter_valid([host]):
+                if valid not in streamed:
+                    streamed.add(valid)
+                    await stream.write(HostResult(valid, source))
+    # a source that failed or was throttled returns fewer results; say so
+    for source, status in sorted(scanner.source_status.items()):
+        if status != "ok":
+            print(f"[!] {source}: {status}")
+    return found, scanner.source_status
+
+async def scan_batch(domains: List[str], out_dir: str, cache: ResponseCache = None,
+                     cache_mode: CacheMode = CacheMode.NORMAL, max_in_flight: int = 100,
+                     domain_concurrency: int = 20, sources: List[str] = None,
+                     disabled: List[str] = None, history: HistoryStore = None,
+                     diff_only: bool = False, metrics: Metrics = None,
+                     stream: AsyncResultWriter = None) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    batch = BatchScanner(domains, cache=cache, cache_mode=cache_mode,
+                         max_in_flight=max_in_flight, domain_concurrency=domain_concurrency,
+                         sources=sources, disabled=disabled, metrics=metrics)
+    total = 0
+    async for result in batch.results():
+        base = os.path.join(out_dir, result.domain)
+        if stream is not None:
+            skip = known_hosts(history, result.domain) if diff_only else None
+            await stream_domain(stream, result.domain, result.found, skip)
+        if history is not None:
+            diff = record_history(history, result.domain, result.found, result.source_status)
+            if diff_only:
+                save_diff(base + ".diff", diff)
+                total += len(diff.added) + len(diff.removed)
+                print(f"[+] {result.domain}: +{len(diff.added)} -{len(diff.removed)}")
+                continue
+        cleaned = clean_and_dedupe(result.subdomains, result.domain, metrics)
+        save_json(base + ".json", {"domain": result.domain, "subdomains": cleaned,
+                                   "sources": result.source_status})
+        save_csv(base + ".csv", cleaned)
+        total += len(cleaned)
+        print(f"[+] {result.domain}: {len(cleaned)} hosts")
+    for source, state in sorted(batch.source_states().items()):
+        print(f"    {source}: {state['state']}, {state['throttled']} throttled answers")
+    return total
+
+async def stream_domain(stream: AsyncResultWriter, domain: str, found: Dict[str, Set[str]],
+                        skip: Set[str] = None):
+    # one row per valid host not in skip, credited to the first source (by name) that found it
+    streamed = set(skip or ())
+    for host, sources in found.items():
+        for valid in validator_for(domain).iter_valid([host]):
+            if valid not in streamed:
+                streamed.add(valid)
+                await stream.write(HostResult(valid, min(sources)))
+
+def clean_and_dedupe(raw_iterable, domain, metrics: Metrics = None):
+    # split, validate and dedupe in one pass; sorted for consistent order
+    if metrics is None:
+        return validator_for(domain).clean(raw_iterable)
+    raw = list(raw_iterable)
+    with metrics.timed("clean") as stage:
+        cleaned = validator_for(domain).clean(raw)
+    stage.items_in += len(raw)
+    stage.items_out += len(cleaned)
     return cleaned
 
+async def serving_metrics(coro, metrics: Metrics, port: int = None):
+    # expose live metrics for as long as the scan runs
+    runner = await serve_metrics(metrics, port=port) if port else None
+    try:
+        return await coro
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+async def streaming(scan, path: str = None, output_format: OutputFormat = None,
+                    enrich: bool = False, metrics: Metrics = None, dns_cache: DNSCache = None):
+    # scan(stream) with a streaming writer open for it (or None), closed even on failure
+    if not path:
+        return await scan(None)
+    writer = AsyncResultWriter(open_writer(path, output_format))
+    stream = EnrichingWriter(writer, metrics=metrics, dns_cache=dns_cache) if enrich else writer
+    try:
+        return await scan(stream)
+    finally:
+        await stream.aclose()
+        print(f"[+] Streamed {writer.writer.count} hosts to {path}")
+
+def known_hosts(history: HistoryStore, domain: str) -> Set[str]:
+    # hosts present at the last run; --diff streams (and enriches) only the rest
+    return {record.host for record in history.hosts(domain)}
+
+def record_history(history: HistoryStore, domain: str, found: Dict[str, Set[str]],
+                   status: Dict[str, str]) -> HostDiff:
+    # clean hosts the same way as the full output, keeping who found them
+    validator = validator_for(domain)
+    cleaned = {}
+    for host, sources in found.items():
+        for valid in validator.iter_valid([host]):
+            cleaned.setdefault(valid, set()).update(sources)
+    completed = [source for source, outcome in status.items() if outcome == "ok"]
+    return history.record(domain, cleaned, completed)
+
+def save_diff(base: str, diff: HostDiff):
+    save_json(base + ".json", {"domain": diff.domain, "previous_run": diff.previous_run,
+                               "added": diff.added, "removed": diff.removed})
+    with open(base + ".csv", "w", encoding="utf-8") as f:
+        f.write("change,subdomain\n")
+        for s in diff.added:
+            f.write(f"added,{s}\n")
+        for s in diff.removed:
+            f.write(f"removed,{s}\n")
+
+def write_metrics(metrics: Metrics, path: str):
+    if metrics is None or not path:
+        return
+    metrics.write_report(path)
+    print(f"[+] Wrote {path}")
+    # the sources that cost the most per host nobody else found
+    costly = sorted(((name, s["seconds_per_unique_host"]) for name, s in metrics.report()["sources"].items()
+                     if s["seconds_per_unique_host"] is not None), key=lambda item: -item[1])
+    for name, cost in costly[:5]:
+        print(f"    {name}: {cost * 1000:.1f} ms per unique host")
+
 def save_json(path: str, obj):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, ensure_ascii=False)
@@ -84,25 +204,124 @@ def save_csv(path: str, items: List[str]):
         for s in items:
             f.write(s + "\n")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scan passive sources and clean the results.")
+    # change default if you want
+    parser.add_argument("domain", nargs="?", default="example.com")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--refresh", action="store_true", help="revalidate every cached response")
+    mode.add_argument("--cache-only", action="store_true", help="serve from the cache, no network")
+    mode.add_argument("--no-cache", action="store_true", help="do not read or write the cache")
+    parser.add_argument("--cache-path", default=str(DEFAULT_CACHE_PATH))
+    parser.add_argument("--diff", action="store_true",
+                        help="write only hosts added/removed since the last run")
+    parser.add_argument("--history-path", default=str(DEFAULT_HISTORY_PATH))
+    parser.add_argument("--no-history", action="store_true", help="do not record this run")
+    parser.add_argument("--sources", type=lambda v: v.split(","), help="comma separated sources to run (default: all enabled)")
+    parser.add_argument("--exclude-sources", type=lambda v: v.split(","), help="comma separated sources to skip")
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--domains-file", help="scan every root domain listed in this file")
+    batch.add_argument("--out-dir", default="results", help="where per-domain results are written")
+    batch.add_argument("--max-in-flight", type=int, default=100,
+                       help="requests in flight across all domains")
+    batch.add_argument("--domain-concurrency", type=int, default=20,
+                       help="domains scanned at the same time")
+    metrics = parser.add_argument_group("metrics")
+    metrics.add_argument("--metrics-json", help="write per-source and per-stage metrics to this file")
+    metrics.add_argument("--metrics-port", type=int,
+                         help="serve Prometheus metrics on 127.0.0.1:PORT/metrics during the scan")
+    parser.add_argument("--stream", help="append hosts to this file as they are found")
+    parser.add_argument("--stream-format", choices=[f.name.lower() for f in OutputFormat],
+                        help="format of --stream (default: from its extension)")
+    parser.add_argument("--enrich", action="store_true",
+                        help="fill in ips, cloud and server of each streamed host")
+    parser.add_argument("--dns-cache", help="keep DNS answers in this file across runs (with --enrich)")
+    args = parser.parse_args(argv)
+    if args.diff and args.no_history:
+        parser.error("--diff needs the history store")
+    if args.enrich and not args.stream:
+        parser.error("--enrich fills in the --stream output; give --stream too")
+    if args.dns_cache and not args.enrich:
+        parser.error("--dns-cache is only used by --enrich")
+    if args.stream_format:
+        args.stream_format = OutputFormat[args.stream_format.upper()]
+    return args
+
 def main():
-    # domain from argv or default
-    if len(sys.argv) >= 2:
-        domain = sys.argv[1].strip().lower()
+    args = parse_args()
+    domain = args.domain.strip().lower()
+
+    cache = None if args.no_cache else ResponseCache(args.cache_path)
+    if args.refresh:
+        cache_mode = CacheMode.REFRESH
+    elif args.cache_only:
+        cache_mode = CacheMode.CACHE_ONLY
     else:
-        domain = "example.com"   # change default if you want
+        cache_mode = CacheMode.NORMAL
+    history = None if args.no_history else HistoryStore(args.history_path)
+    metrics = Metrics() if args.metrics_json or args.metrics_port else None
+    # one DNS cache for every resolver of the run
+    dns_cache = DNSCache(path=args.dns_cache) if args.dns_cache else None
+
+    if args.domains_file:
+        domains = load_domains(args.domains_file)
+        print(f"[+] Scanning services for {len(domains)} domains")
+        try:
+            total = asyncio.run(serving_metrics(streaming(
+                lambda stream: scan_batch(domains, args.out_dir, cache, cache_mode,
+                                          args.max_in_flight, args.domain_concurrency, args.sources,
+                                          args.exclude_sources, history, args.diff, metrics, stream),
+                args.stream, args.stream_format, args.enrich, metrics, dns_cache),
+                metrics, args.metrics_port))
+        finally:
+            if dns_cache is not None:
+                dns_cache.close()
+            if cache is not None:
+                cache.close()
+            if history is not None:
+                history.close()
+        print(f"[+] Wrote results for {len(domains)} domains to {args.out_dir} ({total} hosts)")
+        write_metrics(metrics, args.metrics_json)
+        return
 
     print(f"[+] Scanning services for domain: {domain}")
 
-    raw_results = asyncio.run(scan_services(domain))
+    try:
+        skip = known_hosts(history, domain) if args.diff else None
+        raw_results, status = asyncio.run(serving_metrics(streaming(
+            lambda stream: scan_services(domain, cache, cache_mode, args.sources,
+                                         args.exclude_sources, metrics, stream, skip),
+            args.stream, args.stream_format, args.enrich, metrics, dns_cache),
+            metrics, args.metrics_port))
+        diff = record_history(history, domain, raw_results, status) if history is not None else None
+    finally:
+        if dns_cache is not None:
+            dns_cache.close()
+        if cache is not None:
+            cache.close()
+        if history is not None:
+            history.close()
     print(f"[+] Raw results fetched: {len(raw_results)} items")
 
+    if args.diff:
+        save_diff("diff_results", diff)
+        print(f"[+] Wrote diff_results.json and diff_results.csv "
+              f"({len(diff.added)} added, {len(diff.removed)} removed)")
+        for s in diff.added[:30]:
+            print(f"+ {s}")
+        for s in diff.removed[:30]:
+            print(f"- {s}")
+        write_metrics(metrics, args.metrics_json)
+        return
+
     # Save raw results as list
     raw_list = list(raw_results)
     save_json("raw_results.json", {"domain": domain, "raw": raw_list})
     print("[+] Wrote raw_results.json")
 
     # Clean and dedupe
-    cleaned = clean_and_dedupe(raw_list, domain)
+    cleaned = clean_and_dedupe(raw_list, domain, metrics)
+    write_metrics(metrics, args.metrics_json)
     save_json("cleaned_results.json", {"domain": domain, "subdomains": cleaned})
     save_csv("cleaned_results.csv", cleaned)
     print(f"[+] Wrote cleaned_results.json and cleaned_results.csv ({len(cleaned)} hosts)")
@@ -1,8 +1,23 @@
 # cloud_detector.py
 
+import socket
+
 import dns.resolver
 import requests
-import socket
+
+from subdomainfinder.enrichment import (
+    enrich_host,
+    enrich_many,
+    provider_from_cname,
+    provider_from_headers,
+    provider_from_ip,
+)
+
+
+# Caches answers for their TTL, so repeated lookups are answered locally
+_resolver = dns.resolver.Resolver()
+_resolver.cache = dns.resolver.LRUCache()
+
 
 def detect_cloud(subdomain):
     provider = "Unknown"
@@ -14,30 +29,10 @@ def detect_cloud(subdomain):
     # 1. Lấy CNAME (DNS)
     # ---------------------
     try:
-        answers = dns.resolver.resolve(subdomain, "CNAME")
+        answers = _resolver.resolve(subdomain, "CNAME")
         for r in answers:
             cname = str(r.target).lower()
-
-            # AWS CloudFront
-            if ".cloudfront.net" in cname:
-                provider = "AWS (CloudFront)"
-
-            # AWS ELB
-            elif ".elb.amazonaws.com" in cname:
-                provider = "AWS (ELB)"
-
-            # Google Cloud
-            elif ".googleusercontent.com" in cname or ".gcp." in cname:
-                provider = "GCP"
-
-            # Azure
-            elif ".azurewebsites.net" in cname or ".cloudapp.net" in cname:
-                provider = "Azure"
-
-            # Cloudflare (cname thường không leak)
-            elif ".cdn.cloudflare.net" in cname:
-                provider = "Cloudflare"
-
+            provider = provider_from_cname(cname) or provider
     except:
         pass
 
@@ -46,18 +41,7 @@ def detect_cloud(subdomain):
     # ---------------------
     try:
         ip = socket.gethostbyname(subdomain)
-
-        if ip.startswith(("13.", "18.", "52.", "54.")):
-            provider = "AWS"
-
-        elif ip.startswith(("34.", "35.", "36.")):
-            provider = "GCP"
-
-        elif ip.startswith(("20.", "40.", "52.")):
-            provider = "Azure"
-
-        elif ip.startswith(("104.", "172.", "188.")):
-            provider = "Cloudflare"
+        provider = provider_from_ip(ip) or provider
     except:
         pass
 
@@ -66,26 +50,7 @@ def detect_cloud(subdomain):
     # ---------------------
     try:
         r = requests.get(f"https://{subdomain}", timeout=3)
-        headers = r.headers
-
-        if "Server" in headers:
-            server = headers["Server"].lower()
-
-            if "cloudflare" in server:
-                header_provider = "Cloudflare"
-
-            if "gws" in server:  # google web server
-                header_provider = "GCP"
-
-        if "CF-Ray" in headers:
-            header_provider = "Cloudflare"
-
-        if "X-Amz-Cf-Id" in headers:
-            header_provider = "AWS CloudFront"
-
-        if "x-azure-ref" in headers:
-            header_provider = "Azure"
-
+        header_provider = provider_from_headers(r.headers)
     except:
         pass
 
@@ -97,3 +62,32 @@ def detect_cloud(subdomain):
         "cname": cname,
         "ip": ip
     }
+
+
+# ---------------------
+# Async batch mode
+# ---------------------
+def _cloud_fields(result):
+    return {
+        "provider": result["provider"],
+        "cname": result["cname"],
+        "ip": result["ip"]
+    }
+
+
+async def detect_cloud_async(subdomain, resolver, session):
+    """Same verdict as detect_cloud(), from one DNS query and one HTTP exchange."""
+    return _cloud_fields(await enrich_host(subdomain, resolver, session))
+
+
+async def detect_cloud_many(subdomains, concurrency=100, resolver=None, session=None, metrics=None,
+                            dns_cache=None):
+    """
+    Run detect_cloud over many hosts, sharing one DNS resolver and one HTTP
+    connection pool. Yields (subdomain, result) pairs as they complete.
+    Use subdomainfinder.enrichment.enrich_many to get the webserver verdict
+    from the same requests.
+    """
+    async for subdomain, result in enrich_many(subdomains, concurrency, resolver, session, metrics,
+                                               dns_cache):
+        yield subdomain, _cloud_fields(result)
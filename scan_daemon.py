@@ -0,0 +1,101 @@
+# scan_daemon.py
+# Usage:
+#   python scan_daemon.py [--port 8787]
+#
+# Local scan service for the browser extension (MySubdomainTool). Instead of
+# every popup querying the sources itself, the extension asks the daemon:
+#
+#   GET /scan?domain=example.com[&refresh=1]   NDJSON progress: a "start"
+#       event, "hosts" batches ([host, source] pairs) as they are found and
+#       a "done" event with each source's outcome
+#   GET /results?domain=example.com            last result as JSON (404 if none)
+#   GET /status                                scans in progress, cache size
+#
+# Concurrent scans of one domain share a single upstream fetch, and results
+# are served without touching the sources for --result-ttl seconds (kept in
+# ~/.cache/subdomainfinder/history.sqlite, so across restarts too). Source
+# responses are cached as for clean_results.py.
+#
+# Every request must send the daemon's token in the header
+# "X-SubdomainFinder: <token>". The token is --token (or
+# SUBDOMAINFINDER_DAEMON_TOKEN), else a random one created on first start and
+# kept in ~/.cache/subdomainfinder/daemon.token; it is printed at startup.
+# Paste it into DAEMON_TOKEN in MySubdomainTool/popup.js. Web pages cannot add
+# the header without a CORS preflight, which the daemon never grants, and
+# requests whose Origin is not a browser extension are refused as well.
+#
+# To share a daemon with the team, use e.g. --host 0.0.0.0 and point
+# DAEMON_URL in popup.js and the manifest host_permissions at it.
+
+import argparse
+import asyncio
+import os
+
+from subdomainfinder.cache import DEFAULT_CACHE_PATH, ResponseCache
+from subdomainfinder.daemon import DEFAULT_DAEMON_PORT, DEFAULT_TOKEN_PATH, ScanDaemon, load_token, serve_daemon
+from subdomainfinder.enums import CacheMode
+from subdomainfinder.history import DEFAULT_HISTORY_PATH, HistoryStore
+from subdomainfinder.metrics import Metrics, serve_metrics
+from subdomainfinder.sources import HOUR
+from subdomainfinder.utils import setup_logging
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve scans to the browser extension.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_DAEMON_PORT)
+    parser.add_argument("--token", default=os.environ.get("SUBDOMAINFINDER_DAEMON_TOKEN"),
+                        help="secret clients must send (default: the one in --token-path)")
+    parser.add_argument("--token-path", default=str(DEFAULT_TOKEN_PATH),
+                        help="where the generated token is kept when --token is not given")
+    parser.add_argument("--result-ttl", type=float, default=HOUR,
+                        help="seconds a finished scan is served before scanning again")
+    parser.add_argument("--scan-concurrency", type=int, default=4, help="domains scanned at once")
+    parser.add_argument("--max-in-flight", type=int, default=100,
+                        help="requests in flight across all scans")
+    parser.add_argument("--cache-path", default=str(DEFAULT_CACHE_PATH))
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the cache")
+    parser.add_argument("--history-path", default=str(DEFAULT_HISTORY_PATH))
+    parser.add_argument("--no-history", action="store_true",
+                        help="keep results in memory only, do not record runs")
+    parser.add_argument("--sources", type=lambda v: v.split(","), help="comma separated sources to run (default: all enabled)")
+    parser.add_argument("--exclude-sources", type=lambda v: v.split(","), help="comma separated sources to skip")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+async def run(args):
+    cache = None if args.no_cache else ResponseCache(args.cache_path)
+    history = None if args.no_history else HistoryStore(args.history_path)
+    metrics = Metrics() if args.metrics_port else None
+    token = args.token or load_token(args.token_path)
+    daemon = ScanDaemon(cache=cache, cache_mode=CacheMode.NORMAL, history=history,
+                        result_ttl=args.result_ttl, max_in_flight=args.max_in_flight,
+                        scan_concurrency=args.scan_concurrency, sources=args.sources,
+                        disabled=args.exclude_sources, metrics=metrics, token=token)
+    runner = await serve_daemon(daemon, args.host, args.port)
+    metrics_runner = await serve_metrics(metrics, port=args.metrics_port) if metrics else None
+    print(f"[+] Scan daemon listening on http://{args.host}:{args.port} "
+          f"(sources: {', '.join(daemon.sources)})")
+    print(f"[+] Token: {token}" + ("" if args.token else f" (kept in {args.token_path})"))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if cache is not None:
+            cache.close()
+        if history is not None:
+            history.close()
+
+def main():
+    args = parse_args()
+    setup_logging(args.verbose)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
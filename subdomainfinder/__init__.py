@@ -1,6 +1,24 @@
+from . import batch
 from . import brute_force
+from . import cache
+from . import cloud_ranges
+from . import daemon
+from . import dnscache
+from . import enrichment
+from . import history
+from . import hoststore
+from . import jsonstream
+from . import metrics
+from . import parsing
+from . import permutations
+from . import ratelimit
+from . import recursive
+from . import resolver
 from . import services
+from . import sources
 from . import utils
 from . import enums
+from . import wildcard
+from . import writers
 
-__all__ = ['brute_force', 'services', 'utils', 'enums']
\ No newline at end of file
+__all__ = ['batch', 'brute_force', 'cache', 'cloud_ranges', 'daemon', 'dnscache', 'enrichment', 'history', 'hoststore', 'jsonstream', 'metrics', 'parsing', 'permutations', 'ratelimit', 'recursive', 'resolver', 'services', 'sources', 'utils', 'enums', 'wildcard', 'writers']
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import aiohttp
+
+from .cache import ResponseCache
+from .enums import CacheMode
+from .metrics import Metrics
+from .ratelimit import RequestLimiter
+from .services import DEFAULT_SOURCE_TIMEOUT, ServiceScanner
+from .sources import select_sources
+
+
+@dataclass
+class DomainResult:
+    domain: str
+    found: Dict[str, Set[str]] = field(default_factory=dict)  # host -> sources
+    source_status: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def subdomains(self) -> Set[str]:
+        return set(self.found)
+
+
+def load_domains(path: str) -> List[str]:
+    """Read root domains, one per line; blank lines and ``#`` comments are skipped."""
+    domains = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip().lower()
+            if line:
+                domains.append(line)
+    return list(dict.fromkeys(domains))
+
+
+class BatchScanner:
+    """Passive scan of many root domains over one shared connection pool.
+
+    All domains share one ``aiohttp`` session and one ``RequestLimiter``, so
+    ``max_in_flight`` bounds requests across the whole batch and the
+    per-source rates hold however many domains are being scanned. A source
+    that keeps throttling is backed off and, if it stays down, skipped by every
+    domain until its circuit closes; ``source_states()`` reports where each
+    source stands. ``domain_concurrency`` domains are in progress at any time.
+    ``metrics`` collects per-source measurements over the whole batch.
+    """
+
+    def __init__(self, domains: Iterable[str], cache: Optional[ResponseCache] = None,
+                 cache_mode: CacheMode = CacheMode.NORMAL, max_in_flight: int = 100,
+                 domain_concurrency: int = 20, source_rates: Optional[Dict[str, float]] = None,
+                 source_timeout: Optional[float] = DEFAULT_SOURCE_TIMEOUT,
+                 budget: Optional[float] = None, sources: Optional[Iterable[str]] = None,
+                 disabled: Optional[Iterable[str]] = None,
+                 metrics: Optional[Metrics] = None):
+        self.domains = list(dict.fromkeys(d.strip().lower() for d in domains if d.strip()))
+        self.cache = cache
+        self.cache_mode = cache_mode
+        self.max_in_flight = max_in_flight
+        self.domain_concurrency = domain_concurrency
+        self.source_rates = source_rates
+        self.source_timeout = source_timeout
+        self.budget = budget
+        # Resolved once so every domain runs the same sources
+        self.sources = [source.name for source in select_sources(sources, disabled)]
+        self.limiter = RequestLimiter(max_in_flight, source_rates)
+        self.metrics = metrics
+        self.logger = logging.getLogger('subdomainfinder.batch')
+
+    def source_states(self) -> Dict[str, Dict[str, object]]:
+        """Circuit state, current rate and concurrency window of each source."""
+        return self.limiter.states()
+
+    async def _events(self) -> AsyncIterator[Tuple[str, Optional[str], Optional[object]]]:
+        """Yield ``(domain, source, host)`` per host and ``(domain, None, status)`` when a domain ends."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        done = object()
+        semaphore = asyncio.Semaphore(self.domain_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=0,
+                                         ttl_dns_cache=300)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def run(domain):
+                async with semaphore:
+                    scanner = ServiceScanner(domain, cache=self.cache, cache_mode=self.cache_mode,
+                                             session=session, limiter=self.limiter,
+                                             sources=self.sources, disabled=(),
+                                             metrics=self.metrics)
+                    try:
+                        async for source, host in scanner.scan_iter(self.source_timeout, self.budget):
+                            await queue.put((domain, source, host))
+                    except Exception as e:
+                        self.logger.debug(f"[{domain}] scan failed: {e!r}")
+                    await queue.put((domain, None, scanner.source_status))
+
+            async def feed():
+                await asyncio.gather(*(run(domain) for domain in self.domains))
+                await queue.put(done)
+
+            feeder = asyncio.ensure_future(feed())
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    yield item
+            finally:
+                feeder.cancel()
+                await asyncio.gather(feeder, return_exceptions=True)
+
+    async def scan_iter(self) -> AsyncIterator[Tuple[str, str, str]]:
+        """Yield ``(domain, source, subdomain)`` across all domains as they are found."""
+        async for domain, source, host in self._events():
+            if source is not None:
+                yield domain, source, host
+
+    async def results(self) -> AsyncIterator[DomainResult]:
+        """Yield one ``DomainResult`` per domain as soon as that domain finishes."""
+        pending: Dict[str, DomainResult] = {}
+        async for domain, source, value in self._events():
+            result = pending.setdefault(domain, DomainResult(domain))
+            if source is None:
+                result.source_status = value
+                yield pending.pop(domain)
+            else:
+                result.found.setdefault(value, set()).add(source)
+
+    async def scan(self) -> Dict[str, Set[str]]:
+        found = {result.domain: result.subdomains async for result in self.results()}
+        self.logger.info(f"[Batch] Scanned {len(found)} domains, "
+                         f"{sum(len(s) for s in found.values())} subdomains")
+        return found
@@ -0,0 +1,118 @@
+import abc
+import asyncio
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Iterator, Optional, Sequence, Set, Union
+
+from .resolver import AsyncResolver, DNSAnswer
+from .utils import bounded_as_completed
+from .wildcard import WildcardFilter
+
+if TYPE_CHECKING:
+    from .dnscache import DNSCache
+
+DEFAULT_WORDLIST = Path(__file__).resolve().parent.parent / 'wordlists' / 'default.txt'
+
+
+def load_wordlist(path: Union[str, Path] = DEFAULT_WORDLIST) -> Iterator[str]:
+    """Lazily yield words from a wordlist, skipping blanks, comments and repeats."""
+    seen = set()
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower().strip('.')
+            if word and not word.startswith('#') and word not in seen:
+                seen.add(word)
+                yield word
+
+
+async def resolve_many(resolver: AsyncResolver, names: Iterable[str], rdtype: str = 'A',
+                       concurrency: int = 1000) -> AsyncIterator[DNSAnswer]:
+    """Resolve ``names`` with at most ``concurrency`` lookups in flight.
+
+    Answers are yielded in completion order. Names that still time out after
+    the resolver's retries, that cannot be encoded, or whose query fails at
+    the socket level are skipped.
+    """
+    logger = logging.getLogger('subdomainfinder.brute_force')
+
+    async def lookup(name: str) -> Optional[DNSAnswer]:
+        try:
+            return await resolver.resolve(name, rdtype)
+        except asyncio.TimeoutError:
+            logger.debug(f"Timed out resolving {name}")
+        except ValueError:
+            logger.debug(f"Skipping unencodable name {name!r}")
+        except OSError as e:
+            logger.debug(f"Failed to resolve {name}: {e}")
+        return None
+
+    async for answer in bounded_as_completed(lookup, names, concurrency):
+        yield answer
+
+
+class ResolvingScanner(abc.ABC):
+    """Resolves the names from ``candidates()``, keeping those that exist.
+
+    Without a ``resolver`` one is created from ``nameservers``, ``timeout``,
+    ``retries`` and the run's ``dns_cache``, and closed when ``run`` ends.
+    Wildcard matches are dropped unless ``filter_wildcards`` is off.
+    """
+
+    def __init__(self, domain: str, resolver: Optional[AsyncResolver] = None,
+                 concurrency: int = 1000, nameservers: Optional[Sequence[str]] = None,
+                 timeout: float = 2.0, retries: int = 2, filter_wildcards: bool = True,
+                 dns_cache: Optional['DNSCache'] = None):
+        self.domain = domain.lower().strip('.')
+        self._owns_resolver = resolver is None
+        self.resolver = resolver or AsyncResolver(nameservers, timeout=timeout, retries=retries,
+                                                  max_in_flight=concurrency, cache=dns_cache)
+        self.concurrency = concurrency
+        self.wildcards = WildcardFilter(self.resolver) if filter_wildcards else None
+
+    @abc.abstractmethod
+    def candidates(self) -> Iterator[str]:
+        """Yield the names to resolve."""
+
+    async def run(self) -> AsyncIterator[DNSAnswer]:
+        """Stream answers for candidates that resolve, minus wildcard matches."""
+        answers = (
+            answer async for answer in resolve_many(self.resolver, self.candidates(),
+                                                    concurrency=self.concurrency)
+            if answer.found
+        )
+        if self.wildcards is not None:
+            answers = self.wildcards.filter(answers)
+        try:
+            async for answer in answers:
+                yield answer
+        finally:
+            if self._owns_resolver:
+                self.resolver.close()
+
+
+class BruteForcer(ResolvingScanner):
+    """Wordlist-driven DNS brute force of ``<word>.<domain>`` candidates."""
+
+    def __init__(self, domain: str, wordlist: Union[str, Path, Iterable[str], None] = None,
+                 resolver: Optional[AsyncResolver] = None, concurrency: int = 1000,
+                 nameservers: Optional[Sequence[str]] = None, timeout: float = 2.0,
+                 retries: int = 2, filter_wildcards: bool = True,
+                 dns_cache: Optional['DNSCache'] = None):
+        super().__init__(domain, resolver, concurrency, nameservers, timeout, retries,
+                         filter_wildcards, dns_cache)
+        self.wordlist = wordlist if wordlist is not None else DEFAULT_WORDLIST
+        self.logger = logging.getLogger('subdomainfinder.brute_force')
+
+    def candidates(self) -> Iterator[str]:
+        words = (load_wordlist(self.wordlist)
+                 if isinstance(self.wordlist, (str, Path)) else self.wordlist)
+        for word in words:
+            yield f"{word}.{self.domain}"
+
+    async def scan(self) -> Set[str]:
+        self.logger.info(f"Running DNS brute force for {self.domain}")
+        found = {answer.name async for answer in self.run()}
+        if self.wildcards is not None and self.wildcards.dropped:
+            self.logger.info(f"[BruteForce] Dropped {self.wildcards.dropped} wildcard matches")
+        self.logger.info(f"[BruteForce] Found {len(found)} subdomains")
+        return found
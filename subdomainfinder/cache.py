@@ -0,0 +1,173 @@
+import mmap
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+from .sources import DAY, SOURCES
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'subdomainfinder' / 'responses.sqlite'
+
+# How long a stored response is served without asking the source again
+DEFAULT_TTLS: Dict[str, int] = {name: source.ttl for name, source in SOURCES.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    source TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    PRIMARY KEY (source, key)
+) WITHOUT ROWID
+"""
+
+
+@dataclass
+class CachedResponse:
+    compressed: bytes
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        return zlib.decompress(self.compressed)
+
+    def iter_body(self, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """Decompress the body incrementally."""
+        decompressor = zlib.decompressobj()
+        for i in range(0, len(self.compressed), chunk_size):
+            chunk = decompressor.decompress(self.compressed[i:i + chunk_size])
+            if chunk:
+                yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+
+class BodyWriter:
+    """Compresses a response body into a temporary file as it arrives.
+
+    ``commit`` stores it in the cache; until then nothing is stored, so a
+    failed or abandoned download leaves the cached entry as it was. Only
+    one chunk is in memory at a time; the compressed body is handed to
+    SQLite from a memory map of the file. ``commit`` may run in a worker
+    thread; ``close`` then waits for it.
+    """
+
+    def __init__(self, cache: 'ResponseCache', source: str, key: str,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.cache = cache
+        self.source = source
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self._compressor = zlib.compressobj(6)
+        self._file = tempfile.TemporaryFile(dir=cache.path.parent, prefix='body-')
+        self._lock = threading.Lock()
+
+    def write(self, chunk: bytes):
+        self._file.write(self._compressor.compress(chunk))
+
+    def commit(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            try:
+                self._file.write(self._compressor.flush())
+                self._file.flush()
+                with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as compressed:
+                    self.cache.put_compressed(self.source, self.key, memoryview(compressed),
+                                              self.etag, self.last_modified)
+            finally:
+                self._file.close()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> 'BodyWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResponseCache:
+    """SQLite store of zlib-compressed source responses keyed by (source, key).
+
+    Safe to use from several threads, so large bodies can be stored off the
+    event loop.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH,
+                 ttls: Optional[Dict[str, int]] = None, default_ttl: int = DAY):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> 'ResponseCache':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, source: str, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, fetched_at, etag, last_modified FROM responses WHERE source = ? AND key = ?',
+                (source, key)).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(*row)
+
+    def is_fresh(self, source: str, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched_at < self.ttls.get(source, self.default_ttl)
+
+    def put(self, source: str, key: str, body: bytes,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.put_compressed(source, key, zlib.compress(body, 6), etag, last_modified)
+
+    def put_compressed(self, source: str, key: str, compressed: Union[bytes, memoryview],
+                       etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a body that was zlib-compressed by the caller (e.g. while streaming)."""
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (source, key, time.time(), etag, last_modified, compressed))
+            self._db.commit()
+
+    def writer(self, source: str, key: str, etag: Optional[str] = None,
+               last_modified: Optional[str] = None) -> BodyWriter:
+        """A ``BodyWriter`` that stores a streamed body under ``(source, key)`` on commit."""
+        return BodyWriter(self, source, key, etag, last_modified)
+
+    def touch(self, source: str, key: str):
+        """Mark an entry as just revalidated (e.g. after a 304)."""
+        with self._lock:
+            self._db.execute('UPDATE responses SET fetched_at = ? WHERE source = ? AND key = ?',
+                             (time.time(), source, key))
+            self._db.commit()
+
+    def purge(self, source: Optional[str] = None):
+        with self._lock:
+            if source is None:
+                self._db.execute('DELETE FROM responses')
+            else:
+                self._db.execute('DELETE FROM responses WHERE source = ?', (source,))
+            self._db.commit()
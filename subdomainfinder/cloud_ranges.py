@@ -0,0 +1,256 @@
+import bisect
+import ipaddress
+import json
+import logging
+import socket
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+RANGES_DIR = Path(__file__).resolve().parent.parent / 'cloud_ranges'
+DEFAULT_INDEX = RANGES_DIR / 'index.bin'
+
+PROVIDER_NAMES = {
+    'aws': 'AWS',
+    'gcp': 'GCP',
+    'azure': 'Azure',
+    'cloudflare': 'Cloudflare',
+}
+
+_MAGIC = b'SDCR'
+_VERSION = 1
+_HEAD = struct.Struct('<4sBH')
+_COUNTS = struct.Struct('<II')
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def _json_prefixes(data) -> Iterator[str]:
+    """Yield CIDRs from AWS, GCP or Azure range documents."""
+    if isinstance(data, dict) and 'values' in data:  # Azure service tags
+        for value in data['values']:
+            yield from value.get('properties', {}).get('addressPrefixes', [])
+        return
+    for key in ('prefixes', 'ipv6_prefixes'):  # AWS, GCP
+        for entry in data.get(key, []):
+            for field in ('ip_prefix', 'ipv6_prefix', 'ipv4Prefix', 'ipv6Prefix'):
+                if field in entry:
+                    yield entry[field]
+
+
+def read_range_file(path: Union[str, Path]) -> Iterator[Network]:
+    """Yield networks from a JSON range document or a one-CIDR-per-line text file."""
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    if path.suffix == '.json':
+        prefixes = _json_prefixes(json.loads(text))
+    else:
+        prefixes = (line.split('#')[0].strip() for line in text.splitlines())
+    for prefix in prefixes:
+        if prefix:
+            yield ipaddress.ip_network(prefix, strict=False)
+
+
+def _flatten(ranges: List[Tuple[int, int, int]]) -> Tuple[List[int], List[int], List[int]]:
+    """Turn nested/disjoint ranges into sorted non-overlapping segments.
+
+    CIDR blocks are either nested or disjoint, so a stack sweep suffices; the
+    most specific block wins where blocks nest.
+    """
+    starts: List[int] = []
+    ends: List[int] = []
+    ids: List[int] = []
+
+    def emit(start, end, pid):
+        if start > end:
+            return
+        if ids and ids[-1] == pid and ends[-1] + 1 == start:
+            ends[-1] = end
+            return
+        starts.append(start)
+        ends.append(end)
+        ids.append(pid)
+
+    stack: List[Tuple[int, int, int]] = []
+    cursor = 0
+    for start, end, pid in sorted(ranges, key=lambda r: (r[0], -r[1])):
+        while stack and stack[-1][1] < start:
+            _, top_end, top_pid = stack.pop()
+            emit(cursor, top_end, top_pid)
+            cursor = top_end + 1
+        if stack:
+            emit(cursor, start - 1, stack[-1][2])
+        stack.append((start, end, pid))
+        cursor = start
+    while stack:
+        _, top_end, top_pid = stack.pop()
+        emit(cursor, top_end, top_pid)
+        cursor = top_end + 1
+    return starts, ends, ids
+
+
+def _parse_ip(ip: str) -> Tuple[int, int]:
+    """Return (version, integer) for an address string; raises OSError if invalid."""
+    if ':' in ip:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+
+
+class ProviderIndex:
+    """Sorted-interval index mapping IPv4/IPv6 addresses to cloud providers."""
+
+    def __init__(self, providers: Sequence[str], v4: Tuple[List[int], List[int], List[int]],
+                 v6: Tuple[List[int], List[int], List[int]]):
+        self.providers = list(providers)
+        self._tables = {4: v4, 6: v6}
+
+    @classmethod
+    def from_networks(cls, networks: Iterable[Tuple[str, Network]]) -> 'ProviderIndex':
+        providers: List[str] = []
+        pids: Dict[str, int] = {}
+        ranges: Dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+        for provider, network in networks:
+            if provider not in pids:
+                pids[provider] = len(providers)
+                providers.append(provider)
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), pids[provider]))
+        return cls(providers, _flatten(ranges[4]), _flatten(ranges[6]))
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, Path] = RANGES_DIR) -> 'ProviderIndex':
+        """Build from ``<provider>[-suffix].{json,txt}`` files, e.g. ``aws.json``."""
+        def networks():
+            for path in sorted(Path(directory).iterdir()):
+                if path.suffix not in ('.json', '.txt'):
+                    continue
+                key = path.stem.split('-')[0].lower()
+                provider = PROVIDER_NAMES.get(key, key.title())
+                for network in read_range_file(path):
+                    yield provider, network
+        return cls.from_networks(networks())
+
+    def __len__(self) -> int:
+        return len(self._tables[4][0]) + len(self._tables[6][0])
+
+    def classify_ip(self, ip: str) -> Optional[str]:
+        """Return the provider owning ``ip``, or None."""
+        try:
+            version, value = _parse_ip(ip)
+        except OSError:
+            return None
+        starts, ends, ids = self._tables[version]
+        i = bisect.bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return self.providers[ids[i]]
+        return None
+
+    def classify_ips(self, ips: Iterable[str]) -> List[Optional[str]]:
+        """Classify many addresses; returns providers in input order."""
+        providers = self.providers
+        tables = self._tables
+        search = bisect.bisect_right
+        out: List[Optional[str]] = []
+        append = out.append
+        for ip in ips:
+            try:
+                version, value = _parse_ip(ip)
+            except OSError:
+                append(None)
+                continue
+            starts, ends, ids = tables[version]
+            i = search(starts, value) - 1
+            append(providers[ids[i]] if i >= 0 and value <= ends[i] else None)
+        return out
+
+    # -----------------------------
+    # Binary serialisation
+    # -----------------------------
+    def to_bytes(self) -> bytes:
+        names = [p.encode('utf-8') for p in self.providers]
+        v4_starts, v4_ends, v4_ids = self._tables[4]
+        v6_starts, v6_ends, v6_ids = self._tables[6]
+
+        out = bytearray(_HEAD.pack(_MAGIC, _VERSION, len(names)))
+        for name in names:
+            out.append(len(name))
+            out += name
+        out += _COUNTS.pack(len(v4_starts), len(v6_starts))
+        for values, code in ((v4_starts, 'I'), (v4_ends, 'I'), (v4_ids, 'H'), (v6_ids, 'H')):
+            arr = array(code, values)
+            if sys.byteorder == 'big':
+                arr.byteswap()
+            out += arr.tobytes()
+        for value in v6_starts + v6_ends:
+            out += value.to_bytes(16, 'big')
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ProviderIndex':
+        magic, version, nproviders = _HEAD.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not a provider index file')
+        offset = _HEAD.size
+        providers = []
+        for _ in range(nproviders):
+            length = data[offset]
+            providers.append(data[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+        n4, n6 = _COUNTS.unpack_from(data, offset)
+        offset += _COUNTS.size
+
+        def take(code, count):
+            nonlocal offset
+            arr = array(code)
+            size = arr.itemsize * count
+            arr.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                arr.byteswap()
+            offset += size
+            return arr.tolist()
+
+        v4 = (take('I', n4), take('I', n4), take('H', n4))
+        v6_ids = take('H', n6)
+        v6_bounds = [int.from_bytes(data[i:i + 16], 'big')
+                     for i in range(offset, offset + 32 * n6, 16)]
+        v6 = (v6_bounds[:n6], v6_bounds[n6:], v6_ids)
+        return cls(providers, v4, v6)
+
+    def save(self, path: Union[str, Path] = DEFAULT_INDEX):
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = DEFAULT_INDEX) -> 'ProviderIndex':
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+_default_index: Optional[ProviderIndex] = None
+
+
+def default_index() -> ProviderIndex:
+    """Load the compiled index, falling back to building from ``cloud_ranges/``."""
+    global _default_index
+    if _default_index is None:
+        logger = logging.getLogger('subdomainfinder.cloud_ranges')
+        if DEFAULT_INDEX.exists():
+            _default_index = ProviderIndex.load(DEFAULT_INDEX)
+        else:
+            logger.debug(f"{DEFAULT_INDEX} not found, building index from {RANGES_DIR}")
+            _default_index = ProviderIndex.from_directory(RANGES_DIR)
+        missing = [p for p in PROVIDER_NAMES.values() if p not in _default_index.providers]
+        if missing:
+            logger.warning(f"No published ranges for {', '.join(missing)}; their addresses "
+                           f"are reported as Unknown (run build_cloud_index.py --fetch)")
+    return _default_index
+
+
+def classify_ip(ip: str) -> Optional[str]:
+    """Classify an address against the default index."""
+    return default_index().classify_ip(ip)
+
+
+def classify_ips(ips: Iterable[str]) -> List[Optional[str]]:
+    """Classify addresses against the default index."""
+    return default_index().classify_ips(ips)
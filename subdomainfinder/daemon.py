@@ -0,0 +1,327 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import aiohttp
+from aiohttp import web
+
+from .cache import ResponseCache
+from .enums import CacheMode
+from .history import HistoryStore
+from .metrics import Metrics
+from .ratelimit import RequestLimiter
+from .services import DEFAULT_SOURCE_TIMEOUT, ServiceScanner
+from .sources import HOUR, select_sources
+from .utils import is_valid_subdomain, validator_for
+
+DEFAULT_DAEMON_PORT = 8787
+DEFAULT_TOKEN_PATH = Path.home() / '.cache' / 'subdomainfinder' / 'daemon.token'
+
+# Hosts per progress event, so each NDJSON line stays small enough for any client to buffer
+EVENT_HOSTS = 1000
+
+# Origins of browser extensions; any other page is refused so websites cannot start scans
+_EXTENSION_SCHEMES = ('chrome-extension://', 'moz-extension://', 'safari-web-extension://')
+
+# Required on every request. A page cannot add a custom header without a CORS
+# preflight, which the daemon never grants, so only the extension (exempt
+# through its host permissions) and local tools can call it. Its value must
+# be the daemon's token, so other local processes cannot drive scans either.
+AUTH_HEADER = 'X-SubdomainFinder'
+
+
+@dataclass
+class ScanResult:
+    domain: str
+    found: Dict[str, Set[str]] = field(default_factory=dict)  # valid host -> sources
+    source_status: Dict[str, str] = field(default_factory=dict)
+    finished_at: float = 0.0
+
+    def summary(self) -> Dict[str, object]:
+        return {'domain': self.domain, 'count': len(self.found), 'sources': self.source_status,
+                'finished_at': int(self.finished_at)}
+
+
+class _Scan:
+    """A scan in progress; any number of requests follow it from the first host on."""
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.events: List[Tuple[str, str]] = []  # (host, source) in the order found
+        self.result: Optional[ScanResult] = None
+        self.error: Optional[str] = None
+        self.done = False
+        self.changed = asyncio.Condition()
+        self.task: Optional['asyncio.Task[None]'] = None
+
+    async def publish(self, events: Iterable[Tuple[str, str]] = (), done: bool = False):
+        async with self.changed:
+            self.events.extend(events)
+            self.done = self.done or done
+            self.changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[List[Tuple[str, str]]]:
+        """Batches of ``(host, source)``: everything so far, then new hosts as they come."""
+        seen = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.events) > seen or self.done)
+                batch = self.events[seen:]
+                done = self.done
+            seen += len(batch)
+            for i in range(0, len(batch), EVENT_HOSTS):
+                yield batch[i:i + EVENT_HOSTS]
+            if done and seen == len(self.events):
+                return
+
+
+class ScanDaemon:
+    """Long-running scan service shared by every client, such as the browser extension.
+
+    Concurrent requests for one domain share a single scan (singleflight):
+    the first starts it and the others follow it, each receiving every host
+    found so far and then the rest as they arrive. Scans belong to the
+    daemon, so a client going away does not cancel one another client is
+    waiting on. Finished results are served without touching the sources
+    for ``result_ttl`` seconds, from memory or, across restarts, from the
+    ``history`` store. All scans share one session and one
+    ``RequestLimiter``, so source rate limits hold across clients, and
+    ``scan_concurrency`` domains are scanned at a time. Requests must carry
+    ``token`` (default: a random one) in the ``AUTH_HEADER`` header.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None,
+                 cache_mode: CacheMode = CacheMode.NORMAL,
+                 history: Optional[HistoryStore] = None, result_ttl: float = HOUR,
+                 max_results: int = 256, max_in_flight: int = 100, scan_concurrency: int = 4,
+                 source_timeout: Optional[float] = DEFAULT_SOURCE_TIMEOUT,
+                 budget: Optional[float] = None, sources: Optional[Iterable[str]] = None,
+                 disabled: Optional[Iterable[str]] = None,
+                 base_urls: Optional[Dict[str, str]] = None, metrics: Optional[Metrics] = None,
+                 token: Optional[str] = None):
+        self.cache = cache
+        self.cache_mode = cache_mode
+        self.history = history
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.max_in_flight = max_in_flight
+        self.source_timeout = source_timeout
+        self.budget = budget
+        self.sources = [source.name for source in select_sources(sources, disabled)]
+        self.base_urls = base_urls
+        self.limiter = RequestLimiter(max_in_flight)
+        self.metrics = metrics
+        self.token = token or secrets.token_urlsafe()
+        self.scans_started = 0
+        self.requests_served = 0
+        self._results: 'OrderedDict[str, ScanResult]' = OrderedDict()
+        self._scans: Dict[str, _Scan] = {}
+        self._semaphore = asyncio.Semaphore(scan_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.logger = logging.getLogger('subdomainfinder.daemon')
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=0,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        for scan in list(self._scans.values()):
+            if scan.task is not None:
+                scan.task.cancel()
+        await asyncio.gather(*(s.task for s in self._scans.values() if s.task is not None),
+                             return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+    def cached(self, domain: str) -> Optional[ScanResult]:
+        """The last result for ``domain`` if it is younger than ``result_ttl``."""
+        result = self._results.get(domain)
+        if result is None and self.history is not None:
+            last_run = self.history.last_run(domain)
+            if last_run is not None and time.time() - last_run < self.result_ttl:
+                result = ScanResult(domain, {record.host: set(record.sources)
+                                             for record in self.history.hosts(domain)},
+                                    finished_at=last_run)
+                self._remember(result)
+        if result is None or time.time() - result.finished_at >= self.result_ttl:
+            return None
+        self._results.move_to_end(domain)
+        return result
+
+    def _remember(self, result: ScanResult):
+        self._results[result.domain] = result
+        self._results.move_to_end(result.domain)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _start(self, domain: str) -> _Scan:
+        scan = self._scans.get(domain)
+        if scan is None:
+            scan = self._scans[domain] = _Scan(domain)
+            scan.task = asyncio.ensure_future(self._run(scan))
+            self.scans_started += 1
+        return scan
+
+    async def _run(self, scan: _Scan):
+        found: Dict[str, Set[str]] = {}
+        validator = validator_for(scan.domain)
+        try:
+            async with self._semaphore:
+                scanner = ServiceScanner(scan.domain, cache=self.cache, cache_mode=self.cache_mode,
+                                         session=await self._get_session(), limiter=self.limiter,
+                                         sources=self.sources, disabled=(), base_urls=self.base_urls,
+                                         metrics=self.metrics)
+                self.logger.info(f"[Daemon] Scanning {scan.domain}")
+                async for source, host in scanner.scan_iter(self.source_timeout, self.budget):
+                    new = []
+                    for valid in validator.iter_valid([host]):
+                        if valid not in found:
+                            found[valid] = set()
+                            new.append((valid, source))
+                        found[valid].add(source)
+                    if new:
+                        await scan.publish(new)
+            result = ScanResult(scan.domain, found, scanner.source_status, time.time())
+            if self.history is not None:
+                completed = [s for s, outcome in result.source_status.items() if outcome == 'ok']
+                self.history.record(scan.domain, found, completed, at=result.finished_at)
+            self._remember(result)
+            scan.result = result
+            self.logger.info(f"[Daemon] {scan.domain}: {len(found)} subdomains")
+        except asyncio.CancelledError:
+            scan.error = 'cancelled'
+            raise
+        except Exception as e:
+            self.logger.warning(f"[Daemon] {scan.domain} failed: {e!r}")
+            scan.error = type(e).__name__
+        finally:
+            self._scans.pop(scan.domain, None)
+            await scan.publish(done=True)
+
+    async def scan(self, domain: str, refresh: bool = False) -> AsyncIterator[Dict[str, object]]:
+        """Progress events of a scan of ``domain``, joining one in progress or serving a cached result.
+
+        Events are ``start``, one ``hosts`` batch per group of new hosts,
+        and ``done`` with the outcome of each source (or ``error``).
+        """
+        self.requests_served += 1
+        result = None if refresh else self.cached(domain)
+        if result is not None:
+            yield {'type': 'start', 'domain': domain, 'cached': True, 'joined': False}
+            hosts = [[host, min(sources) if sources else None]
+                     for host, sources in sorted(result.found.items())]
+            for i in range(0, len(hosts), EVENT_HOSTS):
+                yield {'type': 'hosts', 'hosts': hosts[i:i + EVENT_HOSTS]}
+            yield {'type': 'done', 'cached': True, **result.summary()}
+            return
+        joined = domain in self._scans
+        scan = self._start(domain)
+        yield {'type': 'start', 'domain': domain, 'cached': False, 'joined': joined}
+        async for batch in scan.follow():
+            yield {'type': 'hosts', 'hosts': [list(event) for event in batch]}
+        if scan.result is None:
+            yield {'type': 'error', 'domain': domain, 'error': scan.error or 'failed'}
+        else:
+            yield {'type': 'done', 'cached': False, **scan.result.summary()}
+
+    def status(self) -> Dict[str, object]:
+        return {'scanning': sorted(self._scans), 'cached': len(self._results),
+                'scans_started': self.scans_started, 'requests': self.requests_served,
+                'sources': self.sources}
+
+    def app(self) -> web.Application:
+        """``GET /scan?domain=`` (NDJSON progress), ``/results?domain=`` (JSON) and ``/status``."""
+        app = web.Application(middlewares=[_extension_only, _authorized(self.token)])
+        app.router.add_get('/scan', self._handle_scan)
+        app.router.add_get('/results', self._handle_results)
+        app.router.add_get('/status', self._handle_status)
+        app.on_cleanup.append(lambda _: self.close())
+        return app
+
+    async def _handle_scan(self, request: web.Request) -> web.StreamResponse:
+        domain = _domain(request)
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson',
+                                               'Cache-Control': 'no-store'})
+        await response.prepare(request)
+        try:
+            async for event in self.scan(domain, request.query.get('refresh') in ('1', 'true')):
+                await response.write(json.dumps(event, separators=(',', ':')).encode() + b'\n')
+        except ConnectionResetError:
+            # The scan carries on for whoever else follows it, and for the cache
+            return response
+        await response.write_eof()
+        return response
+
+    async def _handle_results(self, request: web.Request) -> web.Response:
+        domain = _domain(request)
+        result = self.cached(domain)
+        if result is None:
+            raise web.HTTPNotFound(text=json.dumps({'error': f'no recent result for {domain}'}),
+                                   content_type='application/json')
+        return web.json_response({**result.summary(), 'subdomains': sorted(result.found)})
+
+    async def _handle_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self.status())
+
+
+def _domain(request: web.Request) -> str:
+    domain = request.query.get('domain', '').strip().lower().strip('.')
+    # A root is valid when it is a valid host below its own parent
+    if '.' not in domain or not is_valid_subdomain(domain, domain.split('.', 1)[1]):
+        raise web.HTTPBadRequest(text=json.dumps({'error': 'invalid domain'}),
+                                 content_type='application/json')
+    return domain
+
+
+@web.middleware
+async def _extension_only(request: web.Request, handler):
+    origin = request.headers.get('Origin')
+    if origin is not None and not origin.startswith(_EXTENSION_SCHEMES):
+        raise web.HTTPForbidden(text=json.dumps({'error': 'origin not allowed'}),
+                                content_type='application/json')
+    return await handler(request)
+
+
+def _authorized(token: str):
+    @web.middleware
+    async def middleware(request: web.Request, handler):
+        if not hmac.compare_digest(request.headers.get(AUTH_HEADER, ''), token):
+            raise web.HTTPUnauthorized(text=json.dumps({'error': f'missing or wrong {AUTH_HEADER} header'}),
+                                       content_type='application/json')
+        return await handler(request)
+    return middleware
+
+
+def load_token(path: Union[str, Path] = DEFAULT_TOKEN_PATH) -> str:
+    """The token saved at ``path``, created (readable by its owner only) on first use."""
+    path = Path(path)
+    if path.exists():
+        token = path.read_text(encoding='utf-8').strip()
+        if token:
+            return token
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + '\n')
+    return token
+
+
+async def serve_daemon(daemon: ScanDaemon, host: str = '127.0.0.1',
+                       port: int = DEFAULT_DAEMON_PORT) -> web.AppRunner:
+    """Serve ``daemon`` until the runner is cleaned up."""
+    runner = web.AppRunner(daemon.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,217 @@
+import asyncio
+import socket
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from .resolver import NOERROR, NXDOMAIN, AsyncResolver, DNSAnswer
+
+DEFAULT_DNS_CACHE_PATH = Path.home() / '.cache' / 'subdomainfinder' / 'dns.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    name TEXT NOT NULL,
+    rdtype TEXT NOT NULL,
+    rcode INTEGER NOT NULL,
+    addresses TEXT NOT NULL,
+    cnames TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (name, rdtype)
+) WITHOUT ROWID
+"""
+
+# Rough per-entry cost of the key tuple, the answer object, its lists and the LRU links
+_ENTRY_OVERHEAD = 400
+
+_Key = Tuple[str, str]
+
+
+def _key(name: str, rdtype: str) -> _Key:
+    return name.lower().rstrip('.'), rdtype
+
+
+def _size(answer: DNSAnswer) -> int:
+    return (_ENTRY_OVERHEAD + 2 * len(answer.name)
+            + sum(sys.getsizeof(a) + 8 for a in answer.addresses)
+            + sum(sys.getsizeof(c) + 8 for c in answer.cnames))
+
+
+class DNSCache:
+    """In-process DNS answer cache, shared by every resolver of a run.
+
+    Answers are kept for their TTL, clamped to ``[min_ttl, max_ttl]``.
+    NXDOMAIN and empty NOERROR answers are cached too, for the negative TTL
+    of the zone's SOA or ``negative_ttl`` when the server sent none. SERVFAIL
+    and REFUSED say nothing about the name and are never cached. Once the
+    estimated size passes ``max_bytes`` the least recently used entries go.
+
+    With ``path`` unexpired answers are loaded on start and written back by
+    ``save`` (and ``close``), so a rerun of a scan skips names it resolved
+    minutes ago.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, min_ttl: int = 0, max_ttl: int = 86400,
+                 negative_ttl: int = 300, path: Optional[Union[str, Path]] = None):
+        self.max_bytes = max_bytes
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.path = Path(path) if path is not None else None
+        self.size = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[_Key, Tuple[DNSAnswer, float, int]]' = OrderedDict()
+        if self.path is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str, rdtype: str = 'A') -> Optional[DNSAnswer]:
+        """The cached answer for ``name`` with its remaining TTL, or None."""
+        key = _key(name, rdtype)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        answer, expires, size = entry
+        remaining = expires - time.time()
+        if remaining <= 0:
+            self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if not answer.found:
+            self.negative_hits += 1
+        return replace(answer, name=name, addresses=list(answer.addresses),
+                       cnames=list(answer.cnames), ttl=int(remaining))
+
+    def put(self, answer: DNSAnswer):
+        if answer.rcode not in (NOERROR, NXDOMAIN):
+            return
+        if answer.found:
+            ttl = answer.ttl
+        else:
+            ttl = answer.ttl or self.negative_ttl
+        ttl = max(self.min_ttl, min(ttl, self.max_ttl))
+        if ttl <= 0:
+            return
+        self._store(_key(answer.name, answer.rdtype), answer, time.time() + ttl)
+
+    def _store(self, key: _Key, answer: DNSAnswer, expires: float):
+        self._discard(key)
+        size = _size(answer)
+        self._entries[key] = (answer, expires, size)
+        self.size += size
+        while self.size > self.max_bytes and self._entries:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def _discard(self, key: _Key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self.size, 'hits': self.hits,
+                'negative_hits': self.negative_hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path))
+        db.execute(_SCHEMA)
+        return db
+
+    def _load(self):
+        db = self._connect()
+        try:
+            # Oldest use first, as the LRU order is not stored: expiry is the closest proxy
+            rows = db.execute('SELECT name, rdtype, rcode, addresses, cnames, expires FROM answers '
+                              'WHERE expires > ? ORDER BY expires', (time.time(),)).fetchall()
+        finally:
+            db.close()
+        for name, rdtype, rcode, addresses, cnames, expires in rows:
+            answer = DNSAnswer(name, rdtype, rcode, addresses.split() if addresses else [],
+                               cnames.split() if cnames else [])
+            self._store((name, rdtype), answer, expires)
+
+    def save(self):
+        """Write unexpired entries to ``path``, replacing what was stored before."""
+        if self.path is None:
+            return
+        now = time.time()
+        rows = [(name, rdtype, answer.rcode, ' '.join(answer.addresses), ' '.join(answer.cnames), expires)
+                for (name, rdtype), (answer, expires, _) in self._entries.items() if expires > now]
+        db = self._connect()
+        try:
+            with db:
+                db.execute('DELETE FROM answers')
+                db.executemany('INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?)', rows)
+        finally:
+            db.close()
+
+    def close(self):
+        self.save()
+
+    def __enter__(self) -> 'DNSCache':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AiohttpResolver(AbstractResolver):
+    """Lets an aiohttp connector resolve through an ``AsyncResolver``.
+
+    HTTP probes then reuse the answers (and the ``DNSCache``) of the DNS
+    stage instead of a second lookup through ``getaddrinfo`` on a thread.
+    Lookups that time out or return no addresses fall back to aiohttp's
+    threaded resolver (which also knows the hosts file), as do ``localhost``
+    names; NXDOMAIN is final, as dead hosts are most of what a scan probes.
+    """
+
+    def __init__(self, resolver: AsyncResolver):
+        self.resolver = resolver
+        self._fallback: Optional[aiohttp.ThreadedResolver] = None
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        if host == 'localhost' or host.endswith('.localhost'):
+            return await self._system_resolve(host, port, family)
+        rdtype = 'AAAA' if family == socket.AF_INET6 else 'A'
+        try:
+            answer = await self.resolver.resolve(host, rdtype)
+        except (asyncio.TimeoutError, ValueError):
+            answer = None
+        if answer is not None and answer.addresses:
+            family = socket.AF_INET6 if rdtype == 'AAAA' else socket.AF_INET
+            return [{'hostname': host, 'host': address, 'port': port, 'family': family,
+                     'proto': 0, 'flags': socket.AI_NUMERICHOST} for address in answer.addresses]
+        if answer is not None and answer.rcode == NXDOMAIN:
+            raise OSError(f"DNS lookup failed for {host}: NXDOMAIN")
+        return await self._system_resolve(host, port, family)
+
+    async def _system_resolve(self, host: str, port: int, family: int) -> List[Dict[str, Any]]:
+        if self._fallback is None:
+            self._fallback = aiohttp.ThreadedResolver()
+        return await self._fallback.resolve(host, port, family)
+
+    async def close(self):
+        if self._fallback is not None:
+            await self._fallback.close()
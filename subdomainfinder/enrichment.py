@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import AsyncIterator, Dict, Iterable, Mapping, Optional, Set, Tuple, Union
+
+import aiohttp
+
+from .cloud_ranges import classify_ip
+from .dnscache import AiohttpResolver, DNSCache
+from .metrics import Metrics
+from .resolver import AsyncResolver
+from .utils import bounded_as_completed
+from .writers import AsyncResultWriter, HostResult
+
+logger = logging.getLogger('subdomainfinder.enrichment')
+
+
+# -----------------------------
+# Verdicts
+# -----------------------------
+def provider_from_cname(cname: str) -> Optional[str]:
+    if ".cloudfront.net" in cname:
+        return "AWS (CloudFront)"
+    if ".elb.amazonaws.com" in cname:
+        return "AWS (ELB)"
+    if ".googleusercontent.com" in cname or ".gcp." in cname:
+        return "GCP"
+    if ".azurewebsites.net" in cname or ".cloudapp.net" in cname:
+        return "Azure"
+    # Cloudflare rarely leaks a CNAME
+    if ".cdn.cloudflare.net" in cname:
+        return "Cloudflare"
+    return None
+
+
+def provider_from_ip(ip: str) -> Optional[str]:
+    # Published provider ranges, see cloud_ranges/ and build_cloud_index.py
+    return classify_ip(ip)
+
+
+def provider_from_headers(headers) -> str:
+    header_provider = "-"
+
+    if "Server" in headers:
+        server = headers["Server"].lower()
+        if "cloudflare" in server:
+            header_provider = "Cloudflare"
+        if "gws" in server:  # google web server
+            header_provider = "GCP"
+
+    if "CF-Ray" in headers:
+        header_provider = "Cloudflare"
+    if "X-Amz-Cf-Id" in headers:
+        header_provider = "AWS CloudFront"
+    if "x-azure-ref" in headers:
+        header_provider = "Azure"
+
+    return header_provider
+
+
+def fingerprint_headers(headers) -> Dict[str, str]:
+    """Server and CDN verdict from response headers."""
+    server = headers["Server"].lower() if "Server" in headers else "unknown"
+
+    cdn = "no"
+    if "CF-Cache-Status" in headers or "CF-Ray" in headers:
+        cdn = "Cloudflare"
+    elif "X-Akamai-Transformed" in headers:
+        cdn = "Akamai"
+    elif "X-CDN" in headers:
+        cdn = headers["X-CDN"]
+
+    return {"server": server, "cdn": cdn}
+
+
+# -----------------------------
+# Probes
+# -----------------------------
+def make_session(concurrency: int = 100, timeout: float = 3.0,
+                 resolver: Optional[AsyncResolver] = None) -> aiohttp.ClientSession:
+    """Pooled client session suited to header probing.
+
+    With ``resolver`` connections look hosts up through it, sharing its cache.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency, ssl=False,
+                                       resolver=AiohttpResolver(resolver) if resolver else None),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def _request_headers(session: aiohttp.ClientSession, url: str) -> Tuple[int, Mapping[str, str]]:
+    async with session.head(url, allow_redirects=False) as response:
+        if response.status not in (405, 501):
+            return response.status, response.headers
+    # HEAD not supported: GET, but never read the body
+    async with session.get(url, allow_redirects=False) as response:
+        return response.status, response.headers
+
+
+async def probe_http(session: aiohttp.ClientSession, host: str):
+    """Return ``(scheme, status, headers)`` from HTTPS, or from HTTP if HTTPS fails; None if both do.
+
+    Both schemes are probed at once, so an unreachable host costs one
+    timeout rather than two. The HTTPS answer wins even when HTTP comes
+    back first, because a plain HTTP answer is often just a redirect to
+    it, with the headers of a redirector rather than of the site.
+    """
+    async def probe(scheme):
+        try:
+            status, headers = await _request_headers(session, f"{scheme}://{host}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError):
+            return None
+        return scheme, status, headers
+
+    https = asyncio.create_task(probe("https"))
+    http = asyncio.create_task(probe("http"))
+    try:
+        return await https or await http
+    finally:
+        for task in (https, http):
+            task.cancel()
+        await asyncio.gather(https, http, return_exceptions=True)
+
+
+async def enrich_host(host: str, resolver: AsyncResolver, session: aiohttp.ClientSession) -> Dict[str, str]:
+    """One DNS query and one HTTP exchange per host, run concurrently.
+
+    Combines the verdicts of ``detect_webserver`` and ``detect_cloud``.
+    """
+    async def dns_probe():
+        try:
+            return await resolver.resolve(host, "A")
+        except (asyncio.TimeoutError, ValueError, OSError):
+            return None
+
+    answer, response = await asyncio.gather(dns_probe(), probe_http(session, host))
+
+    provider = "Unknown"
+    cname = "-"
+    ip = "-"
+    if answer is not None:
+        if answer.cnames:
+            cname = answer.cnames[0]
+            for target in answer.cnames:
+                provider = provider_from_cname(target) or provider
+        ipv4 = [a for a in answer.addresses if ":" not in a]
+        if ipv4:
+            ip = ipv4[0]
+            provider = provider_from_ip(ip) or provider
+
+    if response is None:
+        result = {"server": "unreachable", "cdn": "-", "scheme": "-", "status": "-"}
+    else:
+        scheme, status, headers = response
+        result = fingerprint_headers(headers)
+        result.update(scheme=scheme, status=str(status))
+        header_provider = provider_from_headers(headers)
+        if header_provider != "-":
+            provider = header_provider
+
+    result.update(provider=provider, cname=cname, ip=ip)
+    return result
+
+
+async def _measured_enrich(host: str, resolver: AsyncResolver, session: aiohttp.ClientSession,
+                           metrics: Optional[Metrics]) -> Dict[str, str]:
+    if metrics is None:
+        return await enrich_host(host, resolver, session)
+    stats = metrics.stage('enrich')
+    stats.items_in += 1
+    start = time.perf_counter()
+    result = await enrich_host(host, resolver, session)
+    stats.latency.observe(time.perf_counter() - start)
+    stats.outcomes['unreachable' if result['server'] == 'unreachable' else 'reachable'] += 1
+    stats.items_out += 1
+    return result
+
+
+async def enrich_many(hosts: Iterable[str], concurrency: int = 100,
+                      resolver: Optional[AsyncResolver] = None,
+                      session: Optional[aiohttp.ClientSession] = None,
+                      metrics: Optional[Metrics] = None,
+                      dns_cache: Optional[DNSCache] = None) -> AsyncIterator[Tuple[str, Dict[str, str]]]:
+    """Enrich many hosts over one resolver and one connection pool.
+
+    Yields ``(host, result)`` pairs as they complete. With ``metrics`` each
+    host is recorded under the ``enrich`` stage (and its lookups under
+    ``resolve`` when the resolver is created here). A session created here
+    resolves through ``resolver``, so the A query of each host is sent once
+    for both the DNS verdict and the HTTP probe. Pass the run's ``dns_cache``
+    to share answers with its other stages.
+    """
+    owns_resolver = resolver is None
+    owns_session = session is None
+    if owns_resolver:
+        resolver = AsyncResolver(max_in_flight=concurrency * 2, metrics=metrics,
+                                 cache=dns_cache if dns_cache is not None else DNSCache())
+    if owns_session:
+        session = make_session(concurrency, resolver=resolver)
+
+    async def enrich(host):
+        return host, await _measured_enrich(host, resolver, session, metrics)
+
+    try:
+        with metrics.timed('enrich') if metrics is not None else nullcontext():
+            async for item in bounded_as_completed(enrich, hosts, concurrency):
+                yield item
+    finally:
+        if owns_session:
+            await session.close()
+        if owns_resolver:
+            resolver.close()
+
+
+class EnrichingWriter:
+    """Fills in ``ips``, ``cloud`` and ``server`` of each result before writing it.
+
+    Wraps an ``AsyncResultWriter``: every host written is enriched as by
+    ``enrich_host``, at most ``concurrency`` at a time, and passed on once
+    its verdict is in, so rows arrive in completion order. ``write`` waits
+    for a free slot, which holds back the scan instead of queueing hosts.
+    ``aclose`` waits for the hosts still in flight and closes ``writer``.
+    """
+
+    def __init__(self, writer: AsyncResultWriter, concurrency: int = 100,
+                 dns_cache: Optional[DNSCache] = None, metrics: Optional[Metrics] = None):
+        self.writer = writer
+        self.metrics = metrics
+        self.resolver = AsyncResolver(max_in_flight=concurrency * 2, metrics=metrics,
+                                      cache=dns_cache if dns_cache is not None else DNSCache())
+        self.session = make_session(concurrency, resolver=self.resolver)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()  # AsyncResultWriter takes one writer at a time
+        self._tasks: Set['asyncio.Task[None]'] = set()
+
+    async def write(self, item: Union[str, HostResult]):
+        result = item if isinstance(item, HostResult) else HostResult(item)
+        await self._slots.acquire()
+        task = asyncio.ensure_future(self._enrich(result))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _enrich(self, result: HostResult):
+        try:
+            verdict = await _measured_enrich(result.host, self.resolver, self.session, self.metrics)
+        finally:
+            self._slots.release()
+        result = replace(result, ips=[] if verdict["ip"] == "-" else [verdict["ip"]],
+                         cloud=verdict["provider"], server=verdict["server"])
+        async with self._lock:
+            await self.writer.write(result)
+
+    async def aclose(self):
+        try:
+            if self._tasks:
+                await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await self.session.close()
+            self.resolver.close()
+            await self.writer.aclose()
+
+    async def __aenter__(self) -> 'EnrichingWriter':
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
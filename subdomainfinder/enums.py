@@ -2,4 +2,12 @@ from enum import Enum, auto
 
 class OutputFormat(Enum):
     TEXT = auto()
-    JSON = auto()
\ No newline at end of file
+    JSON = auto()
+    NDJSON = auto()   # one JSON object per host, with its metadata
+    CSV = auto()
+    ARCHIVE = auto()  # zlib-compressed columnar blocks, see writers.read_archive
+
+class CacheMode(Enum):
+    NORMAL = auto()      # serve fresh entries, revalidate stale ones
+    REFRESH = auto()     # always revalidate with the source
+    CACHE_ONLY = auto()  # never touch the network
\ No newline at end of file
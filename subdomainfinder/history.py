@@ -0,0 +1,159 @@
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+DEFAULT_HISTORY_PATH = Path.home() / '.cache' / 'subdomainfinder' / 'history.sqlite'
+
+# Hosts are stored as their label relative to the root ('' for the root
+# itself), timestamps as whole seconds and sources as a bitmask over the
+# sources table, which keeps rows small and the primary key a prefix index.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    last_run INTEGER
+);
+CREATE TABLE IF NOT EXISTS sources (
+    bit INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    domain INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    sources INTEGER NOT NULL DEFAULT 0,
+    present INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (domain, label)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass
+class HostRecord:
+    host: str
+    first_seen: int
+    last_seen: int
+    sources: List[str]
+    present: bool
+
+
+@dataclass
+class HostDiff:
+    domain: str
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    previous_run: Optional[int] = None
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+class HistoryStore:
+    """Per-root history of discovered hosts: first/last seen and contributing sources."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self._bits: Dict[str, int] = dict(self._db.execute('SELECT name, bit FROM sources'))
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self) -> 'HistoryStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _domain_id(self, domain: str) -> int:
+        self._db.execute('INSERT OR IGNORE INTO domains (name) VALUES (?)', (domain,))
+        return self._db.execute('SELECT id FROM domains WHERE name = ?', (domain,)).fetchone()[0]
+
+    def _mask(self, sources: Iterable[str]) -> int:
+        mask = 0
+        for name in sources:
+            bit = self._bits.get(name)
+            if bit is None:
+                bit = self._bits[name] = len(self._bits)
+                self._db.execute('INSERT INTO sources VALUES (?, ?)', (bit, name))
+            mask |= 1 << bit
+        return mask
+
+    def _names(self, mask: int) -> List[str]:
+        return sorted(name for name, bit in self._bits.items() if mask >> bit & 1)
+
+    @staticmethod
+    def _label(host: str, domain: str) -> str:
+        return '' if host == domain else host[:-len(domain) - 1]
+
+    @staticmethod
+    def _host(label: str, domain: str) -> str:
+        return f'{label}.{domain}' if label else domain
+
+    def last_run(self, domain: str) -> Optional[int]:
+        row = self._db.execute('SELECT last_run FROM domains WHERE name = ?', (domain,)).fetchone()
+        return row[0] if row else None
+
+    def record(self, domain: str, found: Mapping[str, Iterable[str]],
+               completed_sources: Optional[Iterable[str]] = None,
+               at: Optional[float] = None) -> HostDiff:
+        """Store one run's ``{host: sources}`` and return what changed since the last run.
+
+        A host missing from this run is only reported removed if one of the
+        sources that found it before is in ``completed_sources`` (default:
+        all sources), so a source that failed or timed out does not make its
+        hosts look removed.
+        """
+        at = int(at if at is not None else time.time())
+        domain = domain.lower()
+        diff = HostDiff(domain, previous_run=self.last_run(domain))
+        with self._db:
+            domain_id = self._domain_id(domain)
+            known = {label: (present, sources) for label, present, sources in self._db.execute(
+                'SELECT label, present, sources FROM hosts WHERE domain = ?', (domain_id,))}
+
+            rows = []
+            for host, sources in found.items():
+                if host != domain and not host.endswith('.' + domain):
+                    continue
+                label = self._label(host, domain)
+                if label not in known or not known[label][0]:
+                    diff.added.append(host)
+                rows.append((domain_id, label, at, at, self._mask(sources)))
+            self._db.executemany(
+                'INSERT INTO hosts (domain, label, first_seen, last_seen, sources) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (domain, label) DO UPDATE SET last_seen = excluded.last_seen, '
+                'sources = sources | excluded.sources, present = 1', rows)
+
+            confirmed = None if completed_sources is None else self._mask(completed_sources)
+            gone = []
+            for label, (present, sources) in known.items():
+                host = self._host(label, domain)
+                if present and host not in found and (confirmed is None or sources & confirmed):
+                    gone.append((domain_id, label))
+                    diff.removed.append(host)
+            self._db.executemany('UPDATE hosts SET present = 0 WHERE domain = ? AND label = ?', gone)
+            self._db.execute('UPDATE domains SET last_run = ? WHERE id = ?', (at, domain_id))
+
+        diff.added.sort()
+        diff.removed.sort()
+        return diff
+
+    def hosts(self, domain: str, include_removed: bool = False) -> List[HostRecord]:
+        domain = domain.lower()
+        query = ('SELECT label, first_seen, last_seen, sources, present FROM hosts '
+                 'JOIN domains ON domains.id = hosts.domain WHERE domains.name = ?')
+        if not include_removed:
+            query += ' AND present = 1'
+        return sorted((HostRecord(self._host(label, domain), first_seen, last_seen,
+                                  self._names(sources), bool(present))
+                       for label, first_seen, last_seen, sources, present
+                       in self._db.execute(query, (domain,))),
+                      key=lambda record: record.host)
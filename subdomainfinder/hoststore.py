@@ -0,0 +1,250 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+class _Node:
+    """A zone in the trie.
+
+    ``children`` maps the next label down to its node, or to None for a host
+    with nothing stored below it, which is what most hosts are and so costs
+    one dict entry instead of a node.
+    """
+    __slots__ = ('children', 'count', 'terminal')
+
+    def __init__(self):
+        self.children: Dict[str, Optional[_Node]] = {}
+        self.count = 0  # hosts stored at or below this zone
+        self.terminal = False  # the zone itself is a stored host
+
+
+class HostStore:
+    """Set of hostnames kept as a trie of reversed labels.
+
+    ``a.dev.example.com`` is stored under ``com`` -> ``example`` -> ``dev``
+    -> ``a``, so the suffix each host shares with its zone is stored once
+    and labels are interned, so ``www`` or ``api`` under a thousand zones is
+    one string. That makes it several times smaller than a ``set`` of the
+    full names for the output of brute force, permutations and recursive
+    scans, where both repeat heavily. Lookups, inserts and zone queries walk
+    one node per label, and every node keeps the number of hosts below it.
+
+    Names are stored as given; normalise them (see ``SubdomainValidator``)
+    before adding. Iteration is grouped by zone, not sorted.
+    """
+
+    def __init__(self, hosts: Iterable[str] = ()):
+        self._root = _Node()
+        self._labels: Dict[str, str] = {}
+        self.update(hosts)
+
+    def _intern(self, label: str) -> str:
+        return self._labels.setdefault(label, label)
+
+    def __len__(self) -> int:
+        return self._root.count
+
+    def __bool__(self) -> bool:
+        return self._root.count > 0
+
+    def add(self, host: str) -> bool:
+        """Store ``host``; False if it was already stored."""
+        labels = host.split('.')
+        intern = self._labels.setdefault
+        node = self._root
+        path = [node]
+        for i in range(len(labels) - 1, 0, -1):
+            label = labels[i]
+            child = node.children.get(label, _MISSING)
+            if child is None or child is _MISSING:
+                # A leaf host gaining a descendant becomes a node
+                new = node.children[intern(label, label)] = _Node()
+                if child is None:
+                    new.terminal = True
+                    new.count = 1
+                child = new
+            path.append(child)
+            node = child
+        label = labels[0]
+        child = node.children.get(label, _MISSING)
+        if child is _MISSING:
+            node.children[intern(label, label)] = None
+        elif child is None or child.terminal:
+            return False
+        else:
+            child.terminal = True
+            child.count += 1
+        for zone in path:
+            zone.count += 1
+        return True
+
+    def update(self, hosts: Iterable[str]):
+        add = self.add
+        for host in hosts:
+            add(host)
+
+    def discard(self, host: str) -> bool:
+        """Remove ``host``; False if it was not stored."""
+        labels = host.split('.')
+        if self._find(labels) is not True:
+            return False
+        path: List[Tuple[_Node, str]] = []
+        node = self._root
+        for i in range(len(labels) - 1, -1, -1):
+            node.count -= 1
+            path.append((node, labels[i]))
+            node = node.children[labels[i]]
+        if node is not None:
+            node.terminal = False
+            node.count -= 1
+        # Drop zones left empty and turn nodes left with no children back into leaves
+        for parent, label in reversed(path):
+            child = parent.children[label]
+            if child is None or child.count == 0:
+                del parent.children[label]
+            elif child.terminal and child.count == 1:
+                parent.children[label] = None
+            else:
+                break
+        return True
+
+    def _find(self, labels: List[str]) -> Optional[bool]:
+        """True if the name is stored, False if it is a zone of stored hosts, else None."""
+        node = self._root
+        for i in range(len(labels) - 1, -1, -1):
+            if node is None:
+                return None
+            node = node.children.get(labels[i], _MISSING)
+            if node is _MISSING:
+                return None
+        return node is None or node.terminal
+
+    def _node(self, zone: str) -> Union[_Node, None, object]:
+        node = self._root
+        if not zone:
+            return node
+        labels = zone.split('.')
+        for i in range(len(labels) - 1, -1, -1):
+            if node is None:
+                return _MISSING
+            node = node.children.get(labels[i], _MISSING)
+            if node is _MISSING:
+                return _MISSING
+        return node
+
+    def __contains__(self, host: object) -> bool:
+        return isinstance(host, str) and self._find(host.split('.')) is True
+
+    def count(self, zone: str) -> int:
+        """Hosts stored at or below ``zone``."""
+        node = self._node(zone)
+        if node is _MISSING:
+            return 0
+        return 1 if node is None else node.count
+
+    def longest_suffix(self, host: str) -> Optional[str]:
+        """The longest stored name that ``host`` equals or is below, on label boundaries.
+
+        With the roots of a scope stored, this is the root a host belongs
+        to: ``evilexample.com`` does not match ``example.com``.
+        """
+        labels = host.split('.')
+        node = self._root
+        found = None
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.children.get(labels[i], _MISSING)
+            if node is _MISSING:
+                break
+            if node is None or node.terminal:
+                found = i
+            if node is None:
+                break
+        return None if found is None else '.'.join(labels[found:])
+
+    def hosts(self, zone: str = '') -> Iterator[str]:
+        """Stored hosts at or below ``zone`` (all hosts by default)."""
+        node = self._node(zone)
+        if node is _MISSING:
+            return
+        if node is None:
+            yield zone
+            return
+        if zone and node.terminal:
+            yield zone
+        stack = [(node, '.' + zone if zone else '')]
+        while stack:
+            node, suffix = stack.pop()
+            for label, child in node.children.items():
+                name = label + suffix
+                if child is None:
+                    yield name
+                    continue
+                if child.terminal:
+                    yield name
+                stack.append((child, '.' + name))
+
+    def __iter__(self) -> Iterator[str]:
+        return self.hosts()
+
+    def zones(self, zone: str = '') -> Iterator[Tuple[str, int]]:
+        """``(subzone, count)`` for each name directly below ``zone`` and the hosts at or below it."""
+        node = self._node(zone)
+        if node is _MISSING or node is None:
+            return
+        suffix = '.' + zone if zone else ''
+        for label, child in node.children.items():
+            yield label + suffix, 1 if child is None else child.count
+
+    def merge(self, other: Union['HostStore', Iterable[str]]):
+        """Add every host of ``other`` in place, walking shared zones once."""
+        if not isinstance(other, HostStore):
+            self.update(other)
+            return
+        if other is self:
+            return
+        self._root.count += self._merge(self._root, other._root)
+
+    def _merge(self, node: _Node, other: _Node) -> int:
+        """Merge ``other``'s children into ``node``'s; returns how many hosts were new."""
+        added = 0
+        intern = self._labels.setdefault
+        children = node.children
+        for label, theirs in other.children.items():
+            label = intern(label, label)
+            mine = children.get(label, _MISSING)
+            if mine is _MISSING:
+                children[label] = self._copy(theirs)
+                added += 1 if theirs is None else theirs.count
+                continue
+            if theirs is None:
+                if mine is not None and not mine.terminal:
+                    mine.terminal = True
+                    mine.count += 1
+                    added += 1
+                continue
+            if mine is None:
+                mine = children[label] = _Node()
+                mine.terminal = True
+                mine.count = 1
+            new = self._merge(mine, theirs)
+            if theirs.terminal and not mine.terminal:
+                mine.terminal = True
+                new += 1
+            mine.count += new
+            added += new
+        return added
+
+    def _copy(self, other: Optional[_Node]) -> Optional[_Node]:
+        if other is None:
+            return None
+        node = _Node()
+        node.terminal = other.terminal
+        node.count = other.count
+        intern = self._labels.setdefault
+        node.children = {intern(label, label): self._copy(child) for label, child in other.children.items()}
+        return node
+
+    def __ior__(self, other: Union['HostStore', Iterable[str]]) -> 'HostStore':
+        self.merge(other)
+        return self
+
+
+_MISSING = object()
@@ -0,0 +1,84 @@
+import codecs
+import json
+import re
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+_STRING = r'"([^"\\]*(?:\\.[^"\\]*)*)"'
+# A complete string, or the start of one that continues in the next chunk
+_STRING_OR_OPEN = re.compile(_STRING + r'|"')
+_STRING_RE = re.compile(_STRING)
+
+
+def _unescape(raw: str) -> str:
+    if '\\' not in raw:
+        return raw
+    # crt.sh joins names with \n; skip the JSON decoder for that common case
+    simple = raw.replace('\\n', '\n')
+    if '\\' not in simple:
+        return simple
+    return json.loads(f'"{raw}"')
+
+
+class JSONStringScanner:
+    """Incremental extractor of string values from a JSON document.
+
+    Feed it the document in arbitrary chunks. With ``keys``, only values of
+    those object keys are returned (a string, or every string of an array of
+    strings), paired with their key; without, every string in the document
+    is returned with key ``None``. Matching is done by regular expressions
+    over each chunk instead of building the document, and only an
+    unfinished match is carried between chunks, so memory stays flat however
+    large the document is.
+    """
+
+    def __init__(self, keys: Optional[Iterable[str]] = None):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+        self._keys = list(keys) if keys else None
+        if self._keys:
+            names = '|'.join(re.escape(k) for k in self._keys)
+            self._key_start = re.compile(f'"(?:{names})"')
+            self._pattern = re.compile(
+                f'"({names})"\\s*:\\s*(?:{_STRING}|\\[\\s*((?:{_STRING}\\s*,?\\s*)*)\\])')
+            self._carry = max(len(k) for k in self._keys) + 2
+
+    def feed(self, chunk: bytes) -> List[Tuple[Optional[str], str]]:
+        text = self._buffer + self._decoder.decode(chunk)
+        if self._keys:
+            return self._feed_keyed(text)
+        out = []
+        self._buffer = ''
+        for match in _STRING_OR_OPEN.finditer(text):
+            raw = match.group(1)
+            if raw is None:
+                self._buffer = text[match.start():]
+                break
+            out.append((None, _unescape(raw)))
+        return out
+
+    def _feed_keyed(self, text: str) -> List[Tuple[Optional[str], str]]:
+        out = []
+        end = 0
+        for match in self._pattern.finditer(text):
+            key, raw, array = match.group(1), match.group(2), match.group(3)
+            end = match.end()
+            if raw is not None:
+                out.append((key, _unescape(raw)))
+            elif array:
+                out.extend((key, _unescape(s)) for s in _STRING_RE.findall(array))
+        # A key seen after the last match has a value still to come
+        pending = self._key_start.search(text, end)
+        if pending is not None:
+            self._buffer = text[pending.start():]
+        else:
+            self._buffer = text[max(end, len(text) - self._carry):]
+        return out
+
+
+async def iter_json_strings(chunks: AsyncIterator[bytes],
+                            keys: Optional[Iterable[str]] = None) -> AsyncIterator[Tuple[Optional[str], str]]:
+    """Yield ``(key, value)`` string pairs from an async stream of JSON chunks."""
+    scanner = JSONStringScanner(keys)
+    async for chunk in chunks:
+        for item in scanner.feed(chunk):
+            yield item
@@ -0,0 +1,267 @@
+import json
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+
+# Upper bounds in seconds, as Prometheus "le" labels; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_PREFIX = 'subdomainfinder'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are bucket upper bounds."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def report(self) -> Dict[str, Optional[float]]:
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            'count': self.count,
+            'sum_s': round(self.sum, 4),
+            'p50_s': round(p50, 4) if p50 is not None else None,
+            'p99_s': round(p99, 4) if p99 is not None else None,
+            'max_s': round(self.max, 4),
+        }
+
+
+@dataclass
+class SourceMetrics:
+    name: str
+    status: str = 'pending'
+    error: Optional[str] = None  # exception class the source failed with
+    seconds: float = 0.0  # wall time from start until the source finished
+    requests: int = 0
+    bytes: int = 0  # body bytes downloaded
+    cached_bytes: int = 0  # body bytes served from the response cache
+    parse_seconds: float = 0.0
+    raw: int = 0  # names the parser produced, repeats and junk included
+    valid: int = 0  # of those, valid hosts below the root
+    http_status: Counter = field(default_factory=Counter)
+    latency: Histogram = field(default_factory=Histogram)  # request to response headers
+
+    def observe_request(self, status: int, seconds: float):
+        self.requests += 1
+        self.http_status[status] += 1
+        self.latency.observe(seconds)
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    seconds: float = 0.0  # wall time spent inside ``Metrics.timed``
+    items_in: int = 0
+    items_out: int = 0
+    outcomes: Counter = field(default_factory=Counter)  # e.g. NXDOMAIN, timeout, unreachable
+    latency: Histogram = field(default_factory=Histogram)  # per item
+
+
+class Metrics:
+    """Per-source and per-stage measurements for one scan or a whole batch.
+
+    Pass one instance to ``ServiceScanner``, ``AsyncResolver`` and
+    ``enrich_many`` (stages ``resolve`` and ``enrich``) and time other
+    stages with ``timed``. ``report()`` is the JSON form, ``prometheus()``
+    the Prometheus text exposition format. Which sources found each host is
+    tracked to count hosts only one source knows, so keep a single instance
+    per run rather than one per domain.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.sources: Dict[str, SourceMetrics] = {}
+        self.stages: Dict[str, StageMetrics] = {}
+        self._bits: Dict[str, int] = {}
+        self._hosts: Dict[str, int] = {}  # host -> bitmask of the sources that found it
+
+    def source(self, name: str) -> SourceMetrics:
+        stats = self.sources.get(name)
+        if stats is None:
+            stats = self.sources[name] = SourceMetrics(name)
+        return stats
+
+    def stage(self, name: str) -> StageMetrics:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageMetrics(name)
+        return stats
+
+    def saw(self, source: str, host: str):
+        """Note that ``source`` reported the valid host ``host``."""
+        bit = self._bits.get(source)
+        if bit is None:
+            bit = self._bits[source] = 1 << len(self._bits)
+        self._hosts[host] = self._hosts.get(host, 0) | bit
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[StageMetrics]:
+        stats = self.stage(stage)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+
+    def contributions(self) -> Dict[str, Tuple[int, int]]:
+        """``(distinct, unique)`` hosts per source: all it found, and those no other source found."""
+        distinct: Counter = Counter()
+        unique: Counter = Counter()
+        names = {bit: name for name, bit in self._bits.items()}
+        for mask in self._hosts.values():
+            if mask & (mask - 1) == 0:
+                unique[names[mask]] += 1
+            while mask:
+                bit = mask & -mask
+                distinct[names[bit]] += 1
+                mask ^= bit
+        return {name: (distinct[name], unique[name]) for name in self._bits}
+
+    def report(self) -> Dict[str, object]:
+        contributions = self.contributions()
+        sources = {}
+        for name, s in sorted(self.sources.items()):
+            distinct, unique = contributions.get(name, (0, 0))
+            sources[name] = {
+                'status': s.status,
+                'error': s.error,
+                'seconds': round(s.seconds, 4),
+                'requests': s.requests,
+                'http_status': {str(k): v for k, v in sorted(s.http_status.items())},
+                'latency': s.latency.report(),
+                'bytes': s.bytes,
+                'cached_bytes': s.cached_bytes,
+                'parse_seconds': round(s.parse_seconds, 4),
+                'raw': s.raw,
+                'valid': s.valid,
+                'distinct': distinct,
+                'unique': unique,
+                # what each host only this source knows costs; the number to tune budgets by
+                'seconds_per_unique_host': round(s.seconds / unique, 6) if unique else None,
+            }
+        stages = {}
+        for name, s in sorted(self.stages.items()):
+            stages[name] = {
+                'seconds': round(s.seconds, 4),
+                'items_in': s.items_in,
+                'items_out': s.items_out,
+                'outcomes': dict(sorted(s.outcomes.items())),
+                'latency': s.latency.report(),
+            }
+        return {'started': int(self.started), 'hosts': len(self._hosts),
+                'sources': sources, 'stages': stages}
+
+    def write_report(self, path: Union[str, Path]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]):
+            lines.append(f'# HELP {_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {_PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{_PREFIX}_{name}{_labels(labels)} {value:g}')
+
+        def histogram(name: str, help_text: str, items: List[Tuple[Dict[str, str], Histogram]]):
+            lines.append(f'# HELP {_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {_PREFIX}_{name} histogram')
+            for labels, h in items:
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    lines.append(f'{_PREFIX}_{name}_bucket{_labels({**labels, "le": le})} {cumulative}')
+                lines.append(f'{_PREFIX}_{name}_sum{_labels(labels)} {h.sum:g}')
+                lines.append(f'{_PREFIX}_{name}_count{_labels(labels)} {h.count}')
+
+        contributions = self.contributions()
+        sources = sorted(self.sources.items())
+        family('source_up', 'gauge', 'Whether the source finished its last run (1) or not (0).',
+               [({'source': n, 'status': s.status}, float(s.status == 'ok')) for n, s in sources])
+        family('source_seconds_total', 'counter', 'Wall time spent on the source.',
+               [({'source': n}, s.seconds) for n, s in sources])
+        family('source_requests_total', 'counter', 'HTTP requests sent, by response status.',
+               [({'source': n, 'code': str(code)}, count)
+                for n, s in sources for code, count in sorted(s.http_status.items())])
+        histogram('source_request_duration_seconds', 'Time from request to response headers.',
+                  [({'source': n}, s.latency) for n, s in sources])
+        family('source_bytes_total', 'counter', 'Response body bytes, by origin.',
+               [({'source': n, 'origin': origin}, value) for n, s in sources
+                for origin, value in (('network', s.bytes), ('cache', s.cached_bytes))])
+        family('source_parse_seconds_total', 'counter', 'Time spent parsing responses.',
+               [({'source': n}, s.parse_seconds) for n, s in sources])
+        family('source_hostnames_total', 'counter', 'Names parsed, by kind.',
+               [({'source': n, 'kind': kind}, value) for n, s in sources
+                for kind, value in (('raw', s.raw), ('valid', s.valid),
+                                    ('distinct', contributions.get(n, (0, 0))[0]),
+                                    ('unique', contributions.get(n, (0, 0))[1]))])
+
+        stages = sorted(self.stages.items())
+        family('stage_seconds_total', 'counter', 'Wall time spent in the stage.',
+               [({'stage': n}, s.seconds) for n, s in stages])
+        family('stage_items_total', 'counter', 'Items into and out of the stage.',
+               [({'stage': n, 'direction': d}, value) for n, s in stages
+                for d, value in (('in', s.items_in), ('out', s.items_out))])
+        family('stage_outcomes_total', 'counter', 'Per-item outcomes of the stage.',
+               [({'stage': n, 'outcome': outcome}, count) for n, s in stages
+                for outcome, count in sorted(s.outcomes.items())])
+        histogram('stage_item_duration_seconds', 'Time per item in the stage.',
+                  [({'stage': n}, s.latency) for n, s in stages])
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+async def serve_metrics(metrics: Metrics, host: str = '127.0.0.1', port: int = 9464) -> web.AppRunner:
+    """Serve ``/metrics`` (Prometheus text) and ``/report`` (JSON) until the runner is cleaned up."""
+    async def prometheus(request):
+        return web.Response(text=metrics.prometheus(), content_type='text/plain', charset='utf-8')
+
+    async def report(request):
+        return web.json_response(metrics.report())
+
+    app = web.Application()
+    app.router.add_get('/metrics', prometheus)
+    app.router.add_get('/report', report)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
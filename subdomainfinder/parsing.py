@@ -0,0 +1,58 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from .sources import Parser
+
+# Parser steps on less input than this run inline: a thread hop costs more
+DEFAULT_OFFLOAD_THRESHOLD = 256 * 1024
+
+
+class ParseExecutor:
+    """Runs parser steps that are big enough to stall the event loop on worker threads.
+
+    Small steps (a streamed chunk of a few KB) run inline. A step over
+    ``threshold`` bytes, typically ``finish`` of a parser that buffers the
+    whole body, is handed to ``executor`` (a small thread pool by default).
+    Parsing still needs the GIL, but the interpreter gives it back to the
+    event loop every switch interval (5 ms by default), so DNS queries and
+    other sources keep moving while a big page is parsed instead of waiting
+    for all of it. Parsers keep state between steps, so steps cannot go to a
+    process pool.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_OFFLOAD_THRESHOLD, max_workers: int = 2,
+                 executor: Optional[Executor] = None):
+        self.threshold = threshold
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers, thread_name_prefix='parse')
+        self.offloaded = 0
+
+    async def feed(self, parser: Parser, chunk: bytes) -> Iterable[str]:
+        if len(chunk) < self.threshold:
+            return parser.feed(chunk)
+        return await self._offload(lambda: list(parser.feed(chunk)))
+
+    async def finish(self, parser: Parser) -> Iterable[str]:
+        if parser.backlog < self.threshold:
+            return parser.finish()
+        return await self._offload(lambda: list(parser.finish()))
+
+    async def _offload(self, step) -> List[str]:
+        self.offloaded += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, step)
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+
+_default_executor: Optional[ParseExecutor] = None
+
+
+def default_parse_executor() -> ParseExecutor:
+    """The executor scanners share unless given their own."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = ParseExecutor()
+    return _default_executor
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from .brute_force import DEFAULT_WORDLIST, ResolvingScanner, load_wordlist
+from .resolver import AsyncResolver
+
+if TYPE_CHECKING:
+    from .dnscache import DNSCache
+
+_TRAILING_NUMBER = re.compile(r'^(.*?)(\d+)$')
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, ``error_rate`` false positives.
+
+    Sized for ``capacity`` items up front, so memory stays flat however many
+    candidates pass through it (about 1.8 bytes per item at 0.1%).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _hashes(self, item: str) -> Tuple[int, int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=16).digest(), 'little')
+        return digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; True if it was (definitely) not there before."""
+        h1, h2 = self._hashes(item)
+        bits, size = self._bits, self.size
+        new = False
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        return all(self._bits[pos >> 3] >> (pos & 7) & 1
+                   for pos in ((h1 + i * h2) % self.size for i in range(self.hashes)))
+
+
+def split_labels(host: str, domain: str) -> List[str]:
+    """Labels of ``host`` left of ``domain``, leftmost first (empty for the root)."""
+    if not host.endswith('.' + domain):
+        return []
+    return host[:-len(domain) - 1].split('.')
+
+
+def label_frequencies(hosts: Iterable[str], domain: str) -> Counter:
+    """How often each label and each dash-separated token occurs in ``hosts``."""
+    counts: Counter = Counter()
+    for host in hosts:
+        for label in split_labels(host, domain):
+            counts[label] += 1
+            if '-' in label:
+                counts.update(token for token in label.split('-') if token)
+    return counts
+
+
+class Permutator(ResolvingScanner):
+    """altdns-style alterations of discovered hosts, resolved as they are generated.
+
+    Words are the labels of the discovered hosts ranked by how often they
+    occur, followed by the wordlist. Candidates are produced lazily, number
+    tweaks first (``api2`` -> ``api1``, ``api3``), then for each word in rank
+    order its combinations with every host (``dev-api``, ``api-dev``,
+    ``dev.api``, ``api.dev``, ``devapi``, ``apidev``). A Bloom filter drops
+    repeats and already known hosts, and at most ``max_candidates`` are
+    produced.
+    """
+
+    def __init__(self, domain: str, hosts: Iterable[str],
+                 wordlist: Union[str, Path, Iterable[str], None] = None,
+                 resolver: Optional[AsyncResolver] = None, concurrency: int = 1000,
+                 max_candidates: int = 100_000, max_words: int = 1000,
+                 nameservers: Optional[Sequence[str]] = None, timeout: float = 2.0,
+                 retries: int = 2, filter_wildcards: bool = True,
+                 dns_cache: Optional['DNSCache'] = None):
+        super().__init__(domain, resolver, concurrency, nameservers, timeout, retries,
+                         filter_wildcards, dns_cache)
+        self.hosts = sorted({h.lower() for h in hosts if h.lower().endswith('.' + self.domain)})
+        self.wordlist = wordlist if wordlist is not None else DEFAULT_WORDLIST
+        self.max_candidates = max_candidates
+        self.max_words = max_words
+        self.generated = 0
+        self.logger = logging.getLogger('subdomainfinder.permutations')
+
+    def words(self) -> List[str]:
+        """Discovered labels by descending frequency, then wordlist words."""
+        ranked = [word for word, _ in label_frequencies(self.hosts, self.domain).most_common()]
+        words = (load_wordlist(self.wordlist)
+                 if isinstance(self.wordlist, (str, Path)) else self.wordlist)
+        ranked.extend(words)
+        return list(dict.fromkeys(w for w in ranked if w and '.' not in w))[:self.max_words]
+
+    @staticmethod
+    def _number_tweaks(label: str) -> Iterator[str]:
+        match = _TRAILING_NUMBER.match(label)
+        if match is None:
+            yield f'{label}1'
+            yield f'{label}2'
+            return
+        stem, digits = match.groups()
+        n = int(digits)
+        if n > 0:
+            yield f'{stem}{n - 1}'
+        yield f'{stem}{n + 1}'
+
+    @staticmethod
+    def _word_alterations(word: str, labels: List[str]) -> Iterator[List[str]]:
+        first, rest = labels[0], labels[1:]
+        yield [f'{word}-{first}'] + rest
+        yield [f'{first}-{word}'] + rest
+        yield [word] + labels
+        yield [first, word] + rest
+        yield [word + first] + rest
+        yield [first + word] + rest
+
+    def _raw_candidates(self, words: List[str]) -> Iterator[List[str]]:
+        split = [split_labels(host, self.domain) for host in self.hosts]
+        for labels in split:
+            for tweak in self._number_tweaks(labels[0]):
+                yield [tweak] + labels[1:]
+        for word in words:
+            for labels in split:
+                if word in labels:
+                    continue
+                yield from self._word_alterations(word, labels)
+
+    def candidates(self) -> Iterator[str]:
+        """Lazily yield new, deduplicated candidate names, best ranked first."""
+        seen = BloomFilter(self.max_candidates + len(self.hosts))
+        for host in self.hosts:
+            seen.add(host)
+        suffix = '.' + self.domain
+        self.generated = 0
+        for labels in self._raw_candidates(self.words()):
+            if self.generated >= self.max_candidates:
+                self.logger.info(f"[Permutations] Candidate budget of {self.max_candidates} reached")
+                return
+            if max(map(len, labels)) > 63:
+                continue
+            name = '.'.join(labels) + suffix
+            if len(name) > 253 or not seen.add(name):
+                continue
+            self.generated += 1
+            yield name
+
+    async def scan(self) -> Set[str]:
+        self.logger.info(f"Running permutation scan for {self.domain} over {len(self.hosts)} hosts")
+        found = {answer.name async for answer in self.run()}
+        self.logger.info(f"[Permutations] Tried {self.generated} candidates, found {len(found)} subdomains")
+        return found
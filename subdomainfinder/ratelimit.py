@@ -0,0 +1,305 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Deque, Dict, Optional
+
+import aiohttp
+
+from .sources import SOURCES
+
+# Sustained requests per second per source, shared by every domain in a run
+DEFAULT_SOURCE_RATES: Dict[str, float] = {name: source.rate for name, source in SOURCES.items()}
+
+# Answers that mean "slow down" rather than "no data"
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class SourceUnavailable(Exception):
+    """A source could not be queried; ``status`` is what scans report for it."""
+
+    status = 'error'
+
+    def __init__(self, source: str, reason: str):
+        super().__init__(f"{source}: {reason}")
+        self.source = source
+
+
+class SourceThrottled(SourceUnavailable):
+    status = 'throttled'
+
+
+class CircuitOpen(SourceUnavailable):
+    status = 'circuit_open'
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``burst`` banked."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # The lock makes waiters queue up in FIFO order
+        async with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill(time.monotonic())
+            self._tokens -= 1
+
+
+class SourceLimiter:
+    """Adaptive limits for one source.
+
+    Requests pass a token bucket and an AIMD concurrency window: each success
+    widens the window by ``1/window`` and nudges the rate back towards its
+    configured value, each 429/5xx halves both and pauses the source for
+    Retry-After (or an exponential backoff). Throttling acts only through
+    the window and the rate: the circuit counts failures, that is 5xx
+    answers, connection errors and requests still throttled after their
+    last retry. After ``failure_threshold`` consecutive failures the
+    circuit opens and the source is skipped for ``cooldown`` seconds, then
+    a single trial request decides whether it closes again.
+    """
+
+    def __init__(self, name: str, rate: Optional[float] = None, burst: float = 2.0,
+                 max_concurrency: int = 8, failure_threshold: int = 5, cooldown: float = 300.0,
+                 backoff: float = 1.0):
+        self.name = name
+        self.base_rate = rate
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_concurrency = max_concurrency
+        self.window = float(min(2, max_concurrency))
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.backoff = backoff
+        self.state = 'closed'
+        self.failures = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self._strikes = 0  # consecutive slow-downs, for the backoff
+        self._paused_until = 0.0
+        self._open_until = 0.0
+        self._trial = False
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _check_circuit(self):
+        if self.state == 'open':
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpen(self.name, f"circuit open for another {remaining:.0f}s")
+            self.state = 'half-open'
+        if self.state == 'half-open':
+            if self._trial:
+                raise CircuitOpen(self.name, "circuit half-open, trial request in progress")
+            self._trial = True
+
+    async def acquire(self):
+        self._check_circuit()
+        try:
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            while self.in_flight >= int(self.window):
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                try:
+                    await waiter
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+        except BaseException:
+            self._trial = False
+            raise
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        # A trial that ended without a verdict (e.g. cancelled) frees the next one
+        self._trial = False
+        self._wake()
+
+    def _wake(self):
+        free = int(self.window) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def record_success(self):
+        self.failures = 0
+        self._strikes = 0
+        self._trial = False
+        self.state = 'closed'
+        self.window = min(self.max_concurrency, self.window + 1 / self.window)
+        if self.bucket is not None:
+            self.bucket.rate = min(self.base_rate, self.bucket.rate + self.base_rate / 10)
+        self._wake()
+
+    def record_failure(self, throttled: bool = False, retry_after: Optional[float] = None):
+        """Slow down after a 429 (``throttled``), a 5xx or a connection error.
+
+        Only the latter two count towards opening the circuit.
+        """
+        now = time.monotonic()
+        self._strikes += 1
+        self.throttled += throttled
+        self.window = max(1.0, self.window / 2)
+        if self.bucket is not None:
+            self.bucket.rate = max(self.base_rate / 16, self.bucket.rate / 2)
+        if retry_after is None:
+            retry_after = min(60.0, self.backoff * 2 ** (self._strikes - 1))
+        self._paused_until = max(self._paused_until, now + retry_after)
+        if not throttled:
+            self._count_failure(now, retry_after)
+        self._trial = False
+
+    def record_exhausted(self):
+        """A request was still throttled after its last retry: a failure for the circuit."""
+        self._count_failure(time.monotonic(), 0.0)
+        self._trial = False
+
+    def _count_failure(self, now: float, retry_after: float):
+        self.failures += 1
+        if self.state == 'half-open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self._open_until = now + max(self.cooldown, retry_after)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            'state': self.state,
+            'rate': self.bucket.rate if self.bucket is not None else None,
+            'window': round(self.window, 2),
+            'failures': self.failures,
+            'throttled': self.throttled,
+        }
+
+
+class _Slot:
+    """One admitted request; tell it how the request went."""
+
+    def __init__(self, limiter: SourceLimiter):
+        self.limiter = limiter
+        self.recorded = False
+
+    def record(self, status: int, retry_after: Optional[float] = None):
+        self.recorded = True
+        if status in THROTTLE_STATUSES:
+            self.limiter.record_failure(throttled=status == 429, retry_after=retry_after)
+        else:
+            # 4xx other than 429 is an answer about the query, not source health
+            self.limiter.record_success()
+
+
+class RequestLimiter:
+    """Global in-flight cap plus adaptive per-source limits.
+
+    One instance is shared by every scanner of a batch so that limits, backoff
+    and open circuits hold across all domains, not per domain.
+    """
+
+    def __init__(self, max_in_flight: int = 100, source_rates: Optional[Dict[str, float]] = None,
+                 burst: float = 2.0, max_concurrency: int = 8, failure_threshold: int = 5,
+                 cooldown: float = 300.0):
+        self.max_in_flight = max_in_flight
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self.rates = {**DEFAULT_SOURCE_RATES, **(source_rates or {})}
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.sources: Dict[str, SourceLimiter] = {}
+
+    def source(self, name: str) -> SourceLimiter:
+        limiter = self.sources.get(name)
+        if limiter is None:
+            limiter = self.sources[name] = SourceLimiter(
+                name, self.rates.get(name), self.burst, self.max_concurrency,
+                self.failure_threshold, self.cooldown)
+        return limiter
+
+    def states(self) -> Dict[str, Dict[str, object]]:
+        return {name: limiter.snapshot() for name, limiter in self.sources.items()}
+
+    @asynccontextmanager
+    async def slot(self, source: str) -> AsyncIterator[_Slot]:
+        """Hold one request slot for ``source`` for the duration of the block.
+
+        Raises ``CircuitOpen`` while the source is being skipped. If the block
+        records no status, it counts as a failure when it raises
+        ``aiohttp.ClientError`` or ``asyncio.TimeoutError`` and as a success
+        when it ends normally; any other exception (a parser error, a
+        cancellation) is not held against the source.
+        """
+        limiter = self.source(source)
+        await limiter.acquire()
+        slot = _Slot(limiter)
+        try:
+            async with self._in_flight:
+                yield slot
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if not slot.recorded:
+                limiter.record_failure()
+            raise
+        else:
+            if not slot.recorded:
+                limiter.record_success()
+        finally:
+            limiter.release()
+
+
+@asynccontextmanager
+async def limited_request(session: aiohttp.ClientSession, limiter: RequestLimiter, source: str,
+                          method: str, url: str, retries: int = 2,
+                          observe: Optional[Callable[[int, float], None]] = None,
+                          **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+    """Issue a request through ``limiter``, retrying 429/5xx answers.
+
+    Retries wait out Retry-After (or backoff) via the source limiter. Raises
+    ``SourceThrottled`` if the source is still throttling after ``retries``.
+    ``observe(status, seconds)`` is called for every attempt with the time
+    from sending it to the response headers, limiter waits excluded.
+    """
+    for attempt in range(retries + 1):
+        async with limiter.slot(source) as slot:
+            start = time.perf_counter()
+            async with session.request(method, url, **kwargs) as response:
+                if observe is not None:
+                    observe(response.status, time.perf_counter() - start)
+                slot.record(response.status, parse_retry_after(response.headers.get('Retry-After')))
+                if response.status in THROTTLE_STATUSES:
+                    if attempt < retries:
+                        continue
+                    if response.status == 429:
+                        slot.limiter.record_exhausted()
+                    raise SourceThrottled(source, f"HTTP {response.status} after {retries + 1} attempts")
+                yield response
+                return
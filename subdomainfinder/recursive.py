@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from .brute_force import DEFAULT_WORDLIST, load_wordlist, resolve_many
+from .hoststore import HostStore
+from .resolver import AsyncResolver
+from .services import ServiceScanner
+from .wildcard import WildcardFilter
+
+if TYPE_CHECKING:
+    from .dnscache import DNSCache
+
+
+@dataclass
+class ZoneState:
+    zone: str
+    depth: int
+    evidence: int = 0  # hosts seen under the zone from anywhere
+    hits: int = 0  # hosts its own lookups found
+    queries: int = 0  # DNS queries spent on it
+    next_word: int = 0
+    passive_done: bool = False
+    wildcard: bool = False
+    version: int = 0  # bumped on every requeue; older heap entries are stale
+
+    def score(self, batch_size: int) -> float:
+        # Smoothed hosts-per-query: untried zones are ranked by the hosts
+        # already seen under them, tried ones increasingly by their own yield
+        return (self.hits + self.evidence + 1) / (self.queries + batch_size)
+
+
+class RecursiveScanner:
+    """Brute force and passive lookups over sub-zones, most productive zone first.
+
+    Every host found reveals its parent zones (``a.corp.example.com`` ->
+    ``corp.example.com``); zones up to ``max_depth`` labels below the root are
+    queued once each. The scheduler repeatedly picks the zone with the best
+    smoothed yield and spends one batch of ``batch_size`` wordlist queries on
+    it, so queries flow to zones that keep producing hosts. The run stops
+    when ``query_budget`` DNS queries have been spent or no zone has words
+    left. Zones answering for random labels (wildcards) are not brute forced.
+    """
+
+    def __init__(self, domain: str, hosts: Iterable[str] = (),
+                 wordlist: Union[str, Path, Iterable[str], None] = None,
+                 resolver: Optional[AsyncResolver] = None, concurrency: int = 1000,
+                 max_depth: int = 3, query_budget: int = 100_000, batch_size: int = 100,
+                 passive: bool = True, passive_timeout: float = 30.0,
+                 scanner_options: Optional[Dict[str, object]] = None,
+                 nameservers: Optional[Sequence[str]] = None, timeout: float = 2.0,
+                 retries: int = 2, dns_cache: Optional['DNSCache'] = None):
+        self.domain = domain.lower().strip('.')
+        self.seeds = [h.lower() for h in hosts]
+        self.wordlist = wordlist if wordlist is not None else DEFAULT_WORDLIST
+        self._owns_resolver = resolver is None
+        self.resolver = resolver or AsyncResolver(nameservers, timeout=timeout, retries=retries,
+                                                  max_in_flight=concurrency, cache=dns_cache)
+        self.concurrency = concurrency
+        self.max_depth = max_depth
+        self.query_budget = query_budget
+        self.batch_size = batch_size
+        self.passive = passive
+        self.passive_timeout = passive_timeout
+        # Passed to ServiceScanner for sub-zone lookups (cache, session, limiter, sources)
+        self.scanner_options = scanner_options or {}
+        self.wildcards = WildcardFilter(self.resolver)
+        self.zones: Dict[str, ZoneState] = {}
+        self.found = HostStore()
+        self.queries = 0
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+        self.logger = logging.getLogger('subdomainfinder.recursive')
+
+    def _push(self, state: ZoneState):
+        # Entries are never updated in place; stale ones are skipped on pop
+        state.version += 1
+        heapq.heappush(self._heap, (-state.score(self.batch_size), next(self._counter),
+                                    state.zone, state.version))
+
+    def _add_host(self, host: str, origin: Optional[ZoneState]) -> bool:
+        """Record a host, credit its zones and queue new ones; False if already known."""
+        if not host.endswith('.' + self.domain) or not self.found.add(host):
+            return False
+        if origin is not None:
+            origin.hits += 1
+        labels = host[:-len(self.domain) - 1].split('.')
+        # Parent zones of the host, nearest the root first
+        for depth in range(1, min(len(labels) - 1, self.max_depth) + 1):
+            zone = '.'.join(labels[-depth:]) + '.' + self.domain
+            state = self.zones.get(zone)
+            if state is None:
+                state = self.zones[zone] = ZoneState(zone, depth)
+                self.logger.debug(f"[Recursive] Queued zone {zone} (depth {depth})")
+            state.evidence += 1
+            if state is not origin:
+                self._push(state)
+        return True
+
+    async def _passive(self, state: ZoneState) -> AsyncIterator[str]:
+        state.passive_done = True
+        scanner = ServiceScanner(state.zone, **self.scanner_options)
+        async for _, host in scanner.scan_iter(source_timeout=self.passive_timeout):
+            if self._add_host(host, state):
+                yield host
+
+    async def _brute_batch(self, state: ZoneState, words: List[str]) -> AsyncIterator[str]:
+        if state.next_word == 0:
+            # A zone the filter already probed is answered from its cache
+            if not self.wildcards.probed(state.zone):
+                self.queries += self.wildcards.probes
+                state.queries += self.wildcards.probes
+            if await self.wildcards.zone_wildcard(state.zone):
+                state.wildcard = True
+                self.logger.info(f"[Recursive] {state.zone} is a wildcard zone, not brute forcing")
+                return
+            if self.queries >= self.query_budget:
+                return
+        size = max(0, min(self.batch_size, self.query_budget - self.queries))
+        batch = words[state.next_word:state.next_word + size]
+        state.next_word += len(batch)
+        state.queries += len(batch)
+        self.queries += len(batch)
+        names = (f"{word}.{state.zone}" for word in batch)
+        answers = (answer async for answer in resolve_many(self.resolver, names,
+                                                            concurrency=self.concurrency)
+                   if answer.found)
+        async for answer in self.wildcards.filter(answers):
+            if self._add_host(answer.name, state):
+                yield answer.name
+
+    async def run(self) -> AsyncIterator[Tuple[str, str]]:
+        """Yield ``(zone, host)`` for each new host, in the order zones are explored."""
+        words = list(load_wordlist(self.wordlist) if isinstance(self.wordlist, (str, Path))
+                     else self.wordlist)
+        root = self.zones[self.domain] = ZoneState(self.domain, 0, passive_done=bool(self.seeds))
+        for host in self.seeds:
+            self._add_host(host, None)
+        self._push(root)
+        try:
+            while self._heap and self.queries < self.query_budget:
+                _, _, zone, version = heapq.heappop(self._heap)
+                state = self.zones[zone]
+                exhausted = state.next_word >= len(words) and state.passive_done
+                if version != state.version or state.wildcard or exhausted:
+                    continue
+                if self.passive and not state.passive_done:
+                    async for host in self._passive(state):
+                        yield zone, host
+                if not state.wildcard and state.next_word < len(words):
+                    async for host in self._brute_batch(state, words):
+                        yield zone, host
+                if not state.wildcard and state.next_word < len(words):
+                    self._push(state)
+            if self.queries >= self.query_budget:
+                self.logger.info(f"[Recursive] Query budget of {self.query_budget} spent")
+        finally:
+            if self._owns_resolver:
+                self.resolver.close()
+
+    async def scan(self) -> Set[str]:
+        self.logger.info(f"Running recursive scan for {self.domain} (depth {self.max_depth}, "
+                         f"budget {self.query_budget} queries)")
+        async for _ in self.run():
+            pass
+        self.logger.info(f"[Recursive] Explored {len(self.zones)} zones with {self.queries} queries, "
+                         f"found {len(self.found)} subdomains")
+        return set(self.found)
@@ -0,0 +1,333 @@
+import asyncio
+import itertools
+import logging
+import random
+import socket
+import struct
+import time
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .metrics import Metrics
+
+if TYPE_CHECKING:
+    from .dnscache import DNSCache
+
+DEFAULT_NAMESERVERS = ['1.1.1.1', '8.8.8.8', '9.9.9.9', '1.0.0.1', '8.8.4.4']
+
+RDTYPES = {'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'AAAA': 28}
+
+# Response codes (RFC 1035 4.1.1)
+NOERROR = 0
+SERVFAIL = 2
+NXDOMAIN = 3
+REFUSED = 5
+RCODE_NAMES = {NOERROR: 'NOERROR', 1: 'FORMERR', SERVFAIL: 'SERVFAIL', NXDOMAIN: 'NXDOMAIN',
+               4: 'NOTIMP', REFUSED: 'REFUSED'}
+
+_HEADER = struct.Struct('!HHHHHH')
+_RR = struct.Struct('!HHIH')
+
+
+@dataclass
+class DNSAnswer:
+    """Parsed answer for a single question."""
+    name: str
+    rdtype: str
+    rcode: int
+    addresses: List[str] = field(default_factory=list)
+    cnames: List[str] = field(default_factory=list)
+    ttl: int = 0  # of the answer records; for a negative answer, the SOA negative TTL if sent
+
+    @property
+    def found(self) -> bool:
+        return self.rcode == NOERROR and bool(self.addresses or self.cnames)
+
+
+def parse_nameserver(server: str) -> Tuple[str, int]:
+    """Split ``host``, ``host:port`` or ``[v6]:port`` into an address tuple."""
+    if server.startswith('['):
+        host, _, port = server[1:].partition(']')
+        return host, int(port.lstrip(':') or 53)
+    if server.count(':') == 1:
+        host, port = server.split(':')
+        return host, int(port)
+    return server, 53
+
+
+def encode_question(name: str, qtype: int) -> bytes:
+    """Encode a question section (QNAME, QTYPE, QCLASS=IN)."""
+    out = bytearray()
+    for label in name.rstrip('.').split('.'):
+        raw = label.encode('ascii')
+        if not 0 < len(raw) < 64:
+            raise ValueError(f"Invalid label in {name!r}")
+        out.append(len(raw))
+        out += raw
+    out.append(0)
+    out += struct.pack('!HH', qtype, 1)
+    return bytes(out)
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    while True:
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += length + 1
+
+
+def _read_name(data: bytes, offset: int) -> str:
+    labels = []
+    for _ in range(128):  # guards against compression loops
+        length = data[offset]
+        if length == 0:
+            break
+        if length & 0xC0 == 0xC0:
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        labels.append(data[offset + 1:offset + 1 + length].decode('ascii', 'replace'))
+        offset += length + 1
+    return '.'.join(labels).lower()
+
+
+def parse_response(data: bytes, name: str, rdtype: str) -> DNSAnswer:
+    """Decode the answer section of a response into a :class:`DNSAnswer`."""
+    _, flags, qdcount, ancount, nscount, _ = _HEADER.unpack_from(data)
+    answer = DNSAnswer(name=name, rdtype=rdtype, rcode=flags & 0x000F)
+
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+
+    ttls = []
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        rtype, _, ttl, rdlength = _RR.unpack_from(data, offset)
+        offset += _RR.size
+        rdata = data[offset:offset + rdlength]
+        if rtype == 1 and rdlength == 4:
+            answer.addresses.append(socket.inet_ntop(socket.AF_INET, rdata))
+        elif rtype == 28 and rdlength == 16:
+            answer.addresses.append(socket.inet_ntop(socket.AF_INET6, rdata))
+        elif rtype == 5:
+            answer.cnames.append(_read_name(data, offset))
+        else:
+            offset += rdlength
+            continue
+        ttls.append(ttl)
+        offset += rdlength
+
+    if not (answer.addresses or answer.cnames):
+        # Negative answers are cached for min(SOA TTL, SOA MINIMUM), RFC 2308 section 5
+        for _ in range(nscount):
+            offset = _skip_name(data, offset)
+            rtype, _, ttl, rdlength = _RR.unpack_from(data, offset)
+            offset += _RR.size
+            if rtype == 6 and rdlength >= 4:
+                minimum = struct.unpack_from('!I', data, offset + rdlength - 4)[0]
+                ttls.append(min(ttl, minimum))
+                break
+            offset += rdlength
+
+    answer.ttl = min(ttls) if ttls else 0
+    return answer
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    """One UDP socket multiplexing many in-flight queries by message id."""
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, Tuple[Tuple[str, int], bytes, asyncio.Future]] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < _HEADER.size:
+            return
+        qid = (data[0] << 8) | data[1]
+        entry = self.pending.get(qid)
+        if entry is None:
+            return
+        server, question, future = entry
+        # Drop spoofed or stale datagrams that reuse an id for another query
+        if addr[0] != server[0] or addr[1] != server[1]:
+            return
+        if data[_HEADER.size:_HEADER.size + len(question)].lower() != question:
+            return
+        del self.pending[qid]
+        if not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        # ICMP errors cannot be tied to a query; the per-query timeout covers them
+        pass
+
+    def connection_lost(self, exc):
+        for _, _, future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('DNS socket closed'))
+        self.pending.clear()
+
+    def allocate_id(self) -> int:
+        while True:
+            qid = random.getrandbits(16)
+            if qid not in self.pending:
+                return qid
+
+
+def _expire(future: asyncio.Future):
+    if not future.done():
+        future.set_exception(asyncio.TimeoutError())
+
+
+class AsyncResolver:
+    """Asynchronous stub resolver over a pool of UDP sockets.
+
+    Queries are spread round-robin over ``sockets`` sockets per address family
+    and over the configured upstream ``nameservers``; at most ``max_in_flight``
+    queries are outstanding at once. With ``metrics`` every lookup is
+    recorded under the ``resolve`` stage. With a ``cache`` (which several
+    resolvers may share) answers are served from it while their TTL lasts,
+    and concurrent lookups of the same name share one query.
+    """
+
+    def __init__(self, nameservers: Optional[Sequence[str]] = None, timeout: float = 2.0,
+                 retries: int = 2, sockets: int = 8, max_in_flight: int = 2000,
+                 metrics: Optional[Metrics] = None, cache: Optional['DNSCache'] = None):
+        self.nameservers = [parse_nameserver(ns) for ns in (nameservers or DEFAULT_NAMESERVERS)]
+        self.timeout = timeout
+        self.retries = retries
+        self.sockets = sockets
+        self.metrics = metrics
+        self.cache = cache
+        self._inflight: Dict[Tuple[str, str], 'asyncio.Future[DNSAnswer]'] = {}
+        self.logger = logging.getLogger('subdomainfinder.resolver')
+        self._limit = asyncio.Semaphore(max_in_flight)
+        self._servers = itertools.cycle(self.nameservers)
+        self._pools: Dict[int, List[_DNSProtocol]] = {}
+        self._cycles: Dict[int, 'itertools.cycle'] = {}
+        self._start_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> 'AsyncResolver':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    async def start(self):
+        """Open the socket pools needed for the configured nameservers."""
+        async with self._start_lock:
+            loop = asyncio.get_running_loop()
+            for host, _ in self.nameservers:
+                family = socket.AF_INET6 if ':' in host else socket.AF_INET
+                if family in self._pools:
+                    continue
+                local = ('::', 0) if family == socket.AF_INET6 else ('0.0.0.0', 0)
+                pool = []
+                for _ in range(self.sockets):
+                    _, protocol = await loop.create_datagram_endpoint(
+                        _DNSProtocol, local_addr=local, family=family)
+                    pool.append(protocol)
+                self._pools[family] = pool
+                self._cycles[family] = itertools.cycle(pool)
+
+    def close(self):
+        for pool in self._pools.values():
+            for protocol in pool:
+                if protocol.transport is not None:
+                    protocol.transport.close()
+        self._pools.clear()
+        self._cycles.clear()
+
+    async def _query_once(self, question: bytes, server: Tuple[str, int]) -> bytes:
+        family = socket.AF_INET6 if ':' in server[0] else socket.AF_INET
+        protocol = next(self._cycles[family])
+        qid = protocol.allocate_id()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        protocol.pending[qid] = (server, question.lower(), future)
+        handle = loop.call_later(self.timeout, _expire, future)
+        try:
+            protocol.transport.sendto(_HEADER.pack(qid, 0x0100, 1, 0, 0, 0) + question, server)
+            return await future
+        finally:
+            handle.cancel()
+            protocol.pending.pop(qid, None)
+
+    async def resolve(self, name: str, rdtype: str = 'A') -> DNSAnswer:
+        """Resolve ``name``; raises ``asyncio.TimeoutError`` once retries are exhausted."""
+        if self.metrics is None:
+            return await self._lookup(name, rdtype)
+        stats = self.metrics.stage('resolve')
+        stats.items_in += 1
+        start = time.perf_counter()
+        try:
+            answer = await self._lookup(name, rdtype)
+        except asyncio.TimeoutError:
+            stats.outcomes['timeout'] += 1
+            raise
+        except ValueError:
+            stats.outcomes['invalid'] += 1
+            raise
+        finally:
+            stats.latency.observe(time.perf_counter() - start)
+        stats.outcomes[RCODE_NAMES.get(answer.rcode, str(answer.rcode))] += 1
+        if answer.found:
+            stats.items_out += 1
+        return answer
+
+    async def _lookup(self, name: str, rdtype: str) -> DNSAnswer:
+        if self.cache is None:
+            return await self._resolve(name, rdtype)
+        answer = self.cache.get(name, rdtype)
+        if answer is not None:
+            return answer
+        key = (name.lower().rstrip('.'), rdtype)
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self._resolve_and_store(name, rdtype))
+            future.add_done_callback(lambda f: self._settled(key, f))
+        # One waiter giving up must not cancel the query for the others
+        answer = await asyncio.shield(future)
+        return replace(answer, name=name, addresses=list(answer.addresses), cnames=list(answer.cnames))
+
+    def _settled(self, key: Tuple[str, str], future: 'asyncio.Future[DNSAnswer]'):
+        self._inflight.pop(key, None)
+        # Retrieved here so a failure nobody is left waiting for is not logged as unhandled
+        if not future.cancelled():
+            future.exception()
+
+    async def _resolve_and_store(self, name: str, rdtype: str) -> DNSAnswer:
+        answer = await self._resolve(name, rdtype)
+        self.cache.put(answer)
+        return answer
+
+    async def _resolve(self, name: str, rdtype: str) -> DNSAnswer:
+        if not self._pools:
+            await self.start()
+        question = encode_question(name, RDTYPES[rdtype])
+
+        async with self._limit:
+            answer = None
+            for _ in range(self.retries + 1):
+                try:
+                    data = await self._query_once(question, next(self._servers))
+                except (asyncio.TimeoutError, ConnectionError):
+                    continue
+                try:
+                    answer = parse_response(data, name, rdtype)
+                except (IndexError, struct.error):
+                    self.logger.debug(f"Malformed response for {name}")
+                    continue
+                # Another upstream may do better than a failing one
+                if answer.rcode not in (SERVFAIL, REFUSED):
+                    return answer
+            if answer is not None:
+                return answer
+        raise asyncio.TimeoutError(f"No answer for {name} after {self.retries + 1} attempts")
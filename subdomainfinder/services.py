@@ -1,205 +1,392 @@
 import asyncio
 import logging
-from typing import List, Set
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
 import aiohttp
-from bs4 import BeautifulSoup
-import json
-import os
 from dotenv import load_dotenv
 
+from .cache import ResponseCache
+from .enums import CacheMode
+from .metrics import Metrics
+from .parsing import ParseExecutor, default_parse_executor
+from .ratelimit import RequestLimiter, SourceUnavailable, limited_request
+from .sources import Endpoint, Parser, Source, select_sources
+from .utils import validator_for
+
 load_dotenv()
 
+DEFAULT_SOURCE_TIMEOUT = 60.0
+
+
+async def stream_sources(sources: Dict[str, Callable[[], object]],
+                         source_timeout: Optional[float] = DEFAULT_SOURCE_TIMEOUT,
+                         budget: Optional[float] = None,
+                         status: Optional[Dict[str, str]] = None,
+                         errors: Optional[Dict[str, str]] = None) -> AsyncIterator[Tuple[str, str]]:
+    """Run sources concurrently and yield ``(source, host)`` for each new host.
+
+    Each source is a zero-argument callable returning either an awaitable of an
+    iterable of hosts or an async iterator of hosts; an async iterator may also
+    yield ``(source, host)`` pairs when one fetch serves several sources. A source is cancelled after
+    ``source_timeout`` seconds and the whole run after ``budget`` seconds; hosts
+    already produced are kept. ``status`` (if given) receives each source's
+    outcome: ``ok``, ``timeout``, ``throttled``, ``circuit_open``, ``error``
+    or ``cancelled``, and ``errors`` (if given) the exception class of each
+    source that did not finish.
+    """
+    logger = logging.getLogger('subdomainfinder.services')
+    status = status if status is not None else {}
+    errors = errors if errors is not None else {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=10000)
+    done = object()
+
+    async def drain(name, source):
+        result = source()
+        if hasattr(result, '__aiter__'):
+            async for host in result:
+                await queue.put(host if isinstance(host, tuple) else (name, host))
+        else:
+            for host in await result:
+                await queue.put((name, host))
+
+    async def run(name, source):
+        try:
+            await asyncio.wait_for(drain(name, source), source_timeout)
+            status[name] = 'ok'
+        except asyncio.TimeoutError:
+            status[name] = 'timeout'
+            errors[name] = 'TimeoutError'
+            logger.info(f"[{name}] timed out after {source_timeout}s")
+        except asyncio.CancelledError:
+            status[name] = 'cancelled'
+            raise
+        except SourceUnavailable as e:
+            status[name] = e.status
+            errors[name] = type(e).__name__
+            logger.info(f"[{name}] {e}")
+        except Exception as e:
+            status[name] = 'error'
+            errors[name] = type(e).__name__
+            logger.debug(f"[{name}] failed: {e!r}")
+        await queue.put(done)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget if budget is not None else None
+    tasks = [asyncio.ensure_future(run(name, source)) for name, source in sources.items()]
+    remaining = len(tasks)
+    seen = set()
+    try:
+        while remaining:
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                logger.info(f"Scan budget of {budget}s exhausted with {remaining} sources pending")
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            if item is done:
+                remaining -= 1
+                continue
+            name, host = item
+            host = host.lower()
+            if host not in seen:
+                seen.add(host)
+                yield name, host
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class SourceContext:
+    """What a source's own ``fetch`` may use: cached, rate-limited HTTP on the scan's session."""
+
+    def __init__(self, scanner: 'ServiceScanner', session: aiohttp.ClientSession):
+        self._scanner = scanner
+        self._session = session
+
+    @property
+    def cache_only(self) -> bool:
+        return self._scanner.cache_mode is CacheMode.CACHE_ONLY
+
+    def cached(self, source: str, key: str) -> Optional[bytes]:
+        return self._scanner._from_cache(source, key)
+
+    def request(self, endpoint: Endpoint):
+        """Uncached request, as an async context manager yielding the response."""
+        return self._scanner._request(self._session, endpoint.source, endpoint.method,
+                                      endpoint.url, **endpoint.kwargs)
+
+    def stream(self, endpoint: Endpoint) -> AsyncIterator[bytes]:
+        return self._scanner._stream(self._session, endpoint.source, endpoint.url,
+                                     method=endpoint.method, key=endpoint.key, **endpoint.kwargs)
+
+    async def fetch(self, endpoint: Endpoint) -> Optional[bytes]:
+        parts = [chunk async for chunk in self.stream(endpoint)]
+        return b''.join(parts) if parts else None
+
+    async def body(self, data: bytes) -> AsyncIterator[bytes]:
+        """An already fetched body as a page."""
+        yield data
+
+
 class ServiceScanner:
-    def __init__(self, domain: str):
-        self.domain = domain
+    """Passive scan of one domain over the sources in the registry.
+
+    ``sources`` names the sources to run and ``disabled`` the ones to skip
+    (see ``select_sources`` for the defaults); ``base_urls`` overrides where
+    a source is fetched from. With ``metrics`` each source's requests,
+    bytes, parse time and host counts are recorded there. Large parser
+    steps run on ``parse_executor`` (default: a shared thread pool) so they
+    do not stall the event loop.
+    """
+
+    def __init__(self, domain: str, cache: Optional[ResponseCache] = None,
+                 cache_mode: CacheMode = CacheMode.NORMAL,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 limiter: Optional[RequestLimiter] = None,
+                 sources: Optional[Iterable[str]] = None,
+                 disabled: Optional[Iterable[str]] = None,
+                 base_urls: Optional[Dict[str, str]] = None,
+                 metrics: Optional[Metrics] = None,
+                 parse_executor: Optional[ParseExecutor] = None):
+        self.domain = domain.lower()
         self.logger = logging.getLogger('subdomainfinder.services')
-        self.virustotal_api_key = os.getenv('VIRUSTOTAL_API_KEY')
+        self.cache = cache
+        self.cache_mode = cache_mode
+        # A shared session/limiter lets many scanners run over one connection pool
+        self.session = session
+        self.limiter = limiter if limiter is not None else RequestLimiter()
+        self.sources: List[Source] = select_sources(sources, disabled, base_urls)
+        self.source_status: Dict[str, str] = {}
+        self.metrics = metrics
+        self.parse_executor = parse_executor or default_parse_executor()
 
     # -----------------------------
-    # 1) VIRUSTOTAL (cũ)
+    # HTTP + response cache
     # -----------------------------
-    async def _search_virustotal(self, session: aiohttp.ClientSession) -> Set[str]:
-        if not self.virustotal_api_key:
-            return set()
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        if self.session is not None:
+            yield self.session
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
 
-        url = "https://www.virustotal.com/vtapi/v2/domain/report"
-        params = {'apikey': self.virustotal_api_key, 'domain': self.domain}
+    @asynccontextmanager
+    async def _request(self, session: aiohttp.ClientSession, source: str, method: str,
+                       url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Issue a request, holding a limiter slot for ``source`` while it is open."""
+        observe = self.metrics.source(source).observe_request if self.metrics is not None else None
+        async with limited_request(session, self.limiter, source, method, url,
+                                   observe=observe, **kwargs) as response:
+            yield response
 
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return set(data.get('subdomains', []))
-        except:
-            pass
-        return set()
+    def _usable(self, source: str, entry) -> bool:
+        """Whether a cached entry may be used without asking the source."""
+        return entry is not None and (
+            self.cache_mode is CacheMode.CACHE_ONLY
+            or (self.cache_mode is CacheMode.NORMAL and self.cache.is_fresh(source, entry)))
 
-    # -----------------------------
-    # 2) DNSDumpster (cũ)
-    # -----------------------------
-    async def _search_dnsdumpster(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = "https://dnsdumpster.com/"
-        subdomains = set()
+    def _from_cache(self, source: str, key: str) -> Optional[bytes]:
+        entry = self.cache.get(source, key) if self.cache is not None else None
+        return entry.body if self._usable(source, entry) else None
 
-        try:
-            async with session.get(url) as response:
-                text = await response.text()
-                soup = BeautifulSoup(text, 'html.parser')
-                csrf_elem = soup.find('input', {'name': 'csrfmiddlewaretoken'})
-                if not csrf_elem:
-                    return subdomains
-
-                csrf_token = csrf_elem.get('value')
-                headers = {
-                    'Referer': url,
-                    'Cookie': f'csrftoken={csrf_token}',
-                    'User-Agent': 'Mozilla/5.0'
-                }
-                data = {
-                    'csrfmiddlewaretoken': csrf_token,
-                    'targetip': self.domain
-                }
-
-                async with session.post(url, headers=headers, data=data) as search_response:
-                    html = await search_response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    tables = soup.findAll('table')
-                    for table in tables:
-                        for row in table.findAll('tr'):
-                            cols = row.findAll('td')
-                            if cols:
-                                s = cols[0].text.strip()
-                                if s.endswith(self.domain):
-                                    subdomains.add(s.lower())
-        except:
-            pass
-
-        return subdomains
+    async def _stream(self, session: aiohttp.ClientSession, source: str, url: str,
+                      method: str = 'GET', key: Optional[str] = None,
+                      chunk_size: int = 1 << 16, **kwargs) -> AsyncIterator[bytes]:
+        """Stream a response body through the cache; nothing on a non-200 answer or cache miss."""
+        key = key or url
+        entry = self.cache.get(source, key) if self.cache is not None else None
+        if not self._usable(source, entry):
+            if self.cache_mode is CacheMode.CACHE_ONLY:
+                return
+
+            headers = dict(kwargs.pop('headers', None) or {})
+            if entry is not None:
+                if entry.etag:
+                    headers['If-None-Match'] = entry.etag
+                if entry.last_modified:
+                    headers['If-Modified-Since'] = entry.last_modified
+
+            async with self._request(session, source, method, url, headers=headers, **kwargs) as response:
+                if response.status == 304 and entry is not None:
+                    self.cache.touch(source, key)
+                elif response.status != 200:
+                    response.raise_for_status()
+                    return
+                else:
+                    # The body is compressed to a temporary file as it streams and
+                    # only stored once complete; a truncated body is never cached.
+                    # Storing it runs in a thread so a large body does not stall
+                    # the other sources.
+                    body = (self.cache.writer(source, key, response.headers.get('ETag'),
+                                              response.headers.get('Last-Modified'))
+                            if self.cache is not None else nullcontext())
+                    stats = self.metrics.source(source) if self.metrics is not None else None
+                    with body:
+                        async for chunk in response.content.iter_chunked(chunk_size):
+                            if stats is not None:
+                                stats.bytes += len(chunk)
+                            if self.cache is not None:
+                                body.write(chunk)
+                            yield chunk
+                        if self.cache is not None:
+                            await asyncio.get_running_loop().run_in_executor(None, body.commit)
+                    return
+
+        stats = self.metrics.source(source) if self.metrics is not None else None
+        for chunk in entry.iter_body(chunk_size):
+            if stats is not None:
+                stats.cached_bytes += len(chunk)
+            yield chunk
+            # Let other sources run while a large cached body is parsed
+            await asyncio.sleep(0)
 
     # -----------------------------
-    # 3) CRT.SH (cũ)
+    # Sources
     # -----------------------------
-    async def _search_crtsh(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"https://crt.sh/?q=%.{self.domain}&output=json"
-        subdomains = set()
+    def _in_scope(self, host: str) -> bool:
+        return host == self.domain or host.endswith('.' + self.domain)
 
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    for entry in data:
-                        name = entry.get('name_value', '').lower()
-                        if name.endswith(self.domain):
-                            subdomains.add(name)
-        except:
-            pass
-
-        return subdomains
-
-    # ======================================
-    # 🔥 THÊM 5 NGUỒN PASSIVE MỚI SIÊU MẠNH
-    # ======================================
-
-    # 4) WAYBACK MACHINE
-    async def _search_wayback(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"http://web.archive.org/cdx/search/cdx?url=*.{self.domain}/*&output=json&fl=original"
-        subs = set()
+    def _scoped(self, name: str, hosts: Iterable[str]) -> List[Tuple[str, str]]:
+        scoped = []
+        raw = 0
+        for host in hosts:
+            raw += 1
+            host = host.strip().lower()
+            if self._in_scope(host):
+                scoped.append((name, host))
+        if self.metrics is not None:
+            self._count(name, raw, scoped)
+        return scoped
 
+    def _count(self, name: str, raw: int, scoped: List[Tuple[str, str]]):
+        stats = self.metrics.source(name)
+        stats.raw += raw
+        is_valid = validator_for(self.domain).is_valid
+        for _, host in scoped:
+            if is_valid(host):
+                stats.valid += 1
+                self.metrics.saw(name, host)
+
+    async def _parsed(self, name: str, parser: Parser, chunk: Optional[bytes] = None) -> List[Tuple[str, str]]:
+        """Feed ``chunk`` to the parser (or finish it without one) and scope the hosts it gives."""
+        start = time.perf_counter() if self.metrics is not None else 0.0
+        if chunk is None:
+            hosts = await self.parse_executor.finish(parser)
+        else:
+            hosts = await self.parse_executor.feed(parser, chunk)
+        if self.metrics is not None:
+            self.metrics.source(name).parse_seconds += time.perf_counter() - start
+        return self._scoped(name, hosts)
+
+    async def _run_single(self, context: SourceContext, source: Source) -> AsyncIterator[Tuple[str, str]]:
+        """Fetch a simple source's one endpoint, yielding hosts as the body parses."""
+        parser = source.parser(self.domain)
+        async for chunk in context.stream(source.endpoint(self.domain)):
+            for item in await self._parsed(source.name, parser, chunk):
+                yield item
+        for item in await self._parsed(source.name, parser):
+            yield item
+
+    async def _run_pages(self, context: SourceContext, source: Source) -> AsyncIterator[Tuple[str, str]]:
+        """Parse the pages of a source's own fetch, several at once, yielding hosts as they parse."""
+        pages = source.fetch(context, source, self.domain)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        lock = asyncio.Lock()
+        done = object()
+        errors: List[BaseException] = []
+
+        async def worker():
+            while True:
+                # Async generators cannot be advanced concurrently
+                async with lock:
+                    try:
+                        page = await pages.__anext__()
+                    except StopAsyncIteration:
+                        return
+                parser = source.parser(self.domain)
+                async for chunk in page:
+                    for item in await self._parsed(source.name, parser, chunk):
+                        await queue.put(item)
+                for item in await self._parsed(source.name, parser):
+                    await queue.put(item)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, source.page_concurrency))]
+
+        async def run():
+            try:
+                await asyncio.gather(*workers)
+            except Exception as e:
+                errors.append(e)
+            await queue.put(done)
+
+        runner = asyncio.ensure_future(run())
         try:
-            async with session.get(url) as response:
-                data = await response.json()
-                for row in data[1:]:
-                    host = row[0].split("/")[2]
-                    if host.endswith(self.domain):
-                        subs.add(host.lower())
-        except:
-            pass
-        return subs
-
-    # 5) BUFFERRUN / BUFOVER.RUN
-    async def _search_bufferover(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"https://dns.bufferover.run/dns?q=.{self.domain}"
-        subs = set()
-        try:
-            async with session.get(url) as response:
-                data = await response.json()
-                for item in data.get("FDNS_A", []):
-                    host = item.split(",")[-1]
-                    if host.endswith(self.domain):
-                        subs.add(host.lower())
-        except:
-            pass
-        return subs
-
-    # 6) THREATCROWD
-    async def _search_threatcrowd(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"https://www.threatcrowd.org/searchApi/v2/domain/report/?domain={self.domain}"
-        subs = set()
-        try:
-            async with session.get(url) as response:
-                data = await response.json()
-                for s in data.get("subdomains", []):
-                    if s.endswith(self.domain):
-                        subs.add(s.lower())
-        except:
-            pass
-        return subs
-
-    # 7) CERTSPOTTER
-    async def _search_certspotter(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"https://api.certspotter.com/v1/issuances?domain=*.{self.domain}&include_subdomains=true&expand=dns_names"
-        subs = set()
-        try:
-            async with session.get(url) as response:
-                data = await response.json()
-                for entry in data:
-                    for dns in entry.get("dns_names", []):
-                        if dns.endswith(self.domain):
-                            subs.add(dns.lower())
-        except:
-            pass
-        return subs
-
-    # 8) ALIENVAULT OTX
-    async def _search_otx(self, session: aiohttp.ClientSession) -> Set[str]:
-        url = f"https://otx.alienvault.com/api/v1/indicators/domain/{self.domain}/passive_dns"
-        subs = set()
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            if errors:
+                raise errors[0]
+        finally:
+            for task in (*workers, runner):
+                task.cancel()
+            await asyncio.gather(*workers, runner, return_exceptions=True)
+            await pages.aclose()
 
+    async def _timed(self, name: str, items: AsyncIterator[Tuple[str, str]]) -> AsyncIterator[Tuple[str, str]]:
+        start = time.perf_counter()
         try:
-            async with session.get(url) as response:
-                data = await response.json()
-                for item in data.get("passive_dns", []):
-                    host = item.get("hostname", "")
-                    if host.endswith(self.domain):
-                        subs.add(host.lower())
-        except:
-            pass
-        return subs
-
-    # ======================================
-    # RUN ALL SERVICES
-    # ======================================
-
-    async def scan(self) -> Set[str]:
+            async for item in items:
+                yield item
+        finally:
+            self.metrics.source(name).seconds += time.perf_counter() - start
+
+    def _sources(self, session: aiohttp.ClientSession) -> Dict[str, Callable[[], object]]:
+        context = SourceContext(self, session)
+        runs = {}
+        for source in self.sources:
+            if source.fetch is not None:
+                run = lambda source=source: self._run_pages(context, source)
+            else:
+                run = lambda source=source: self._run_single(context, source)
+            if self.metrics is not None:
+                run = lambda run=run, name=source.name: self._timed(name, run())
+            runs[source.name] = run
+        return runs
+
+    async def scan_iter(self, source_timeout: Optional[float] = DEFAULT_SOURCE_TIMEOUT,
+                        budget: Optional[float] = None) -> AsyncIterator[Tuple[str, str]]:
+        """Yield ``(source, subdomain)`` for each new subdomain as sources complete.
+
+        Per-source outcomes are recorded in ``self.source_status``.
+        """
         self.logger.info(f"Running passive service scan for {self.domain}")
+        self.source_status = {}
+        status: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+
+        try:
+            async with self._session() as session:
+                async for item in stream_sources(self._sources(session), source_timeout,
+                                                 budget, status, errors):
+                    yield item
+        finally:
+            for name, outcome in status.items():
+                self.source_status[name] = outcome
+                if self.metrics is not None:
+                    stats = self.metrics.source(name)
+                    stats.status = outcome
+                    stats.error = errors.get(name)
 
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._search_virustotal(session),
-                self._search_dnsdumpster(session),
-                self._search_crtsh(session),
-                self._search_wayback(session),
-                self._search_bufferover(session),
-                self._search_threatcrowd(session),
-                self._search_certspotter(session),
-                self._search_otx(session),
-            ]
-
-            results = await asyncio.gather(*tasks)
-
-        all_subs = set()
-        for rs in results:
-            all_subs.update(rs)
+    async def scan(self, source_timeout: Optional[float] = DEFAULT_SOURCE_TIMEOUT,
+                   budget: Optional[float] = None) -> Set[str]:
+        all_subs = {sub async for _, sub in self.scan_iter(source_timeout, budget)}
 
         self.logger.info(f"[Services] Found {len(all_subs)} subdomains")
         return all_subs
@@ -0,0 +1,365 @@
+import codecs
+import html
+import math
+import os
+import re
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from .jsonstream import JSONStringScanner
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Environment overrides for which sources run (comma separated names)
+SOURCES_ENV = 'SUBDOMAINFINDER_SOURCES'
+DISABLED_SOURCES_ENV = 'SUBDOMAINFINDER_DISABLED_SOURCES'
+
+
+# -----------------------------
+# Parsers
+# -----------------------------
+class Parser:
+    """Incremental body parser: ``feed`` chunks as they arrive, then ``finish``."""
+
+    def feed(self, chunk: bytes) -> Iterable[str]:
+        return ()
+
+    def finish(self) -> Iterable[str]:
+        return ()
+
+    @property
+    def backlog(self) -> int:
+        """Bytes of input ``finish`` still has to work through."""
+        return 0
+
+
+class JSONStringsParser(Parser):
+    """String values of a JSON body (only under ``keys`` if given), mapped through ``transform``."""
+
+    def __init__(self, keys: Optional[Iterable[str]] = None,
+                 transform: Optional[Callable[[str], Iterable[str]]] = None):
+        self._scanner = JSONStringScanner(keys)
+        self._transform = transform
+
+    def feed(self, chunk: bytes) -> List[str]:
+        values = [value for _, value in self._scanner.feed(chunk)]
+        if self._transform is None:
+            return values
+        return [host for value in values for host in self._transform(value)]
+
+
+class BodyParser(Parser):
+    """Buffers the whole body and hands it to ``parse`` at the end; for small responses."""
+
+    def __init__(self, parse: Callable[[str], Iterable[str]]):
+        self._parse = parse
+        self._parts: List[bytes] = []
+        self._size = 0
+
+    def feed(self, chunk: bytes) -> Iterable[str]:
+        self._parts.append(chunk)
+        self._size += len(chunk)
+        return ()
+
+    def finish(self) -> Iterable[str]:
+        return self._parse(b''.join(self._parts).decode('utf-8', 'replace'))
+
+    @property
+    def backlog(self) -> int:
+        return self._size
+
+
+_ROW_END = re.compile(r'</tr\s*>', re.IGNORECASE)
+_FIRST_CELL = re.compile(r'<td\b[^>]*>(.*?)</td\s*>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^>]*>')
+
+
+class TableCellsParser(Parser):
+    """Text of the first cell of every table row of an HTML page, as rows arrive.
+
+    A targeted extractor rather than a DOM: complete ``<tr>...</tr>`` rows
+    are cut out of the stream with regular expressions and only the
+    unfinished row is carried to the next chunk. Cell text is what a DOM's
+    ``.text`` would give: tags dropped, entities decoded.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+
+    def _rows(self, text: str, scanned: int = 0) -> List[str]:
+        cells = []
+        start = 0
+        # Text before ``scanned`` is known to hold no row end
+        for end in _ROW_END.finditer(text, scanned):
+            cell = _FIRST_CELL.search(text, start, end.start())
+            if cell is not None:
+                cells.append(html.unescape(_TAG.sub('', cell.group(1))))
+            start = end.end()
+        self._buffer = text[start:]
+        return cells
+
+    def feed(self, chunk: bytes) -> List[str]:
+        scanned = max(0, len(self._buffer) - 8)  # a "</tr >" may straddle the chunks
+        return self._rows(self._buffer + self._decoder.decode(chunk), scanned)
+
+    def finish(self) -> List[str]:
+        # A last row missing its closing tag still counts
+        return self._rows(self._buffer + self._decoder.decode(b'', final=True) + '</tr>')
+
+
+def _url_host(url: str) -> List[str]:
+    # "scheme://host:port/path" -> host; the CDX header row ("original") has no host
+    parts = url.split('/')
+    return [parts[2].split(':')[0]] if len(parts) >= 3 else []
+
+
+_INPUT = re.compile(r'<input\b[^>]*>', re.IGNORECASE)
+_ATTRIBUTE = re.compile(r'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+
+def _input_value(page: str, name: str) -> Optional[str]:
+    """``value`` of the ``<input name=...>`` field of a form, if there is one."""
+    for tag in _INPUT.finditer(page):
+        attributes = {key.lower(): html.unescape(''.join(values))
+                      for key, *values in _ATTRIBUTE.findall(tag.group(0))}
+        if attributes.get('name') == name:
+            return attributes.get('value')
+    return None
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+@dataclass(frozen=True)
+class Endpoint:
+    """One HTTP request a source needs."""
+
+    source: str  # rate-limit and cache namespace
+    url: str
+    method: str = 'GET'
+    key: Optional[str] = None  # cache key if it must differ from the URL
+    kwargs: Dict[str, Any] = field(default_factory=dict, compare=False, hash=False)
+
+
+@dataclass(frozen=True)
+class Source:
+    """A passive source: where to ask, how to read the answer and how hard to push.
+
+    Simple sources are one GET of ``base_url + path`` (``path`` is formatted
+    with ``domain``). Sources needing more than that (a login step, paging)
+    set ``fetch``, an async generator ``fetch(context, source, domain)``
+    yielding pages, each an async iterator of body chunks that gets a parser
+    of its own; up to ``page_concurrency`` pages are read at once.
+    """
+
+    name: str
+    base_url: str
+    path: str
+    parser: Callable[[str], Parser]  # domain -> fresh parser
+    rate: float = 1.0  # sustained requests per second across a run
+    ttl: int = DAY  # how long a cached response is served without revalidating
+    enabled: bool = True
+    api_key_env: Optional[str] = None  # skipped unless this variable is set
+    api_key_param: str = 'apikey'
+    fetch: Optional[Callable[[Any, 'Source', str], AsyncIterator[AsyncIterator[bytes]]]] = None
+    page_concurrency: int = 4
+
+    def url(self, domain: str) -> str:
+        return self.base_url + self.path.format(domain=domain)
+
+    @property
+    def available(self) -> bool:
+        return self.api_key_env is None or bool(os.getenv(self.api_key_env))
+
+    def endpoint(self, domain: str) -> Endpoint:
+        kwargs = {}
+        if self.api_key_env:
+            # as a request parameter so the key never ends up in the cache key
+            kwargs['params'] = {self.api_key_param: os.getenv(self.api_key_env, '')}
+        return Endpoint(self.name, self.url(domain), kwargs=kwargs)
+
+
+# -----------------------------
+# Custom fetches
+# -----------------------------
+OTX_PAGE_SIZE = 500
+
+_COUNT = re.compile(rb'"count"\s*:\s*(\d+)')
+_ISSUANCE_ID = re.compile(rb'"id"\s*:\s*"?(\d+)')
+
+
+async def _fetch_dnsdumpster(context, source: Source, domain: str) -> AsyncIterator[AsyncIterator[bytes]]:
+    # The search form is CSRF protected: fetch the token, then POST the query
+    url = source.base_url + '/'
+    key = f"{url}?targetip={domain}"
+    cached = context.cached(source.name, key)
+    if cached is not None:
+        yield context.body(cached)
+        return
+    if context.cache_only:
+        return
+
+    async with context.request(Endpoint(source.name, url)) as response:
+        response.raise_for_status()
+        text = await response.text()
+    csrf_token = _input_value(text, 'csrfmiddlewaretoken')
+    if csrf_token is None:
+        return
+
+    headers = {
+        'Referer': url,
+        'Cookie': f'csrftoken={csrf_token}',
+        'User-Agent': 'Mozilla/5.0'
+    }
+    data = {
+        'csrfmiddlewaretoken': csrf_token,
+        'targetip': domain
+    }
+    yield context.stream(Endpoint(source.name, url, 'POST', key, {'headers': headers, 'data': data}))
+
+
+async def _fetch_wayback(context, source: Source, domain: str) -> AsyncIterator[AsyncIterator[bytes]]:
+    # Unpaged CDX queries are cut short on big domains; ask how many pages
+    # there are, then every page can be fetched independently
+    url = source.url(domain)
+    body = await context.fetch(Endpoint(source.name, url + '&showNumPages=true'))
+    try:
+        pages = int((body or b'').strip())
+    except ValueError:
+        yield context.stream(Endpoint(source.name, url))
+        return
+    for page in range(pages):
+        yield context.stream(Endpoint(source.name, f'{url}&page={page}'))
+
+
+async def _fetch_otx(context, source: Source, domain: str) -> AsyncIterator[AsyncIterator[bytes]]:
+    # The first page carries the total count, after which pages are independent
+    url = f'{source.url(domain)}?limit={OTX_PAGE_SIZE}&page='
+    first = await context.fetch(Endpoint(source.name, url + '1'))
+    if first is None:
+        return
+    yield context.body(first)
+    match = _COUNT.search(first)
+    pages = math.ceil(int(match.group(1)) / OTX_PAGE_SIZE) if match else 1
+    for page in range(2, pages + 1):
+        yield context.stream(Endpoint(source.name, f'{url}{page}'))
+
+
+async def _fetch_certspotter(context, source: Source, domain: str) -> AsyncIterator[AsyncIterator[bytes]]:
+    # Cursor paging: each request continues after the last issuance id seen
+    url = source.url(domain)
+    after = None
+    while True:
+        body = await context.fetch(Endpoint(source.name, f'{url}&after={after}' if after else url))
+        if not body:
+            return
+        yield context.body(body)
+        ids = _ISSUANCE_ID.findall(body)
+        if not ids or ids[-1].decode() == after:
+            return
+        after = ids[-1].decode()
+
+
+# Each source fetches its own endpoint, so an endpoint is requested once per
+# scan only as long as no two sources share one; register() enforces that.
+SOURCES: Dict[str, Source] = {}
+
+
+def _check_endpoints(sources: Iterable[Source]):
+    """Raise ValueError if two sources would request the same URL."""
+    owners: Dict[str, str] = {}
+    for source in sources:
+        template = source.base_url + source.path
+        if owners.setdefault(template, source.name) != source.name:
+            raise ValueError(f"Sources {owners[template]} and {source.name} share the endpoint {template}")
+
+
+def register(source: Source) -> Source:
+    _check_endpoints([*(s for s in SOURCES.values() if s.name != source.name), source])
+    SOURCES[source.name] = source
+    return source
+
+
+register(Source(
+    'virustotal', 'https://www.virustotal.com', '/vtapi/v2/domain/report?domain={domain}',
+    lambda domain: JSONStringsParser(keys=('subdomains',)),
+    rate=4 / 60,  # public API quota
+    api_key_env='VIRUSTOTAL_API_KEY'))
+register(Source(
+    'dnsdumpster', 'https://dnsdumpster.com', '/',
+    lambda domain: TableCellsParser(),
+    rate=0.5, fetch=_fetch_dnsdumpster))
+register(Source(
+    'crtsh', 'https://crt.sh', '/?q=%.{domain}&output=json',
+    # name_value holds one or more names separated by newlines
+    lambda domain: JSONStringsParser(keys=('name_value',), transform=lambda v: v.split('\n')),
+    ttl=12 * HOUR))
+register(Source(
+    'wayback', 'http://web.archive.org', '/cdx/search/cdx?url=*.{domain}/*&output=json&fl=original',
+    lambda domain: JSONStringsParser(transform=_url_host),
+    ttl=7 * DAY, fetch=_fetch_wayback))
+register(Source(
+    'bufferover', 'https://dns.bufferover.run', '/dns?q=.{domain}',
+    # FDNS_A entries are "ip,host"
+    lambda domain: JSONStringsParser(keys=('FDNS_A',), transform=lambda v: v.split(',')[-1:]),
+    rate=2.0))
+register(Source(
+    'threatcrowd', 'https://www.threatcrowd.org', '/searchApi/v2/domain/report/?domain={domain}',
+    lambda domain: JSONStringsParser(keys=('subdomains',)),
+    rate=0.1,  # documented as one request per 10s
+    ttl=7 * DAY))
+register(Source(
+    'certspotter', 'https://api.certspotter.com',
+    '/v1/issuances?domain=*.{domain}&include_subdomains=true&expand=dns_names',
+    lambda domain: JSONStringsParser(keys=('dns_names',)),
+    ttl=12 * HOUR, fetch=_fetch_certspotter, page_concurrency=1))
+register(Source(
+    'otx', 'https://otx.alienvault.com', '/api/v1/indicators/domain/{domain}/passive_dns',
+    lambda domain: JSONStringsParser(keys=('hostname',)),
+    rate=2.0, fetch=_fetch_otx))
+register(Source(
+    'rapiddns', 'https://rapiddns.io', '/subdomain/{domain}?full=1&down=1',
+    lambda domain: BodyParser(
+        lambda html: re.findall(r'([\w.-]+\.' + re.escape(domain) + r')', html))))
+register(Source(
+    'hackertarget', 'https://api.hackertarget.com', '/hostsearch/?q={domain}',
+    # one "host,ip" per line
+    lambda domain: BodyParser(lambda text: (line.split(',')[0] for line in text.splitlines())),
+    rate=0.5))
+
+
+def _names(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return [name.strip().lower() for name in value if name.strip()]
+
+
+def select_sources(names: Optional[Iterable[str]] = None, disabled: Optional[Iterable[str]] = None,
+                   base_urls: Optional[Dict[str, str]] = None) -> List[Source]:
+    """The sources a scan should run.
+
+    ``names`` (default: ``$SUBDOMAINFINDER_SOURCES``, else every source enabled
+    by default) minus ``disabled`` (default: ``$SUBDOMAINFINDER_DISABLED_SOURCES``).
+    Sources whose API key is not configured are left out. ``base_urls``
+    points sources at another host, e.g. a mirror or a local emulator.
+    """
+    names = _names(names) if names is not None else _names(os.getenv(SOURCES_ENV))
+    disabled = set(_names(disabled if disabled is not None else os.getenv(DISABLED_SOURCES_ENV)) or ())
+    unknown = [name for name in (names or []) + sorted(disabled) if name not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown source(s): {', '.join(unknown)}")
+
+    if names is None:
+        selected = [source for source in SOURCES.values() if source.enabled]
+    else:
+        selected = [SOURCES[name] for name in dict.fromkeys(names)]
+    selected = [source for source in selected if source.name not in disabled and source.available]
+    if base_urls:
+        selected = [replace(source, base_url=base_urls[source.name].rstrip('/'))
+                    if source.name in base_urls else source for source in selected]
+        _check_endpoints(selected)
+    return selected
@@ -1,10 +1,20 @@
-import json
+import asyncio
+import heapq
+import itertools
 import logging
+import os
 import re
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Set, TypeVar, Union
 
 from .enums import OutputFormat
+from .writers import HostResult, open_writer
+
+T = TypeVar('T')
+R = TypeVar('R')
 
 def setup_logging(verbose: bool = False) -> logging.Logger:
     """Set up logging configuration."""
@@ -19,39 +29,222 @@ def setup_logging(verbose: bool = False) -> logging.Logger:
     
     return logger
 
+# Characters allowed in a hostname (LDH labels joined by dots)
+_HOST_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789-.'
+# Sources pack several names into one string (crt.sh uses newlines)
+_SEPARATORS = re.compile(r'[\s,;]+')
+
+class SubdomainValidator:
+    """Precompiled validator and cleaner for hostnames below one base domain.
+
+    Validation uses C-level string operations rather than a regex: every
+    label must be 1-63 LDH characters without a leading or trailing hyphen,
+    and the name must end in ``.<base_domain>`` on a label boundary.
+    """
+
+    def __init__(self, base_domain: str):
+        self.base_domain = base_domain.lower().strip('.')
+        self._suffix = '.' + self.base_domain
+
+    def is_valid(self, subdomain: str) -> bool:
+        """True for a lowercase hostname strictly below the base domain."""
+        if len(subdomain) > 253 or not subdomain.endswith(self._suffix):
+            return False
+        prefix = subdomain[:-len(self._suffix)]
+        if not prefix or prefix.strip(_HOST_CHARS):
+            return False
+        if prefix[0] in '.-' or prefix[-1] in '.-':
+            return False
+        if '..' in prefix or '-.' in prefix or '.-' in prefix:
+            return False
+        return len(prefix) <= 63 or all(len(label) <= 63 for label in prefix.split('.'))
+
+    def iter_valid(self, candidates: Iterable[str]) -> Iterator[str]:
+        """Yield every normalised valid host in ``candidates``, repeats included."""
+        is_valid = self.is_valid
+        split = _SEPARATORS.split
+        for item in candidates:
+            if not item:
+                continue
+            if not isinstance(item, str):
+                item = str(item)
+            host = item.lower()
+            if is_valid(host):
+                yield host
+                continue
+            for part in split(host):
+                part = part.strip('.')
+                if part and is_valid(part):
+                    yield part
+
+    def clean(self, candidates: Iterable[str], max_rejected: int = 4096) -> List[str]:
+        """Split, normalise, validate and deduplicate candidates in one pass; sorted.
+
+        The ``max_rejected`` most recently seen invalid strings are
+        remembered, so repeats of them are not split again; memory beyond
+        the result stays bounded however much junk the input holds.
+        """
+        is_valid = self.is_valid
+        split = _SEPARATORS.split
+        seen: Set[str] = set()
+        rejected: 'OrderedDict[str, None]' = OrderedDict()
+        for item in candidates:
+            if not item:
+                continue
+            if not isinstance(item, str):
+                item = str(item)
+            host = item.lower()
+            # Sources repeat names heavily; validate each distinct string once
+            if host in seen:
+                continue
+            if host in rejected:
+                rejected.move_to_end(host)
+                continue
+            if is_valid(host):
+                seen.add(host)
+                continue
+            rejected[host] = None
+            if len(rejected) > max_rejected:
+                rejected.popitem(last=False)
+            # Several names in one string, or stray dots and spaces
+            for part in split(host):
+                part = part.strip('.')
+                if part and part not in seen and is_valid(part):
+                    seen.add(part)
+        return sorted(seen)
+
+@lru_cache(maxsize=64)
+def validator_for(base_domain: str) -> SubdomainValidator:
+    """Shared validator per base domain."""
+    return SubdomainValidator(base_domain)
+
 def is_valid_subdomain(subdomain: str, base_domain: str) -> bool:
     """Validate if a subdomain is valid and belongs to the base domain."""
-    # Loại bỏ các kết quả không hợp lệ
-    if not subdomain or '*' in subdomain:  # Loại bỏ wildcard
-        return False
-    if '@' in subdomain:  # Loại bỏ địa chỉ email
-        return False
-    if not subdomain.endswith(base_domain):  # Phải là subdomain của domain gốc
+    if not subdomain:
         return False
-    if subdomain == base_domain:  # Loại bỏ domain gốc
-        return False
-    
-    # Kiểm tra định dạng subdomain hợp lệ
-    subdomain_pattern = f"^[a-zA-Z0-9][-a-zA-Z0-9]*[a-zA-Z0-9]\\.{base_domain}$"
-    return bool(re.match(subdomain_pattern, subdomain))
+    return validator_for(base_domain).is_valid(subdomain.lower())
 
 def clean_and_deduplicate_subdomains(subdomains: Set[str], base_domain: str) -> List[str]:
     """Clean and deduplicate subdomain results."""
-    valid_subdomains = {
-        subdomain.lower() for subdomain in subdomains 
-        if is_valid_subdomain(subdomain.lower(), base_domain)
-    }
-    return sorted(list(valid_subdomains))
-
-def save_results(subdomains: List[str], output_path: str, output_format: OutputFormat):
-    """Save results to a file in the specified format."""
-    output_path = Path(output_path)
-    
-    if output_format == OutputFormat.JSON:
-        data = {
-            'subdomains': subdomains,
-            'count': len(subdomains)
-        }
-        output_path.write_text(json.dumps(data, indent=4))
-    else:
-        output_path.write_text('\n'.join(subdomains))
\ No newline at end of file
+    return validator_for(base_domain).clean(subdomains)
+
+def _spill_run(items: Set[str], directory: str, index: int) -> str:
+    path = os.path.join(directory, f'run{index:05d}.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(f'{item}\n' for item in sorted(items))
+    return path
+
+def _merge_runs(paths: List[str]) -> Iterator[str]:
+    """Distinct lines of the sorted run files, in order, newlines kept."""
+    files = [open(path, 'r', encoding='utf-8') for path in paths]
+    try:
+        last = None
+        for line in heapq.merge(*files):
+            if line != last:
+                last = line
+                yield line
+    finally:
+        for f in files:
+            f.close()
+
+def external_sorted_unique(items: Iterable[str], max_items: int = 500_000,
+                           tmp_dir: Optional[str] = None, fan_in: int = 64) -> Iterator[str]:
+    """Sorted, deduplicated ``items`` using bounded memory.
+
+    At most ``max_items`` distinct items are held at once; beyond that sorted
+    runs are spilled to temporary files and k-way merged. No more than
+    ``fan_in`` runs are open at a time: with more, they are merged in passes
+    of ``fan_in`` into longer runs first. Items must not contain newlines.
+    """
+    with tempfile.TemporaryDirectory(prefix='subdomainfinder-', dir=tmp_dir) as directory:
+        runs: List[str] = []
+        buffer: Set[str] = set()
+        for item in items:
+            buffer.add(item)
+            if len(buffer) >= max_items:
+                runs.append(_spill_run(buffer, directory, len(runs)))
+                buffer.clear()
+        if not runs:
+            yield from sorted(buffer)
+            return
+        if buffer:
+            runs.append(_spill_run(buffer, directory, len(runs)))
+            buffer.clear()
+
+        written = len(runs)
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i:i + fan_in]
+                path = os.path.join(directory, f'run{written:05d}.txt')
+                written += 1
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.writelines(_merge_runs(group))
+                for done in group:
+                    os.remove(done)
+                merged.append(path)
+            runs = merged
+
+        for line in _merge_runs(runs):
+            yield line[:-1]
+
+def save_results(subdomains: Iterable[Union[str, HostResult]], output_path: Union[str, Path],
+                 output_format: OutputFormat):
+    """Save results to a file in the specified format.
+
+    Rows are streamed out in batches, so ``subdomains`` may be a generator.
+    To write while a scan is still running use ``writers.open_writer``.
+    """
+    items = iter(subdomains)
+    with open_writer(output_path, output_format) as writer:
+        for batch in iter(lambda: list(itertools.islice(items, 10000)), []):
+            writer.write_many(batch)
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+async def bounded_as_completed(func: Callable[[T], Awaitable[Optional[R]]], items: Iterable[T],
+                               concurrency: int) -> AsyncIterator[R]:
+    """Apply ``func`` to ``items`` with at most ``concurrency`` calls in flight.
+
+    Results are yielded in completion order; ``None`` results are dropped.
+    Items are pulled lazily, so ``items`` may be an unbounded generator.
+    The first exception raised by ``func`` (or by ``items``) is re-raised
+    to the consumer, and the remaining calls are cancelled.
+    """
+    items = iter(items)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    done = object()
+
+    async def worker():
+        outcome = done
+        try:
+            for item in items:
+                result = await func(item)
+                if result is not None:
+                    await queue.put(result)
+        except asyncio.CancelledError:
+            # Only the consumer cancels workers, and it is no longer listening
+            raise
+        except Exception as e:
+            outcome = _Failure(e)
+        await queue.put(outcome)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    remaining = len(workers)
+    try:
+        while remaining:
+            result = await queue.get()
+            if result is done:
+                remaining -= 1
+            elif isinstance(result, _Failure):
+                raise result.error
+            else:
+                yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import random
+import string
+from typing import AsyncIterator, Dict, FrozenSet
+
+from .resolver import AsyncResolver, DNSAnswer
+
+_ALPHABET = string.ascii_lowercase + string.digits
+
+
+def random_label(length: int = 12) -> str:
+    return ''.join(random.choice(_ALPHABET) for _ in range(length))
+
+
+class WildcardFilter:
+    """Per-zone wildcard detection with a cached answer set per zone.
+
+    A zone is probed once, with ``probes`` random labels, the first time a
+    candidate directly below it is checked. Concurrent checks for the same
+    zone share the same probe.
+    """
+
+    def __init__(self, resolver: AsyncResolver, probes: int = 3):
+        self.resolver = resolver
+        self.probes = probes
+        self.dropped = 0
+        self.logger = logging.getLogger('subdomainfinder.wildcard')
+        self._zones: Dict[str, 'asyncio.Task[FrozenSet[str]]'] = {}
+
+    @property
+    def wildcard_zones(self) -> Dict[str, FrozenSet[str]]:
+        """Zones found to have a wildcard, mapped to their answer sets."""
+        return {
+            zone: task.result() for zone, task in self._zones.items()
+            if task.done() and not task.cancelled() and task.exception() is None and task.result()
+        }
+
+    async def _probe(self, zone: str) -> FrozenSet[str]:
+        names = [f"{random_label()}.{zone}" for _ in range(self.probes)]
+        answers = await asyncio.gather(
+            *(self.resolver.resolve(name) for name in names), return_exceptions=True)
+        records = set()
+        for answer in answers:
+            if isinstance(answer, DNSAnswer) and answer.found:
+                records.update(answer.addresses)
+                records.update(answer.cnames)
+        if records:
+            self.logger.info(f"Wildcard detected for *.{zone}: {sorted(records)}")
+        return frozenset(records)
+
+    def probed(self, zone: str) -> bool:
+        """True once ``zone`` has been (or is being) probed, so checking it sends no queries."""
+        return zone in self._zones
+
+    async def zone_wildcard(self, zone: str) -> FrozenSet[str]:
+        """Return the wildcard answer set for ``zone`` (empty if there is none)."""
+        task = self._zones.get(zone)
+        if task is None:
+            task = asyncio.ensure_future(self._probe(zone))
+            self._zones[zone] = task
+        return await task
+
+    async def is_wildcard(self, answer: DNSAnswer) -> bool:
+        """True if ``answer`` is indistinguishable from its zone's wildcard."""
+        zone = answer.name.partition('.')[2]
+        if not zone:
+            return False
+        wildcard = await self.zone_wildcard(zone)
+        if not wildcard:
+            return False
+        if answer.cnames:
+            return answer.cnames[0] in wildcard
+        return bool(answer.addresses) and wildcard.issuperset(answer.addresses)
+
+    async def filter(self, answers: AsyncIterator[DNSAnswer]) -> AsyncIterator[DNSAnswer]:
+        """Pass through ``answers`` that are not wildcard matches."""
+        async for answer in answers:
+            if await self.is_wildcard(answer):
+                self.dropped += 1
+                continue
+            yield answer
@@ -0,0 +1,288 @@
+import abc
+import asyncio
+import csv
+import json
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from .enums import OutputFormat
+
+# Archive layout: magic, then self-contained blocks of ``_BLOCK`` (row count)
+# followed by one zlib-compressed column per field, each prefixed with its
+# length. A block is only written whole, so a crash loses at most the rows
+# not yet flushed and a truncated tail block is ignored on read.
+ARCHIVE_MAGIC = b'SDFA\x01'
+_BLOCK = struct.Struct('!I')
+_COLUMNS = ('host', 'source', 'ips', 'cloud', 'server')
+
+EXTENSIONS = {
+    OutputFormat.TEXT: '.txt',
+    OutputFormat.JSON: '.json',
+    OutputFormat.NDJSON: '.ndjson',
+    OutputFormat.CSV: '.csv',
+    OutputFormat.ARCHIVE: '.sfa',
+}
+
+
+@dataclass
+class HostResult:
+    """One discovered host and what is known about it."""
+    host: str
+    source: Optional[str] = None
+    ips: List[str] = field(default_factory=list)
+    cloud: Optional[str] = None
+    server: Optional[str] = None
+
+
+def _result(item: Union[str, HostResult]) -> HostResult:
+    return item if isinstance(item, HostResult) else HostResult(item)
+
+
+class ResultWriter(abc.ABC):
+    """Appends results to a file as they arrive.
+
+    Output is buffered and flushed to the OS at least every
+    ``flush_interval`` seconds, so an interrupted scan keeps everything but
+    the last moments. Subclasses encode rows in ``_write_rows``.
+    """
+
+    def __init__(self, path: Union[str, Path], flush_interval: float = 1.0,
+                 buffer_size: int = 1 << 16):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._file = self._open(buffer_size)
+        self._flushed = time.monotonic()
+
+    def _open(self, buffer_size: int) -> IO:
+        return open(self.path, 'w', encoding='utf-8', newline='', buffering=buffer_size)
+
+    @abc.abstractmethod
+    def _write_rows(self, results: List[HostResult]):
+        """Encode ``results`` into the file."""
+
+    def write(self, item: Union[str, HostResult]):
+        self.write_many([item])
+
+    def write_many(self, items: Iterable[Union[str, HostResult]]):
+        results = [_result(item) for item in items]
+        if not results:
+            return
+        self._write_rows(results)
+        self.count += len(results)
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._flushed = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextWriter(ResultWriter):
+    """One hostname per line."""
+
+    def _write_rows(self, results: List[HostResult]):
+        self._file.write(''.join(f'{r.host}\n' for r in results))
+
+
+class NDJSONWriter(ResultWriter):
+    """One JSON object per line with the host and its metadata."""
+
+    def _write_rows(self, results: List[HostResult]):
+        dumps = json.dumps
+        self._file.write(''.join(
+            dumps({'host': r.host, 'source': r.source, 'ips': r.ips, 'cloud': r.cloud,
+                   'server': r.server}, ensure_ascii=False) + '\n'
+            for r in results))
+
+
+class CSVWriter(ResultWriter):
+    """``host,source,ips,cloud,server`` rows; several IPs are joined with spaces."""
+
+    def _open(self, buffer_size: int) -> IO:
+        f = super()._open(buffer_size)
+        self._csv = csv.writer(f)
+        self._csv.writerow(_COLUMNS)
+        return f
+
+    def _write_rows(self, results: List[HostResult]):
+        self._csv.writerows((r.host, r.source or '', ' '.join(r.ips), r.cloud or '', r.server or '')
+                            for r in results)
+
+
+class JSONWriter(ResultWriter):
+    """The ``{"subdomains": [...], "count": n}`` document of ``save_results``, written as rows arrive.
+
+    The document is only valid JSON once the writer is closed.
+    """
+
+    def _open(self, buffer_size: int) -> IO:
+        f = super()._open(buffer_size)
+        f.write('{\n    "subdomains": [')
+        return f
+
+    def _write_rows(self, results: List[HostResult]):
+        sep = ',' if self.count else ''
+        self._file.write(sep + ','.join(f'\n        {json.dumps(r.host)}' for r in results))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write(f'\n    ],\n    "count": {self.count}\n}}' if self.count
+                             else f'],\n    "count": 0\n}}')
+        super().close()
+
+
+class ArchiveWriter(ResultWriter):
+    """Compressed columnar archive: rows are grouped in blocks and each column compressed apart.
+
+    Hostnames, sources and verdicts repeat heavily within a column, so this
+    is several times smaller than NDJSON. Read it back with ``read_archive``.
+    """
+
+    def __init__(self, path: Union[str, Path], flush_interval: float = 5.0,
+                 block_rows: int = 50_000, level: int = 6):
+        self.block_rows = block_rows
+        self.level = level
+        self._rows: List[HostResult] = []
+        super().__init__(path, flush_interval)
+
+    def _open(self, buffer_size: int) -> IO:
+        f = open(self.path, 'wb', buffering=buffer_size)
+        f.write(ARCHIVE_MAGIC)
+        return f
+
+    def _write_rows(self, results: List[HostResult]):
+        self._rows.extend(results)
+        while len(self._rows) >= self.block_rows:
+            self._write_block()
+
+    def _write_block(self):
+        rows, self._rows = self._rows[:self.block_rows], self._rows[self.block_rows:]
+        if not rows:
+            return
+        columns = (
+            [r.host for r in rows],
+            [r.source or '' for r in rows],
+            [','.join(r.ips) for r in rows],
+            [r.cloud or '' for r in rows],
+            [r.server or '' for r in rows],
+        )
+        parts = [_BLOCK.pack(len(rows))]
+        for values in columns:
+            data = zlib.compress('\n'.join(values).encode('utf-8'), self.level)
+            parts.append(_BLOCK.pack(len(data)))
+            parts.append(data)
+        self._file.write(b''.join(parts))
+
+    def flush(self):
+        # Only whole blocks reach the file, so a time-based flush closes the current block
+        self._write_block()
+        super().flush()
+
+
+def read_archive(path: Union[str, Path]) -> Iterator[HostResult]:
+    """Rows of an archive written by ``ArchiveWriter``; a truncated last block is skipped."""
+    with open(path, 'rb') as f:
+        if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a subdomainfinder archive")
+        while True:
+            header = f.read(_BLOCK.size)
+            if len(header) < _BLOCK.size:
+                return
+            (rows,) = _BLOCK.unpack(header)
+            columns = []
+            for _ in _COLUMNS:
+                size = f.read(_BLOCK.size)
+                if len(size) < _BLOCK.size:
+                    return
+                data = f.read(_BLOCK.unpack(size)[0])
+                try:
+                    columns.append(zlib.decompress(data).decode('utf-8').split('\n'))
+                except zlib.error:
+                    return
+            hosts, sources, ips, clouds, servers = columns
+            for i in range(rows):
+                yield HostResult(hosts[i], sources[i] or None, ips[i].split(',') if ips[i] else [],
+                                 clouds[i] or None, servers[i] or None)
+
+
+WRITERS = {
+    OutputFormat.TEXT: TextWriter,
+    OutputFormat.JSON: JSONWriter,
+    OutputFormat.NDJSON: NDJSONWriter,
+    OutputFormat.CSV: CSVWriter,
+    OutputFormat.ARCHIVE: ArchiveWriter,
+}
+
+
+def format_for_path(path: Union[str, Path], default: OutputFormat = OutputFormat.TEXT) -> OutputFormat:
+    """Output format implied by a file extension."""
+    suffix = Path(path).suffix.lower()
+    for output_format, extension in EXTENSIONS.items():
+        if suffix == extension:
+            return output_format
+    return default
+
+
+def open_writer(path: Union[str, Path], output_format: Optional[OutputFormat] = None,
+                **kwargs) -> ResultWriter:
+    """A streaming writer for ``output_format`` (by default from the file extension)."""
+    return WRITERS[output_format or format_for_path(path)](path, **kwargs)
+
+
+class AsyncResultWriter:
+    """Feeds a ``ResultWriter`` from the event loop without blocking it.
+
+    Results are collected into batches of ``batch_size``; encoding and disk
+    writes run on a worker thread, at most one batch behind, so memory stays
+    bounded and a slow disk applies backpressure instead of stalling the loop.
+    """
+
+    def __init__(self, writer: ResultWriter, batch_size: int = 1000, flush_interval: float = 1.0):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch: List[Union[str, HostResult]] = []
+        self._pending: Optional[asyncio.Future] = None
+        self._submitted = time.monotonic()
+
+    async def write(self, item: Union[str, HostResult]):
+        self._batch.append(item)
+        if (len(self._batch) >= self.batch_size
+                or time.monotonic() - self._submitted >= self.flush_interval):
+            await self._submit()
+
+    async def _submit(self):
+        batch, self._batch = self._batch, []
+        self._submitted = time.monotonic()
+        if self._pending is not None:
+            await self._pending
+        self._pending = asyncio.get_running_loop().run_in_executor(None, self.writer.write_many, batch)
+
+    async def aclose(self):
+        try:
+            await self._submit()
+            await self._pending
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, self.writer.close)
+
+    async def __aenter__(self) -> 'AsyncResultWriter':
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
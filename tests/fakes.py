@@ -0,0 +1,64 @@
+"""Stand-ins for the resolver and HTTP session, so stages run without a network."""
+import asyncio
+from contextlib import asynccontextmanager
+
+from subdomainfinder.resolver import NOERROR, NXDOMAIN, DNSAnswer
+
+
+class FakeResolver:
+    """Answers from a ``{name: addresses}`` table; names in ``errors`` raise instead."""
+
+    def __init__(self, records=None, errors=None, cnames=None):
+        self.records = records or {}
+        self.errors = errors or {}
+        self.cnames = cnames or {}
+        self.queries = []
+
+    async def resolve(self, name, rdtype='A'):
+        self.queries.append(name)
+        await asyncio.sleep(0)
+        if name in self.errors:
+            raise self.errors[name]
+        if name in self.records or name in self.cnames:
+            return DNSAnswer(name, rdtype, NOERROR, list(self.records.get(name, ())),
+                             list(self.cnames.get(name, ())))
+        return DNSAnswer(name, rdtype, NXDOMAIN)
+
+    def close(self):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = headers
+
+
+class FakeSession:
+    """Answers ``{url: (delay, status, headers)}``; ``(delay, exception)`` or an
+    exception fails the request instead. URLs that are not listed fail to connect.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.requests = []
+
+    @asynccontextmanager
+    async def _request(self, method, url):
+        self.requests.append((method, url))
+        answer = self.answers.get(url, OSError('connection refused'))
+        if isinstance(answer, BaseException):
+            answer = (0, answer)
+        await asyncio.sleep(answer[0])
+        if len(answer) == 2:
+            raise answer[1]
+        yield FakeResponse(*answer[1:])
+
+    def head(self, url, **kwargs):
+        return self._request('HEAD', url)
+
+    def get(self, url, **kwargs):
+        return self._request('GET', url)
+
+    async def close(self):
+        pass
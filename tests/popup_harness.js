@@ -0,0 +1,145 @@
+// Runs MySubdomainTool/popup.js against a stub DOM, chrome.storage and fetch.
+// Usage: node popup_harness.js < scenario.json; prints what happened as JSON.
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const scenario = JSON.parse(fs.readFileSync(0, 'utf8'));
+
+class Element {
+    constructor(tag) {
+        this.tagName = tag;
+        this.children = [];
+        this.listeners = {};
+        this.dataset = {};
+        this.style = {};
+        this.innerText = '';
+        this.className = '';
+        this.value = '';
+        this.disabled = false;
+        this.scrollTop = 0;
+        this.clientHeight = 0;
+    }
+    addEventListener(type, fn) { (this.listeners[type] = this.listeners[type] || []).push(fn); }
+    dispatch(type, event = {}) { for (const fn of this.listeners[type] || []) fn(event); }
+    click() { this.dispatch('click'); }
+    appendChild(child) {
+        if (child.tagName === '#fragment') this.children.push(...child.children);
+        else this.children.push(child);
+        return child;
+    }
+    replaceChildren(...nodes) {
+        this.children = [];
+        for (const node of nodes) this.appendChild(node);
+    }
+    get lastChild() { return this.children[this.children.length - 1]; }
+}
+
+const elements = {};
+for (const id of ['scanBtn', 'copyBtn', 'clearBtn', 'domainInput', 'status', 'tableWrap', 'tbody']) {
+    elements[id] = new Element(id);
+}
+elements.tableWrap.clientHeight = 420;
+
+const document = {
+    listeners: {},
+    addEventListener(type, fn) { this.listeners[type] = fn; },
+    getElementById: (id) => elements[id],
+    querySelector: () => elements.tbody,
+    createElement: (tag) => new Element(tag),
+    createDocumentFragment: () => new Element('#fragment'),
+};
+
+const storage = { ...scenario.storage };
+const chrome = {
+    storage: {
+        local: {
+            get: (keys, callback) => setImmediate(() => callback({ ...storage })),
+            set: (items) => Object.assign(storage, items),
+            remove: (keys) => { for (const key of keys) delete storage[key]; },
+        },
+    },
+};
+
+const probes = [];
+const requests = [];
+let inFlight = 0;
+let peakInFlight = 0;
+
+function streamOf(chunks) {
+    const encoder = new TextEncoder();
+    let i = 0;
+    return {
+        getReader: () => ({
+            read: async () => {
+                await new Promise((resolve) => setImmediate(resolve));
+                return i < chunks.length ? { value: encoder.encode(chunks[i++]), done: false }
+                    : { value: undefined, done: true };
+            },
+        }),
+    };
+}
+
+async function fetch(url, options = {}) {
+    requests.push({ url, headers: options.headers || {} });
+    if (url.startsWith('http://127.0.0.1:8787/')) {
+        return { ok: true, status: 200, body: streamOf(scenario.daemonChunks) };
+    }
+    if (options.method === 'HEAD') {
+        probes.push(url.slice('http://'.length));
+        inFlight++;
+        peakInFlight = Math.max(peakInFlight, inFlight);
+        await new Promise((resolve) => setTimeout(resolve, 1));
+        inFlight--;
+        return { headers: { get: () => 'cloudflare' } };
+    }
+    throw new Error('offline');
+}
+
+let source = fs.readFileSync(path.join(__dirname, '..', 'MySubdomainTool', 'popup.js'), 'utf8');
+if (scenario.token) {
+    source = source.replace("const DAEMON_TOKEN = '';", `const DAEMON_TOKEN = '${scenario.token}';`);
+}
+
+const context = vm.createContext({
+    document, chrome, fetch, console, setTimeout, clearTimeout, setImmediate, TextDecoder, Uint8Array,
+    AbortController, Date, alert: () => {},
+    navigator: { clipboard: { writeText: async () => {} } },
+    requestAnimationFrame: (fn) => setImmediate(fn),
+});
+vm.runInContext(source, context);
+
+const settle = () => new Promise((resolve) => setTimeout(resolve, 50));
+
+function snapshot() {
+    const rows = elements.tbody.children.filter((row) => row.className !== 'spacer');
+    return {
+        rows: rows.length,
+        hosts: rows.map((row) => row.dataset.host),
+        probes: probes.slice(),
+        peakInFlight,
+    };
+}
+
+(async () => {
+    document.listeners.DOMContentLoaded();
+    await settle();
+    const result = { restored: snapshot() };
+    if (scenario.scrollTo !== undefined) {
+        probes.length = 0;
+        elements.tableWrap.scrollTop = scenario.scrollTo;
+        elements.tableWrap.dispatch('scroll');
+        await settle();
+        result.scrolled = snapshot();
+    }
+    if (scenario.scan) {
+        probes.length = 0;
+        elements.domainInput.value = scenario.scan;
+        elements.scanBtn.click();
+        await settle();
+        await settle();
+        result.scanned = { ...snapshot(), saved: storage.savedResults || null, status: elements.status.innerText };
+    }
+    result.requests = requests;
+    process.stdout.write(JSON.stringify(result));
+})();
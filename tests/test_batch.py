@@ -0,0 +1,17 @@
+from subdomainfinder.batch import BatchScanner, load_domains
+
+
+def test_load_domains_skips_comments_blanks_and_repeats(tmp_path):
+    path = tmp_path / 'roots.txt'
+    path.write_text('# roots\nExample.com\n\nexample.org  # staging\nexample.com\n', encoding='utf-8')
+    assert load_domains(str(path)) == ['example.com', 'example.org']
+
+
+def test_batch_shares_one_limiter_and_source_list():
+    batch = BatchScanner([' Example.com', 'example.com', '', 'example.org'], sources=['crtsh', 'otx'],
+                         max_in_flight=7)
+    assert batch.domains == ['example.com', 'example.org']
+    assert batch.sources == ['crtsh', 'otx']
+    assert batch.limiter.max_in_flight == 7
+    batch.limiter.source('crtsh').record_failure()
+    assert batch.source_states()['crtsh']['window'] == 1.0
@@ -0,0 +1,73 @@
+import asyncio
+
+from aiohttp import web
+
+from benchmarks import dns_stub, emulator
+from subdomainfinder.ratelimit import RequestLimiter
+from subdomainfinder.resolver import AsyncResolver
+from subdomainfinder.services import ServiceScanner
+from subdomainfinder.sources import SOURCES
+
+HOSTS = 120  # more than one certspotter page
+
+
+async def scan_emulator(payloads, names):
+    runner = web.AppRunner(emulator.make_app(payloads), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    try:
+        scanner = ServiceScanner(emulator.DOMAIN, sources=names,
+                                 limiter=RequestLimiter(source_rates={name: 0 for name in names}),
+                                 base_urls=emulator.base_urls('127.0.0.1', runner.addresses[0][1]))
+        found = {}
+        async for source, host in scanner.scan_iter(source_timeout=10):
+            found.setdefault(source, set()).add(host)
+        return found, scanner.source_status
+    finally:
+        await runner.cleanup()
+
+
+def test_emulator_serves_every_source_in_its_own_format():
+    payloads = emulator.Payloads(hosts=HOSTS, crtsh_mb=0.05, latency_ms=0)
+    names = [name for name, source in SOURCES.items() if source.available]
+    found, status = asyncio.run(scan_emulator(payloads, names))
+    assert status == {name: 'ok' for name in names}
+    every = set().union(*(payloads.names(name) for name in names))
+    assert set().union(*found.values()) == every
+    # Names only one source returns are credited to it, across every page
+    for name in names:
+        assert {host for host in payloads.names(name) if not host.startswith('svc')} <= found[name]
+
+
+async def resolve_stub(names, **kwargs):
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    server = asyncio.create_task(dns_stub.serve(ready=ready.set_result, **kwargs))
+    port = await ready
+    try:
+        async with AsyncResolver([f'127.0.0.1:{port}'], timeout=1.0, retries=1) as resolver:
+            return {name: await resolver.resolve(name) for name in names}
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+
+
+def test_dns_stub_answers_deterministically():
+    hits = [f'w{i}.example.com' for i in range(200) if dns_stub.exists(f'w{i}.example.com')]
+    misses = [f'w{i}.example.com' for i in range(200) if not dns_stub.exists(f'w{i}.example.com')]
+    assert 0 < len(hits) < len(misses)
+    answers = asyncio.run(resolve_stub(hits[:3] + misses[:3] + ['a.wild.example.com', 'b.wild.example.com']))
+    for name in hits[:3]:
+        assert answers[name].found
+        assert answers[name].addresses == [dns_stub.socket.inet_ntoa(dns_stub.address(name))]
+    for name in misses[:3]:
+        assert not answers[name].found
+    assert answers['a.wild.example.com'].addresses == answers['b.wild.example.com'].addresses
+
+
+def test_hit_rate_controls_the_share_of_names_that_exist():
+    names = [f'w{i}.example.com' for i in range(5000)]
+    assert not any(dns_stub.exists(name, hit_rate=0) for name in names)
+    assert all(dns_stub.exists(name, hit_rate=1) for name in names)
+    assert 400 < sum(dns_stub.exists(name, hit_rate=0.1) for name in names) < 600
+    assert not dns_stub.exists('w1.example.org', hit_rate=1)
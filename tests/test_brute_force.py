@@ -0,0 +1,33 @@
+import asyncio
+
+from subdomainfinder.brute_force import BruteForcer, load_wordlist, resolve_many
+
+from .fakes import FakeResolver
+
+
+def test_resolve_many_skips_names_that_fail():
+    resolver = FakeResolver({'a.example.com': ['192.0.2.1']}, errors={
+        'slow.example.com': asyncio.TimeoutError(),
+        'bad.example.com': ValueError('label too long'),
+        'down.example.com': OSError('network unreachable'),
+    })
+    names = ['a.example.com', 'b.example.com', 'slow.example.com', 'bad.example.com', 'down.example.com']
+
+    async def run():
+        return {answer.name: answer.found async for answer in resolve_many(resolver, names, concurrency=2)}
+
+    assert asyncio.run(run()) == {'a.example.com': True, 'b.example.com': False}
+
+
+def test_load_wordlist_skips_blanks_comments_and_repeats(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('www\n\n# comment\nMail.\nwww\napi\n', encoding='utf-8')
+    assert list(load_wordlist(path)) == ['www', 'mail', 'api']
+
+
+def test_brute_forcer_keeps_names_that_resolve():
+    resolver = FakeResolver({'www.example.com': ['192.0.2.1'], 'api.example.com': ['192.0.2.2']})
+    forcer = BruteForcer('Example.com.', ['www', 'mail', 'api'], resolver=resolver,
+                         filter_wildcards=False)
+    assert list(forcer.candidates()) == ['www.example.com', 'mail.example.com', 'api.example.com']
+    assert asyncio.run(forcer.scan()) == {'www.example.com', 'api.example.com'}
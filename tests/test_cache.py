@@ -0,0 +1,63 @@
+import threading
+import time
+
+from subdomainfinder.cache import ResponseCache
+
+
+def test_put_and_get_round_trip(tmp_path):
+    with ResponseCache(tmp_path / 'c.sqlite') as cache:
+        cache.put('crtsh', 'https://crt.sh/?q=x', b'[1, 2, 3]', etag='"abc"', last_modified='yesterday')
+        entry = cache.get('crtsh', 'https://crt.sh/?q=x')
+        assert entry.body == b'[1, 2, 3]'
+        assert b''.join(entry.iter_body(chunk_size=4)) == b'[1, 2, 3]'
+        assert (entry.etag, entry.last_modified) == ('"abc"', 'yesterday')
+        assert cache.get('crtsh', 'other') is None
+        assert cache.get('otx', 'https://crt.sh/?q=x') is None
+
+
+def test_freshness_follows_the_source_ttl(tmp_path):
+    with ResponseCache(tmp_path / 'c.sqlite', ttls={'crtsh': 60}, default_ttl=10) as cache:
+        cache.put('crtsh', 'k', b'body')
+        cache.put('other', 'k', b'body')
+        entry = cache.get('crtsh', 'k')
+        assert cache.is_fresh('crtsh', entry)
+        entry.fetched_at = time.time() - 61
+        assert not cache.is_fresh('crtsh', entry)
+        other = cache.get('other', 'k')
+        other.fetched_at = time.time() - 11
+        assert not cache.is_fresh('other', other)
+
+
+def test_touch_and_purge(tmp_path):
+    with ResponseCache(tmp_path / 'c.sqlite') as cache:
+        cache.put('crtsh', 'k', b'body')
+        cache.put('otx', 'k', b'body')
+        before = cache.get('crtsh', 'k').fetched_at
+        time.sleep(0.01)
+        cache.touch('crtsh', 'k')
+        assert cache.get('crtsh', 'k').fetched_at > before
+        cache.purge('crtsh')
+        assert cache.get('crtsh', 'k') is None and cache.get('otx', 'k') is not None
+        cache.purge()
+        assert cache.get('otx', 'k') is None
+
+
+def test_body_writer_stores_only_committed_bodies(tmp_path):
+    with ResponseCache(tmp_path / 'c.sqlite') as cache:
+        cache.put('crtsh', 'k', b'old')
+        with cache.writer('crtsh', 'k') as body:
+            body.write(b'trunc')
+        assert cache.get('crtsh', 'k').body == b'old'
+
+        chunks = [bytes([i % 251]) * 1000 for i in range(300)]
+        with cache.writer('crtsh', 'k', etag='"v2"') as body:
+            for chunk in chunks:
+                body.write(chunk)
+            # committed from another thread, as the scanner does
+            thread = threading.Thread(target=body.commit)
+            thread.start()
+            thread.join()
+        entry = cache.get('crtsh', 'k')
+        assert entry.body == b''.join(chunks)
+        assert entry.etag == '"v2"'
+        assert not list(tmp_path.glob('body-*'))
@@ -0,0 +1,24 @@
+import asyncio
+
+import clean_results
+from subdomainfinder.history import HistoryStore
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.rows = []
+
+    async def write(self, result):
+        self.rows.append((result.host, result.source))
+
+
+def test_diff_streams_only_hosts_new_since_the_last_run(tmp_path):
+    with HistoryStore(tmp_path / 'h.sqlite') as history:
+        clean_results.record_history(history, 'example.com',
+                                     {'a.example.com': {'crtsh'}, 'b.example.com': {'otx'}},
+                                     {'crtsh': 'ok', 'otx': 'ok'})
+        found = {'A.example.com': {'crtsh'}, 'c.example.com': {'otx', 'crtsh'}, 'junk': {'otx'}}
+        writer = RecordingWriter()
+        asyncio.run(clean_results.stream_domain(writer, 'example.com', found,
+                                                clean_results.known_hosts(history, 'example.com')))
+    assert writer.rows == [('c.example.com', 'crtsh')]
@@ -0,0 +1,31 @@
+import asyncio
+
+from cloud_detector import detect_cloud_many
+
+from .fakes import FakeResolver, FakeSession
+
+
+def test_detect_cloud_many_shares_one_resolver_and_session():
+    resolver = FakeResolver(
+        records={'cdn.example.com': ['192.0.2.1'], 'cf.example.com': ['104.16.0.1'],
+                 'down.example.com': ['192.0.2.3']},
+        cnames={'cdn.example.com': ['d111.cloudfront.net']})
+    session = FakeSession({
+        'https://cdn.example.com': (0, 200, {'Server': 'CloudFront'}),
+        'https://cf.example.com': (0, 200, {'Server': 'cloudflare', 'CF-Ray': 'x'}),
+    })
+    hosts = ['cdn.example.com', 'cf.example.com', 'down.example.com']
+
+    async def run():
+        return {host: result async for host, result in
+                detect_cloud_many(hosts, concurrency=2, resolver=resolver, session=session)}
+
+    results = asyncio.run(run())
+    assert results == {
+        'cdn.example.com': {'provider': 'AWS (CloudFront)', 'cname': 'd111.cloudfront.net',
+                            'ip': '192.0.2.1'},
+        'cf.example.com': {'provider': 'Cloudflare', 'cname': '-', 'ip': '104.16.0.1'},
+        'down.example.com': {'provider': 'Unknown', 'cname': '-', 'ip': '192.0.2.3'},
+    }
+    # one A query per host, no separate CNAME lookup
+    assert sorted(resolver.queries) == sorted(hosts)
@@ -0,0 +1,69 @@
+import ipaddress
+import json
+
+from subdomainfinder.cloud_ranges import ProviderIndex, read_range_file
+
+
+def index(*entries):
+    return ProviderIndex.from_networks((provider, ipaddress.ip_network(cidr)) for provider, cidr in entries)
+
+
+def test_classify_ip_finds_the_owning_range():
+    idx = index(('AWS', '52.0.0.0/11'), ('Azure', '52.224.0.0/11'), ('Cloudflare', '2606:4700::/32'))
+    assert idx.classify_ip('52.1.2.3') == 'AWS'
+    assert idx.classify_ip('52.230.0.1') == 'Azure'
+    assert idx.classify_ip('52.200.0.1') is None
+    assert idx.classify_ip('2606:4700::1') == 'Cloudflare'
+    assert idx.classify_ip('2001:db8::1') is None
+    assert idx.classify_ip('not an ip') is None
+
+
+def test_most_specific_range_wins_where_ranges_nest():
+    idx = index(('AWS', '10.0.0.0/8'), ('GCP', '10.1.0.0/16'), ('Azure', '10.1.2.0/24'))
+    assert idx.classify_ip('10.0.0.1') == 'AWS'
+    assert idx.classify_ip('10.1.0.1') == 'GCP'
+    assert idx.classify_ip('10.1.2.3') == 'Azure'
+    assert idx.classify_ip('10.1.3.0') == 'GCP'
+    assert idx.classify_ip('10.2.0.0') == 'AWS'
+    assert idx.classify_ip('10.255.255.255') == 'AWS'
+    assert idx.classify_ip('11.0.0.0') is None
+
+
+def test_classify_ips_matches_classify_ip():
+    idx = index(('AWS', '52.0.0.0/11'), ('Cloudflare', '104.16.0.0/13'), ('GCP', '2600:1900::/28'))
+    ips = ['52.0.0.0', '52.31.255.255', '52.32.0.0', '104.20.1.1', '2600:1900::5', 'junk', '::1']
+    assert idx.classify_ips(ips) == [idx.classify_ip(ip) for ip in ips]
+    assert idx.classify_ips(ips) == ['AWS', 'AWS', None, 'Cloudflare', 'GCP', None, None]
+
+
+def test_binary_round_trip(tmp_path):
+    idx = index(('AWS', '52.0.0.0/11'), ('GCP', '34.64.0.0/10'), ('Cloudflare', '2606:4700::/32'),
+                ('Cloudflare', '104.16.0.0/13'))
+    loaded = ProviderIndex.from_bytes(idx.to_bytes())
+    assert loaded.providers == idx.providers
+    assert len(loaded) == len(idx)
+    ips = ['52.1.1.1', '34.100.0.1', '2606:4700::1', '104.17.0.1', '8.8.8.8', '2001:db8::1']
+    assert loaded.classify_ips(ips) == idx.classify_ips(ips)
+
+    path = tmp_path / 'index.bin'
+    idx.save(path)
+    assert ProviderIndex.load(path).classify_ips(ips) == idx.classify_ips(ips)
+
+
+def test_from_directory_reads_published_formats(tmp_path):
+    (tmp_path / 'aws.json').write_text(json.dumps({
+        'prefixes': [{'ip_prefix': '52.0.0.0/11'}],
+        'ipv6_prefixes': [{'ipv6_prefix': '2600:1f00::/24'}]}))
+    (tmp_path / 'gcp.json').write_text(json.dumps({
+        'prefixes': [{'ipv4Prefix': '34.64.0.0/10'}, {'ipv6Prefix': '2600:1900::/28'}]}))
+    (tmp_path / 'azure.json').write_text(json.dumps({
+        'values': [{'properties': {'addressPrefixes': ['52.224.0.0/11']}}]}))
+    (tmp_path / 'cloudflare-v4.txt').write_text('# comment\n104.16.0.0/13\n\n')
+    (tmp_path / 'notes.md').write_text('ignored')
+
+    idx = ProviderIndex.from_directory(tmp_path)
+    assert sorted(idx.providers) == ['AWS', 'Azure', 'Cloudflare', 'GCP']
+    assert idx.classify_ips(['52.1.1.1', '2600:1f00::1', '34.70.0.1', '2600:1900::1',
+                             '52.230.0.1', '104.16.1.1']) == [
+        'AWS', 'AWS', 'GCP', 'GCP', 'Azure', 'Cloudflare']
+    assert len(list(read_range_file(tmp_path / 'cloudflare-v4.txt'))) == 1
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+import stat
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks import emulator
+from subdomainfinder.daemon import AUTH_HEADER, ScanDaemon, load_token, serve_daemon
+
+TOKEN = 'test-token'
+
+
+async def with_daemon(test, latency_ms=200):
+    payloads = emulator.Payloads(hosts=20, crtsh_mb=0.02, latency_ms=latency_ms)
+    upstream = web.AppRunner(emulator.make_app(payloads), access_log=None)
+    await upstream.setup()
+    await web.TCPSite(upstream, '127.0.0.1', 0).start()
+    daemon = ScanDaemon(sources=['crtsh'], token=TOKEN,
+                        base_urls=emulator.base_urls('127.0.0.1', upstream.addresses[0][1]))
+    runner = await serve_daemon(daemon, port=0)
+    url = f'http://127.0.0.1:{runner.addresses[0][1]}'
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await test(daemon, session, url), payloads
+    finally:
+        await runner.cleanup()
+        await upstream.cleanup()
+
+
+async def scan(session, url, domain='example.com', headers=None):
+    headers = {AUTH_HEADER: TOKEN} if headers is None else headers
+    async with session.get(f'{url}/scan', params={'domain': domain}, headers=headers) as response:
+        if response.status != 200:
+            return response.status, None
+        return 200, [json.loads(line) for line in (await response.text()).splitlines()]
+
+
+def test_concurrent_requests_share_one_scan_then_hit_the_cache():
+    async def test(daemon, session, url):
+        first, second = await asyncio.gather(scan(session, url), scan(session, url))
+        third = await scan(session, url)
+        return daemon.scans_started, first[1], second[1], third[1]
+
+    (started, first, second, third), payloads = asyncio.run(with_daemon(test))
+    assert started == 1
+    assert sorted(event['joined'] for event in (first[0], second[0])) == [False, True]
+    expected = set(payloads.names('crtsh'))
+    for events in (first, second, third):
+        assert events[-1]['type'] == 'done' and events[-1]['count'] == len(expected)
+        assert {host for event in events if event['type'] == 'hosts'
+                for host, _ in event['hosts']} == expected
+    assert first[-1]['sources'] == {'crtsh': 'ok'}
+    assert third[0]['cached'] and not first[0]['cached']
+
+
+def test_requests_need_the_token_and_an_extension_origin():
+    async def test(daemon, session, url):
+        statuses = [
+            (await scan(session, url, headers={}))[0],
+            (await scan(session, url, headers={AUTH_HEADER: 'wrong'}))[0],
+            (await scan(session, url, headers={AUTH_HEADER: TOKEN, 'Origin': 'https://evil.example'}))[0],
+            (await scan(session, url, domain='not a domain'))[0],
+        ]
+        headers = {AUTH_HEADER: TOKEN, 'Origin': 'chrome-extension://abc'}
+        async with session.get(f'{url}/status', headers=headers) as response:
+            statuses.append(response.status)
+        async with session.get(f'{url}/results', params={'domain': 'example.com'},
+                               headers=headers) as response:
+            statuses.append(response.status)
+        return statuses, daemon.scans_started
+
+    (statuses, started), _ = asyncio.run(with_daemon(test, latency_ms=0))
+    assert statuses == [401, 401, 403, 400, 200, 404]
+    assert started == 0
+
+
+def test_generated_tokens_are_random_and_persisted_privately(tmp_path):
+    assert ScanDaemon(sources=['crtsh']).token != ScanDaemon(sources=['crtsh']).token
+    path = tmp_path / 'dir' / 'daemon.token'
+    token = load_token(path)
+    assert len(token) >= 32 and load_token(path) == token
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from benchmarks import dns_stub
+from subdomainfinder import dnscache
+from subdomainfinder.dnscache import DNSCache
+from subdomainfinder.resolver import NOERROR, NXDOMAIN, SERVFAIL, AsyncResolver, DNSAnswer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dnscache.time, 'time', lambda: now[0])
+    return now
+
+
+def found(name, ttl=60):
+    return DNSAnswer(name, 'A', NOERROR, ['192.0.2.1'], ttl=ttl)
+
+
+def test_answers_expire_with_their_ttl(clock):
+    cache = DNSCache()
+    cache.put(found('a.example.com', ttl=60))
+    clock[0] += 59.5
+    answer = cache.get('A.Example.com.')
+    assert answer.addresses == ['192.0.2.1'] and answer.name == 'A.Example.com.'
+    assert answer.ttl == 0
+    clock[0] += 1
+    assert cache.get('a.example.com') is None
+    assert len(cache) == 0 and cache.size == 0
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_ttl_is_clamped_and_negative_answers_use_their_own(clock):
+    cache = DNSCache(min_ttl=30, max_ttl=100, negative_ttl=10)
+    cache.put(found('short.example.com', ttl=1))
+    cache.put(found('long.example.com', ttl=10_000))
+    cache.put(DNSAnswer('gone.example.com', 'A', NXDOMAIN))
+    cache.put(DNSAnswer('soa.example.com', 'A', NXDOMAIN, ttl=60))
+    cache.put(DNSAnswer('broken.example.com', 'A', SERVFAIL))
+    clock[0] += 29
+    assert cache.get('short.example.com') is not None
+    assert not cache.get('gone.example.com').found  # negative_ttl raised to min_ttl
+    assert cache.get('broken.example.com') is None
+    clock[0] += 2
+    assert cache.get('short.example.com') is None
+    assert cache.get('gone.example.com') is None
+    assert cache.get('soa.example.com') is not None
+    clock[0] += 70
+    assert cache.get('long.example.com') is None
+    assert cache.negative_hits == 2
+
+
+def test_least_recently_used_entries_go_first(clock):
+    cache = DNSCache(max_bytes=3 * dnscache._size(found('h0.example.com')))
+    for i in range(3):
+        cache.put(found(f'h{i}.example.com'))
+    assert cache.get('h0.example.com') is not None
+    cache.put(found('h3.example.com'))
+    assert cache.get('h1.example.com') is None
+    assert all(cache.get(f'h{i}.example.com') is not None for i in (0, 2, 3))
+    assert cache.evictions == 1 and cache.size <= cache.max_bytes
+
+
+def test_unexpired_answers_persist(tmp_path, clock):
+    path = tmp_path / 'dns.sqlite'
+    with DNSCache(path=path) as cache:
+        cache.put(found('a.example.com', ttl=60))
+        cache.put(found('b.example.com', ttl=5))
+        cache.put(DNSAnswer('gone.example.com', 'A', NXDOMAIN, ttl=60))
+        clock[0] += 10
+    cache = DNSCache(path=path)
+    assert len(cache) == 2
+    assert cache.get('a.example.com').ttl == 50
+    assert not cache.get('gone.example.com').found
+
+
+def test_resolvers_sharing_a_cache_ask_the_server_once():
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport, stub = await loop.create_datagram_endpoint(dns_stub.StubProtocol,
+                                                              local_addr=('127.0.0.1', 0))
+        server = [f"127.0.0.1:{transport.get_extra_info('sockname')[1]}"]
+        names = [f'w{i}.example.com' for i in range(20)]
+        cache = DNSCache()
+        try:
+            for _ in range(2):
+                async with AsyncResolver(server, timeout=1.0, retries=1, cache=cache) as resolver:
+                    answers = [await resolver.resolve(name) for name in names]
+            return answers, stub.queries, cache
+        finally:
+            transport.close()
+
+    answers, queries, cache = asyncio.run(run())
+    assert queries == 20
+    assert cache.hits == 20
+    assert any(answer.found for answer in answers) and not all(answer.found for answer in answers)
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from subdomainfinder.enrichment import enrich_host, fingerprint_headers, probe_http
+
+from .fakes import FakeResolver, FakeSession
+
+
+def test_probe_http_prefers_https_even_when_http_answers_first():
+    session = FakeSession({
+        'https://a.example.com': (0.05, 200, {'Server': 'nginx'}),
+        'http://a.example.com': (0, 301, {'Server': 'redirector'}),
+    })
+    scheme, status, headers = asyncio.run(probe_http(session, 'a.example.com'))
+    assert (scheme, status, headers['Server']) == ('https', 200, 'nginx')
+
+
+def test_probe_http_falls_back_to_http():
+    session = FakeSession({'http://a.example.com': (0, 200, {'Server': 'apache'})})
+    assert asyncio.run(probe_http(session, 'a.example.com'))[:2] == ('http', 200)
+
+
+def test_probe_http_probes_both_schemes_at_once():
+    session = FakeSession({
+        'https://a.example.com': (0.2, asyncio.TimeoutError()),
+        'http://a.example.com': (0.2, 200, {}),
+    })
+    start = time.perf_counter()
+    assert asyncio.run(probe_http(session, 'a.example.com'))[0] == 'http'
+    # one timeout, not the two a probe after the other would cost
+    assert time.perf_counter() - start < 0.35
+
+
+def test_probe_http_returns_none_when_both_fail():
+    assert asyncio.run(probe_http(FakeSession({}), 'a.example.com')) is None
+
+
+def test_fingerprint_headers():
+    assert fingerprint_headers({'Server': 'NGINX', 'CF-Ray': 'x'}) == {'server': 'nginx', 'cdn': 'Cloudflare'}
+    assert fingerprint_headers({'X-Akamai-Transformed': '9'}) == {'server': 'unknown', 'cdn': 'Akamai'}
+    assert fingerprint_headers({}) == {'server': 'unknown', 'cdn': 'no'}
+
+
+def test_enrich_host_combines_dns_and_http_verdicts():
+    resolver = FakeResolver({'a.example.com': ['192.0.2.1']},
+                            cnames={'a.example.com': ['a.azurewebsites.net']})
+    session = FakeSession({'https://a.example.com': (0, 200, {'Server': 'Microsoft-IIS/10.0'})})
+    assert asyncio.run(enrich_host('a.example.com', resolver, session)) == {
+        'server': 'microsoft-iis/10.0', 'cdn': 'no', 'scheme': 'https', 'status': '200',
+        'provider': 'Azure', 'cname': 'a.azurewebsites.net', 'ip': '192.0.2.1'}
+
+
+def test_enrich_host_survives_dns_and_http_failures():
+    resolver = FakeResolver(errors={'a.example.com': OSError('unreachable')})
+    assert asyncio.run(enrich_host('a.example.com', resolver, FakeSession({}))) == {
+        'server': 'unreachable', 'cdn': '-', 'scheme': '-', 'status': '-',
+        'provider': 'Unknown', 'cname': '-', 'ip': '-'}
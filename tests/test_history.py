@@ -0,0 +1,45 @@
+from subdomainfinder.history import HistoryStore
+
+
+def test_first_run_adds_everything(tmp_path):
+    with HistoryStore(tmp_path / 'h.sqlite') as history:
+        diff = history.record('Example.com', {'b.example.com': ['crtsh'], 'a.example.com': ['otx']}, at=100)
+        assert (diff.added, diff.removed, diff.previous_run) == (['a.example.com', 'b.example.com'], [], None)
+        assert history.last_run('example.com') == 100
+
+
+def test_diff_against_the_previous_run(tmp_path):
+    with HistoryStore(tmp_path / 'h.sqlite') as history:
+        history.record('example.com', {'a.example.com': ['crtsh'], 'b.example.com': ['crtsh']}, at=100)
+        diff = history.record('example.com', {'a.example.com': ['otx'], 'c.example.com': ['otx']}, at=200)
+        assert (diff.added, diff.removed, diff.previous_run) == (['c.example.com'], ['b.example.com'], 100)
+
+        (a,) = [record for record in history.hosts('example.com') if record.host == 'a.example.com']
+        assert (a.first_seen, a.last_seen, a.sources) == (100, 200, ['crtsh', 'otx'])
+        assert [r.host for r in history.hosts('example.com')] == ['a.example.com', 'c.example.com']
+        assert len(history.hosts('example.com', include_removed=True)) == 3
+
+        # a host that comes back is added again
+        diff = history.record('example.com', {'a.example.com': ['otx'], 'b.example.com': ['otx'],
+                                              'c.example.com': ['otx']}, at=300)
+        assert (diff.added, diff.removed) == (['b.example.com'], [])
+
+
+def test_failed_sources_do_not_make_their_hosts_look_removed(tmp_path):
+    with HistoryStore(tmp_path / 'h.sqlite') as history:
+        history.record('example.com', {'a.example.com': ['crtsh'], 'b.example.com': ['otx']}, at=100)
+        diff = history.record('example.com', {'a.example.com': ['crtsh']}, completed_sources=['crtsh'], at=200)
+        assert not diff.changed
+        diff = history.record('example.com', {'a.example.com': ['crtsh']},
+                              completed_sources=['crtsh', 'otx'], at=300)
+        assert diff.removed == ['b.example.com']
+
+
+def test_out_of_scope_hosts_are_ignored_and_history_persists(tmp_path):
+    path = tmp_path / 'h.sqlite'
+    with HistoryStore(path) as history:
+        diff = history.record('example.com', {'example.com': ['crtsh'], 'evil.com': ['crtsh']}, at=100)
+        assert diff.added == ['example.com']
+    with HistoryStore(path) as history:
+        assert [r.host for r in history.hosts('example.com')] == ['example.com']
+        assert history.record('example.com', {'example.com': ['crtsh']}, at=200).previous_run == 100
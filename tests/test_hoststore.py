@@ -0,0 +1,100 @@
+import random
+
+from subdomainfinder.hoststore import HostStore
+
+HOSTS = ['example.com', 'www.example.com', 'a.dev.example.com', 'b.dev.example.com',
+         'dev.example.com', 'x.y.z.example.com', 'api.example.org']
+
+
+def below(hosts, zone):
+    return {h for h in hosts if h == zone or h.endswith('.' + zone)}
+
+
+def test_add_contains_and_len():
+    store = HostStore(HOSTS)
+    assert len(store) == len(HOSTS) and store
+    assert set(store) == set(HOSTS)
+    assert not store.add('www.example.com')
+    assert store.add('y.z.example.com')  # a zone that only held hosts becomes a host too
+    assert 'y.z.example.com' in store and 'x.y.z.example.com' in store
+    assert 'z.example.com' not in store and 'com' not in store and 1 not in store
+    assert not HostStore()
+
+
+def test_zone_queries():
+    store = HostStore(HOSTS)
+    assert store.count('example.com') == 6
+    assert store.count('dev.example.com') == 3
+    assert store.count('www.example.com') == 1
+    assert store.count('nosuch.example.com') == 0
+    assert store.count('') == len(HOSTS)
+    assert set(store.hosts('dev.example.com')) == below(HOSTS, 'dev.example.com')
+    assert set(store.hosts('z.example.com')) == {'x.y.z.example.com'}
+    assert list(store.hosts('a.dev.example.com')) == ['a.dev.example.com']
+    assert list(store.hosts('nosuch.com')) == []
+    assert dict(store.zones('example.com')) == {'www.example.com': 1, 'dev.example.com': 3,
+                                                'z.example.com': 1}
+    assert dict(store.zones()) == {'com': 6, 'org': 1}
+    assert list(store.zones('www.example.com')) == []
+
+
+def test_longest_suffix_matches_whole_labels():
+    roots = HostStore(['example.com', 'dev.example.com', 'example.org'])
+    assert roots.longest_suffix('a.b.dev.example.com') == 'dev.example.com'
+    assert roots.longest_suffix('www.example.com') == 'example.com'
+    assert roots.longest_suffix('example.com') == 'example.com'
+    assert roots.longest_suffix('evilexample.com') is None
+    assert roots.longest_suffix('example.net') is None
+
+
+def test_discard_prunes_empty_zones():
+    store = HostStore(HOSTS)
+    assert store.discard('dev.example.com')
+    assert not store.discard('dev.example.com')
+    assert not store.discard('z.example.com')
+    assert 'a.dev.example.com' in store and store.count('dev.example.com') == 2
+    assert store.discard('x.y.z.example.com')
+    assert dict(store.zones('example.com')) == {'www.example.com': 1, 'dev.example.com': 2}
+    for host in list(store):
+        assert store.discard(host)
+    assert len(store) == 0 and list(store.zones()) == []
+
+
+def test_merge_with_store_or_iterable():
+    left = HostStore(['a.example.com', 'dev.example.com', 'x.dev.example.com'])
+    right = HostStore(['a.example.com', 'b.a.example.com', 'dev.example.com', 'y.dev.example.com',
+                       'example.com', 'api.example.org'])
+    left |= right
+    expected = {'a.example.com', 'dev.example.com', 'x.dev.example.com', 'b.a.example.com',
+                'y.dev.example.com', 'example.com', 'api.example.org'}
+    assert set(left) == expected and len(left) == len(expected)
+    assert left.count('a.example.com') == 2
+    left.merge(left)
+    left.merge(['new.example.com', 'a.example.com'])
+    assert len(left) == len(expected) + 1
+    # the merged copy is independent of the store it came from
+    right.discard('api.example.org')
+    assert 'api.example.org' in left
+
+
+def test_matches_a_set_under_random_operations():
+    rng = random.Random(7)
+    labels = ['a', 'b', 'c', 'www']
+    names = ['.'.join(rng.choice(labels) for _ in range(rng.randint(1, 4))) + '.example.com'
+             for _ in range(300)]
+    store, model = HostStore(), set()
+    for _ in range(3000):
+        name = rng.choice(names)
+        if rng.random() < 0.6:
+            assert store.add(name) == (name not in model)
+            model.add(name)
+        else:
+            assert store.discard(name) == (name in model)
+            model.discard(name)
+    assert set(store) == model and len(store) == len(model)
+    for zone in ('example.com', 'a.example.com', 'b.a.example.com', 'www.c.example.com'):
+        assert store.count(zone) == len(below(model, zone))
+        assert set(store.hosts(zone)) == below(model, zone)
+    other = HostStore(rng.sample(names, 100))
+    store.merge(other)
+    assert set(store) == model | set(other) and len(store) == len(model | set(other))
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from subdomainfinder.jsonstream import JSONStringScanner, iter_json_strings
+
+DOCUMENT = json.dumps([
+    {'id': 1, 'name_value': 'a.example.com\nb.example.com', 'issuer': 'C=US, O="Let\'s Encrypt"'},
+    {'id': 2, 'name_value': 'café.example.com', 'dns_names': ['c.example.com', 'd.example.com']},
+    {'id': 3, 'dns_names': [], 'note': 'quote \\" and backslash \\\\ inside'},
+    {'id': 4, 'name_value': 'e.example.com', 'hostname': 'x☃.example.com'},
+], ensure_ascii=False).encode('utf-8')
+
+
+def scan(chunks, keys=None):
+    scanner = JSONStringScanner(keys)
+    return [item for chunk in chunks for item in scanner.feed(chunk)]
+
+
+def splits(data):
+    for i in range(len(data) + 1):
+        yield [data[:i], data[i:]]
+
+
+def test_keyed_values():
+    assert scan([DOCUMENT], ('name_value', 'dns_names')) == [
+        ('name_value', 'a.example.com\nb.example.com'),
+        ('name_value', 'café.example.com'),
+        ('dns_names', 'c.example.com'),
+        ('dns_names', 'd.example.com'),
+        ('name_value', 'e.example.com'),
+    ]
+
+
+def test_every_string_without_keys():
+    values = [value for key, value in scan([DOCUMENT])]
+    assert all(key is None for key, _ in scan([DOCUMENT]))
+    assert 'C=US, O="Let\'s Encrypt"' in values
+    assert 'quote \\" and backslash \\\\ inside' in values
+    assert 'x☃.example.com' in values
+    assert values.count('name_value') == 3
+
+
+@pytest.mark.parametrize('keys', [None, ('name_value', 'dns_names'), ('hostname',)])
+def test_any_chunk_boundary_gives_the_same_values(keys):
+    expected = scan([DOCUMENT], keys)
+    assert expected
+    for chunks in splits(DOCUMENT):
+        assert scan(chunks, keys) == expected
+    assert scan([DOCUMENT[i:i + 1] for i in range(len(DOCUMENT))], keys) == expected
+
+
+def test_iter_json_strings():
+    async def chunks():
+        for i in range(0, len(DOCUMENT), 7):
+            yield DOCUMENT[i:i + 7]
+
+    async def collect():
+        return [item async for item in iter_json_strings(chunks(), ('hostname',))]
+
+    assert asyncio.run(collect()) == [('hostname', 'x☃.example.com')]
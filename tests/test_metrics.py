@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import aiohttp
+
+from subdomainfinder.metrics import Histogram, Metrics, serve_metrics
+
+
+def test_histogram_quantiles_are_bucket_bounds_capped_at_the_max():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+    for seconds in (0.05, 0.05, 0.05, 0.5):
+        histogram.observe(seconds)
+    assert histogram.counts == [3, 1, 0]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.99) == 0.5
+    histogram.observe(7.0)
+    assert histogram.counts == [3, 1, 1]
+    assert histogram.quantile(0.99) == 7.0
+    assert histogram.report()['count'] == 5
+
+
+def test_contributions_count_hosts_only_one_source_found():
+    metrics = Metrics()
+    for source, host in [('crtsh', 'a.example.com'), ('crtsh', 'b.example.com'),
+                         ('otx', 'b.example.com'), ('otx', 'b.example.com'), ('wayback', 'c.example.com')]:
+        metrics.saw(source, host)
+    assert metrics.contributions() == {'crtsh': (2, 1), 'otx': (1, 0), 'wayback': (1, 1)}
+    metrics.source('crtsh').seconds = 3.0
+    report = metrics.report()
+    assert report['hosts'] == 3
+    assert report['sources']['crtsh']['seconds_per_unique_host'] == 3.0
+    assert json.loads(json.dumps(report)) == report
+
+
+def test_timed_stages_accumulate():
+    metrics = Metrics()
+    for _ in range(2):
+        with metrics.timed('clean') as stage:
+            stage.items_in += 10
+            stage.outcomes['invalid'] += 1
+    stage = metrics.report()['stages']['clean']
+    assert stage['items_in'] == 20
+    assert stage['outcomes'] == {'invalid': 2}
+    assert stage['seconds'] >= 0
+
+
+def test_prometheus_text_format():
+    metrics = Metrics()
+    crtsh = metrics.source('crtsh')
+    crtsh.status = 'ok'
+    crtsh.observe_request(200, 0.02)
+    crtsh.observe_request(200, 0.3)
+    crtsh.observe_request(503, 100.0)
+    metrics.source('odd"name').status = 'timeout'
+    text = metrics.prometheus()
+    lines = text.splitlines()
+    assert 'subdomainfinder_source_up{source="crtsh",status="ok"} 1' in lines
+    assert 'subdomainfinder_source_up{source="odd\\"name",status="timeout"} 0' in lines
+    assert 'subdomainfinder_source_requests_total{source="crtsh",code="503"} 1' in lines
+    buckets = [line for line in lines if line.startswith(
+        'subdomainfinder_source_request_duration_seconds_bucket{source="crtsh"')]
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts) and counts[-1] == 3
+    assert buckets[-1].endswith('le="+Inf"} 3')
+    assert 'subdomainfinder_source_request_duration_seconds_count{source="crtsh"} 3' in lines
+    assert text.endswith('\n')
+    for line in lines:
+        if line.startswith('# TYPE'):
+            assert line.split()[-1] in ('gauge', 'counter', 'histogram')
+
+
+def test_serve_metrics_exposes_both_formats():
+    async def fetch():
+        metrics = Metrics()
+        metrics.source('crtsh').status = 'ok'
+        runner = await serve_metrics(metrics, port=0)
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as response:
+                    text = await response.text()
+                async with session.get(f'http://127.0.0.1:{port}/report') as response:
+                    report = await response.json()
+            return text, report
+        finally:
+            await runner.cleanup()
+
+    text, report = asyncio.run(fetch())
+    assert 'subdomainfinder_source_up{source="crtsh",status="ok"} 1' in text
+    assert report['sources']['crtsh']['status'] == 'ok'
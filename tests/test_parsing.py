@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from subdomainfinder.parsing import ParseExecutor
+from subdomainfinder.sources import BodyParser, TableCellsParser, _input_value
+
+PAGE = ('<html><table>\n'
+        '<tr><th>Host</th></tr>\n'
+        '<tr class="x"><td>a.example.com<br>mail server</td><td>192.0.2.1</td></tr >\n'
+        '<TR><TD><b>b.example.com</b></TD><td>x</td></TR>\n'
+        '<tr><td>café&amp;co.example.com</td></tr>\n'
+        '<tr><td>last.example.com</td>'
+        '</table></html>').encode()
+CELLS = ['a.example.commail server', 'b.example.com', 'café&co.example.com', 'last.example.com']
+
+
+def cells(chunks):
+    parser = TableCellsParser()
+    found = [cell for chunk in chunks for cell in parser.feed(chunk)]
+    return found + parser.finish()
+
+
+def test_table_cells_whole_page():
+    assert cells([PAGE]) == CELLS
+
+
+def test_table_cells_at_every_split_point():
+    # includes splits inside tags, a "</tr >" and the two bytes of the UTF-8 "é"
+    for i in range(len(PAGE) + 1):
+        assert cells([PAGE[:i], PAGE[i:]]) == CELLS, i
+
+
+def test_table_cells_byte_by_byte_emit_rows_as_they_close():
+    parser = TableCellsParser()
+    seen = []
+    for i in range(len(PAGE)):
+        for cell in parser.feed(PAGE[i:i + 1]):
+            seen.append((cell, i))
+    assert [cell for cell, _ in seen] == CELLS[:3]
+    first_end = PAGE.index(b'</tr >') + len(b'</tr >') - 1
+    assert seen[0][1] == first_end
+    assert parser.finish() == CELLS[3:]
+
+
+def test_input_value():
+    page = ('<form><input type="hidden" name="other" value="1">'
+            "<INPUT value='tok&amp;en' name=csrfmiddlewaretoken></form>")
+    assert _input_value(page, 'csrfmiddlewaretoken') == 'tok&en'
+    assert _input_value(page, 'missing') is None
+
+
+def test_parse_executor_offloads_only_big_steps():
+    threads = []
+
+    def parse(text):
+        threads.append(threading.current_thread())
+        return text.split()
+
+    async def run(body):
+        executor = ParseExecutor(threshold=100)
+        try:
+            parser = BodyParser(parse)
+            for i in range(0, len(body), 10):
+                assert list(await executor.feed(parser, body[i:i + 10])) == []
+            return list(await executor.finish(parser)), executor.offloaded
+        finally:
+            executor.close()
+
+    assert asyncio.run(run(b'a.example.com b.example.com')) == (['a.example.com', 'b.example.com'], 0)
+    assert threads.pop() is threading.main_thread()
+
+    body = b' '.join(f'h{i}.example.com'.encode() for i in range(20))
+    hosts, offloaded = asyncio.run(run(body))
+    assert len(hosts) == 20 and offloaded == 1
+    assert threads.pop() is not threading.main_thread()
+
+
+def test_parse_executor_offloads_big_chunks():
+    async def run():
+        executor = ParseExecutor(threshold=len(PAGE))
+        try:
+            parser = TableCellsParser()
+            found = list(await executor.feed(parser, PAGE)) + list(await executor.finish(parser))
+            return found, executor.offloaded
+        finally:
+            executor.close()
+
+    assert asyncio.run(run()) == (CELLS, 1)
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from subdomainfinder.brute_force import ResolvingScanner
+from subdomainfinder.permutations import BloomFilter, Permutator, label_frequencies, split_labels
+
+from .fakes import FakeResolver
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10_000, error_rate=0.01)
+    items = [f'h{i}.example.com' for i in range(10_000)]
+    assert all(bloom.add(item) for item in items[:10])
+    for item in items[10:]:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert not bloom.add(items[0])
+    false_positives = sum(f'other{i}.example.com' in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_split_labels_and_frequencies():
+    assert split_labels('a.b.example.com', 'example.com') == ['a', 'b']
+    assert split_labels('example.com', 'example.com') == []
+    assert split_labels('a.badexample.com', 'example.com') == []
+    counts = label_frequencies(['dev-api.example.com', 'api.example.com', 'api.eu.example.com'],
+                               'example.com')
+    assert counts['api'] == 3 and counts['dev'] == 1 and counts['dev-api'] == 1 and counts['eu'] == 1
+
+
+def permutator(hosts, **kwargs):
+    return Permutator('example.com', hosts, wordlist=kwargs.pop('wordlist', []),
+                      resolver=FakeResolver(kwargs.pop('records', {})), filter_wildcards=False, **kwargs)
+
+
+def test_candidates_start_with_number_tweaks_then_word_alterations():
+    candidates = list(permutator(['api2.example.com'], wordlist=['dev']).candidates())
+    assert candidates[:2] == ['api1.example.com', 'api3.example.com']
+    for name in ['dev-api2.example.com', 'api2-dev.example.com', 'dev.api2.example.com',
+                 'api2.dev.example.com', 'devapi2.example.com', 'api2dev.example.com']:
+        assert name in candidates
+
+
+def test_candidates_are_unique_new_and_bounded():
+    hosts = ['api.example.com', 'dev.example.com', 'dev-api.example.com', 'mail2.example.com']
+    candidates = list(permutator(hosts, wordlist=['staging', 'test']).candidates())
+    assert len(candidates) == len(set(candidates))
+    assert not set(candidates) & set(hosts)
+    assert all(name.endswith('.example.com') for name in candidates)
+
+    limited = permutator(hosts, wordlist=['staging', 'test'], max_candidates=7)
+    assert list(limited.candidates()) == candidates[:7]
+    assert limited.generated == 7
+
+
+def test_scan_keeps_candidates_that_resolve():
+    scanner = permutator(['api1.example.com'], records={'api2.example.com': ['192.0.2.1']})
+    assert asyncio.run(scanner.scan()) == {'api2.example.com'}
+
+
+def test_scanners_must_generate_candidates():
+    class NoCandidates(ResolvingScanner):
+        pass
+
+    with pytest.raises(TypeError):
+        NoCandidates('example.com', resolver=FakeResolver())
@@ -0,0 +1,65 @@
+import json
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+NODE = shutil.which('node')
+HARNESS = Path(__file__).with_name('popup_harness.js')
+
+pytestmark = pytest.mark.skipif(NODE is None, reason='node is not installed')
+
+HOSTS = [f'h{i:05d}.example.com' for i in range(10_000)]
+VISIBLE = 420 // 30 + 10  # rows in view plus the overscan below them
+
+
+def run(**scenario):
+    output = subprocess.run([NODE, str(HARNESS)], input=json.dumps(scenario), capture_output=True,
+                            text=True, check=True, timeout=60).stdout
+    return json.loads(output)
+
+
+def test_restored_results_render_and_probe_only_visible_rows():
+    result = run(storage={'savedResults': HOSTS, 'savedDomain': 'example.com'})
+    restored = result['restored']
+    assert restored['hosts'] == HOSTS[:VISIBLE]
+    assert sorted(restored['probes']) == HOSTS[:VISIBLE]
+    assert restored['peakInFlight'] <= 6
+
+
+def test_scrolling_renders_and_probes_the_new_rows_first():
+    result = run(storage={'savedResults': HOSTS}, scrollTo=30 * 5000)
+    scrolled = result['scrolled']
+    assert scrolled['hosts'] == HOSTS[4990:5000 + VISIBLE]
+    assert set(scrolled['probes']) == set(HOSTS[4990:5000 + VISIBLE])
+
+
+def test_fresh_verdicts_are_not_probed_again():
+    now_ms = int(time.time() * 1000)
+    verdicts = {host: ['AWS', 'aws', now_ms] for host in HOSTS[:20]}
+    verdicts.update({host: ['AWS', 'aws', now_ms - 7 * 3600 * 1000] for host in HOSTS[20:VISIBLE]})
+    result = run(storage={'savedResults': HOSTS, 'probeVerdicts': verdicts})
+    assert sorted(result['restored']['probes']) == HOSTS[20:VISIBLE]
+
+
+def test_daemon_batches_fill_the_table_and_the_saved_results():
+    events = [{'type': 'start', 'cached': False, 'joined': False},
+              {'type': 'hosts', 'hosts': [['c.example.com', 'crtsh'], ['a.example.com', 'otx']]},
+              {'type': 'hosts', 'hosts': [['b.example.com', 'crtsh']]},
+              {'type': 'done', 'count': 3}]
+    body = ''.join(json.dumps(event) + '\n' for event in events)
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]  # events split across reads
+    result = run(storage={}, token='secret', scan='example.com', daemonChunks=chunks)
+    scanned = result['scanned']
+    assert scanned['saved'] == ['a.example.com', 'b.example.com', 'c.example.com']
+    assert scanned['hosts'] == scanned['saved']
+    daemon = [r for r in result['requests'] if r['url'].startswith('http://127.0.0.1:8787/')]
+    assert daemon[0]['headers'] == {'X-SubdomainFinder': 'secret'}
+
+
+def test_without_a_token_the_daemon_is_not_called():
+    result = run(storage={}, scan='example.com', daemonChunks=[])
+    assert not any(r['url'].startswith('http://127.0.0.1:8787/') for r in result['requests'])
+    assert result['scanned']['saved'] is None
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from subdomainfinder.ratelimit import CircuitOpen, RequestLimiter, SourceLimiter, parse_retry_after
+
+
+def acquire(limiter):
+    asyncio.run(limiter.acquire())
+
+
+def test_window_grows_additively_and_halves_on_failure():
+    limiter = SourceLimiter('s', max_concurrency=4, backoff=0)
+    assert limiter.window == 2
+    limiter.record_success()
+    assert limiter.window == 2.5
+    for _ in range(20):
+        limiter.record_success()
+    assert limiter.window == 4
+    limiter.record_failure(retry_after=0)
+    assert limiter.window == 2
+    limiter.record_failure(retry_after=0)
+    limiter.record_failure(retry_after=0)
+    assert limiter.window == 1
+
+
+def test_rate_halves_on_throttling_and_recovers_on_success():
+    limiter = SourceLimiter('s', rate=8.0, backoff=0)
+    limiter.record_failure(throttled=True, retry_after=0)
+    assert limiter.bucket.rate == 4.0
+    for _ in range(10):
+        limiter.record_failure(throttled=True, retry_after=0)
+    assert limiter.bucket.rate == 0.5  # never below a sixteenth
+    limiter.record_success()
+    assert limiter.bucket.rate == pytest.approx(1.3)
+    for _ in range(20):
+        limiter.record_success()
+    assert limiter.bucket.rate == 8.0
+
+
+def test_throttling_alone_never_opens_the_circuit():
+    limiter = SourceLimiter('s', failure_threshold=2, backoff=0)
+    for _ in range(10):
+        limiter.record_failure(throttled=True, retry_after=0)
+    assert (limiter.state, limiter.failures, limiter.throttled) == ('closed', 0, 10)
+    limiter.record_exhausted()
+    limiter.record_exhausted()
+    assert limiter.state == 'open'
+
+
+def test_circuit_opens_after_consecutive_failures_and_recovers_through_one_trial():
+    limiter = SourceLimiter('s', failure_threshold=3, cooldown=0.05, backoff=0)
+    limiter.record_failure(retry_after=0)
+    limiter.record_success()
+    limiter.record_failure(retry_after=0)
+    limiter.record_failure(retry_after=0)
+    assert limiter.state == 'closed'  # the success reset the count
+    limiter.record_failure(retry_after=0)
+    assert limiter.state == 'open'
+    with pytest.raises(CircuitOpen):
+        acquire(limiter)
+
+    time.sleep(0.06)
+    acquire(limiter)
+    assert limiter.state == 'half-open'
+    with pytest.raises(CircuitOpen):
+        acquire(limiter)  # only one trial at a time
+    limiter.record_failure(retry_after=0)
+    limiter.release()
+    assert limiter.state == 'open'
+
+    time.sleep(0.06)
+    acquire(limiter)
+    limiter.record_success()
+    limiter.release()
+    assert (limiter.state, limiter.failures) == ('closed', 0)
+
+
+def test_requests_wait_for_a_free_slot_in_the_window():
+    limiter = SourceLimiter('s', max_concurrency=2)
+
+    async def run():
+        await limiter.acquire()
+        await limiter.acquire()
+        third = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        limiter.release()
+        await asyncio.wait_for(third, 1)
+        assert limiter.in_flight == 2
+
+    asyncio.run(run())
+
+
+def test_slot_counts_only_network_errors_as_failures():
+    limiter = RequestLimiter(failure_threshold=100)
+    source = limiter.source('s')
+    source.backoff = 0
+
+    async def run(error):
+        async with limiter.slot('s'):
+            raise error
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(run(aiohttp.ClientConnectionError()))
+    assert source.failures == 1
+    with pytest.raises(ValueError):
+        asyncio.run(run(ValueError('parser bug')))
+    assert source.failures == 1
+
+    async def ok():
+        async with limiter.slot('s'):
+            pass
+
+    asyncio.run(ok())
+    assert source.failures == 0
+    assert source.in_flight == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after('-5') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
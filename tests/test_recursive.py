@@ -0,0 +1,64 @@
+import asyncio
+
+from subdomainfinder.recursive import RecursiveScanner
+
+from .fakes import FakeResolver
+
+WORDS = ['www', 'dev', 'api', 'mail', 'vpn']
+
+
+class ZoneResolver(FakeResolver):
+    """FakeResolver where every name below ``wildcard`` resolves."""
+
+    def __init__(self, records, wildcard=None):
+        super().__init__(records)
+        self.wildcard = wildcard
+
+    async def resolve(self, name, rdtype='A'):
+        if self.wildcard and name.endswith('.' + self.wildcard):
+            self.records.setdefault(name, ['192.0.2.99'])
+        return await super().resolve(name, rdtype)
+
+
+def scanner(records, wildcard=None, hosts=(), **kwargs):
+    return RecursiveScanner('example.com', hosts=hosts, wordlist=WORDS, passive=False,
+                            batch_size=2, resolver=ZoneResolver(records, wildcard), **kwargs)
+
+
+def test_finds_hosts_in_zones_revealed_by_other_hosts():
+    records = {name: ['192.0.2.1'] for name in [
+        'www.example.com', 'dev.corp.example.com', 'mail.corp.example.com']}
+    recursive = scanner(records, hosts=['vpn.corp.example.com'])
+    found = asyncio.run(recursive.scan())
+    assert found == set(records) | {'vpn.corp.example.com'}
+    assert set(recursive.zones) == {'example.com', 'corp.example.com'}
+    assert recursive.zones['corp.example.com'].hits == 2
+
+
+def test_max_depth_limits_the_zones_brute_forced():
+    records = {name: ['192.0.2.1'] for name in ['api.dev.example.com', 'www.a.b.example.com']}
+    recursive = scanner(records, hosts=['x.dev.example.com', 'y.a.b.example.com'], max_depth=1)
+    assert asyncio.run(recursive.scan()) == {'x.dev.example.com', 'y.a.b.example.com',
+                                             'api.dev.example.com'}
+    assert set(recursive.zones) == {'example.com', 'dev.example.com', 'b.example.com'}
+    assert not any(name.endswith('.a.b.example.com') for name in recursive.resolver.queries)
+
+
+def test_query_budget_is_never_exceeded():
+    records = {f'{word}.example.com': ['192.0.2.1'] for word in WORDS}
+    for budget in range(1, 40):
+        recursive = scanner(records, query_budget=budget)
+        asyncio.run(recursive.scan())
+        # A zone's wildcard probes are spent as a unit, so they may straddle the budget
+        assert recursive.queries == len(recursive.resolver.queries)
+        assert recursive.queries < budget + recursive.wildcards.probes
+    assert recursive.queries < budget
+
+
+def test_wildcard_zones_are_not_brute_forced():
+    recursive = scanner({}, wildcard='wild.example.com', hosts=['www.wild.example.com'])
+    assert asyncio.run(recursive.scan()) == {'www.wild.example.com'}
+    assert recursive.zones['wild.example.com'].wildcard
+    assert recursive.zones['wild.example.com'].next_word == 0
+    brute = [name for name in recursive.resolver.queries if name.endswith('.wild.example.com')]
+    assert len(brute) == recursive.wildcards.probes
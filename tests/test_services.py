@@ -0,0 +1,61 @@
+import asyncio
+
+from subdomainfinder.services import ServiceScanner, stream_sources
+
+
+def run(sources, **kwargs):
+    status, errors = {}, {}
+
+    async def collect():
+        return [item async for item in stream_sources(sources, status=status, errors=errors, **kwargs)]
+
+    return asyncio.run(collect()), status, errors
+
+
+def test_hosts_stream_as_found_deduplicated_and_lowercased():
+    async def fast():
+        return ['a.example.com', 'B.example.com']
+
+    async def streaming():
+        yield 'b.example.com'
+        await asyncio.sleep(0.01)
+        yield 'c.example.com'
+
+    items, status, errors = run({'fast': fast, 'streaming': streaming})
+    assert sorted(host for _, host in items) == ['a.example.com', 'b.example.com', 'c.example.com']
+    assert dict((host, name) for name, host in items)['c.example.com'] == 'streaming'
+    assert status == {'fast': 'ok', 'streaming': 'ok'}
+    assert errors == {}
+
+
+def test_slow_and_failing_sources_keep_what_they_found():
+    async def slow():
+        yield 'early.example.com'
+        await asyncio.sleep(5)
+        yield 'late.example.com'
+
+    async def broken():
+        yield 'partial.example.com'
+        raise ValueError('bad page')
+
+    items, status, errors = run({'slow': slow, 'broken': broken}, source_timeout=0.05)
+    assert sorted(host for _, host in items) == ['early.example.com', 'partial.example.com']
+    assert status == {'slow': 'timeout', 'broken': 'error'}
+    assert errors == {'slow': 'TimeoutError', 'broken': 'ValueError'}
+
+
+def test_budget_ends_the_whole_scan():
+    async def endless():
+        for i in range(1000):
+            yield f'h{i}.example.com'
+            await asyncio.sleep(0.01)
+
+    items, status, _ = run({'endless': endless}, source_timeout=None, budget=0.1)
+    assert 0 < len(items) < 1000
+    assert status == {'endless': 'cancelled'}
+
+
+def test_scanner_keeps_only_hosts_in_scope():
+    scanner = ServiceScanner('Example.com', sources=['crtsh'])
+    hosts = [' A.example.com ', 'example.com', 'evil.com', 'example.com.evil.com', 'badexample.com']
+    assert scanner._scoped('crtsh', hosts) == [('crtsh', 'a.example.com'), ('crtsh', 'example.com')]
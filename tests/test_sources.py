@@ -0,0 +1,154 @@
+import asyncio
+import json
+from dataclasses import replace
+
+import pytest
+
+from subdomainfinder.sources import (DISABLED_SOURCES_ENV, OTX_PAGE_SIZE, SOURCES, SOURCES_ENV,
+                                     register, select_sources)
+
+
+def parse(name, chunks, domain='example.com'):
+    parser = SOURCES[name].parser(domain)
+    hosts = [host for chunk in chunks for host in parser.feed(chunk)]
+    return hosts + list(parser.finish())
+
+
+def halves(data):
+    return [data[:len(data) // 2], data[len(data) // 2:]]
+
+
+def test_crtsh_parser_splits_name_values():
+    body = json.dumps([{'id': 1, 'name_value': 'a.example.com\n*.b.example.com'},
+                       {'id': 2, 'name_value': 'c.example.com'}]).encode()
+    assert parse('crtsh', halves(body)) == ['a.example.com', '*.b.example.com', 'c.example.com']
+
+
+def test_wayback_parser_takes_url_hosts():
+    body = json.dumps([['original'], ['http://a.example.com:80/x'],
+                       ['https://b.example.com/'], ['c.example.com']]).encode()
+    assert parse('wayback', halves(body)) == ['a.example.com', 'b.example.com']
+
+
+def test_certspotter_parser_reads_dns_names():
+    body = json.dumps([{'id': '1', 'dns_names': ['a.example.com', 'b.example.com']},
+                       {'id': '2', 'dns_names': ['c.example.com']}]).encode()
+    assert parse('certspotter', halves(body)) == ['a.example.com', 'b.example.com', 'c.example.com']
+
+
+def test_select_sources_by_name_and_exclusion(monkeypatch):
+    monkeypatch.delenv(SOURCES_ENV, raising=False)
+    monkeypatch.delenv(DISABLED_SOURCES_ENV, raising=False)
+    monkeypatch.delenv('VIRUSTOTAL_API_KEY', raising=False)
+    names = [source.name for source in select_sources()]
+    assert 'crtsh' in names and 'virustotal' not in names  # no API key set
+    assert [s.name for s in select_sources('OTX, crtsh')] == ['otx', 'crtsh']
+    assert 'otx' not in [s.name for s in select_sources(disabled=['otx'])]
+
+    monkeypatch.setenv(SOURCES_ENV, 'crtsh,wayback')
+    monkeypatch.setenv(DISABLED_SOURCES_ENV, 'wayback')
+    assert [s.name for s in select_sources()] == ['crtsh']
+
+
+def test_select_sources_rejects_unknown_names():
+    with pytest.raises(ValueError, match='nosuch'):
+        select_sources(['crtsh', 'nosuch'])
+
+
+def test_base_urls_override_where_a_source_is_fetched():
+    (crtsh,) = select_sources(['crtsh'], base_urls={'crtsh': 'http://127.0.0.1:9000/'})
+    assert crtsh.url('example.com') == 'http://127.0.0.1:9000/?q=%.example.com&output=json'
+    assert SOURCES['crtsh'].base_url == 'https://crt.sh'
+
+
+def test_sources_may_not_share_an_endpoint(monkeypatch):
+    monkeypatch.setenv('VIRUSTOTAL_API_KEY', 'secret')
+    with pytest.raises(ValueError, match='share the endpoint'):
+        register(replace(SOURCES['crtsh'], name='crtsh-mirror'))
+    assert 'crtsh-mirror' not in SOURCES
+    # re-registering a source under its own name replaces it
+    register(SOURCES['crtsh'])
+    # the API key is a request parameter, never part of the URL or cache key
+    endpoint = SOURCES['virustotal'].endpoint('example.com')
+    assert 'secret' not in endpoint.url and endpoint.key is None
+    assert endpoint.kwargs['params'] == {'apikey': 'secret'}
+
+
+class FakeContext:
+    """A SourceContext serving bodies from ``{url: body}`` and recording what was asked."""
+
+    cache_only = False
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.urls = []
+
+    def cached(self, source, key):
+        return None
+
+    async def fetch(self, endpoint):
+        self.urls.append(endpoint.url)
+        return self.bodies.get(endpoint.url)
+
+    async def stream(self, endpoint):
+        self.urls.append(endpoint.url)
+        body = self.bodies.get(endpoint.url)
+        if body:
+            yield body
+
+    async def body(self, data):
+        yield data
+
+
+def pages(name, context, domain='example.com'):
+    source = SOURCES[name]
+
+    async def run():
+        hosts = []
+        async for page in source.fetch(context, source, domain):
+            parser = source.parser(domain)
+            async for chunk in page:
+                hosts.extend(parser.feed(chunk))
+            hosts.extend(parser.finish())
+        return hosts
+
+    return asyncio.run(run())
+
+
+def test_wayback_fetches_every_page():
+    url = SOURCES['wayback'].url('example.com')
+    context = FakeContext({
+        url + '&showNumPages=true': b'3\n',
+        **{f'{url}&page={i}': json.dumps([['original'], [f'http://p{i}.example.com/']]).encode()
+           for i in range(3)},
+    })
+    assert sorted(pages('wayback', context)) == ['p0.example.com', 'p1.example.com', 'p2.example.com']
+
+
+def test_wayback_without_page_count_fetches_once():
+    url = SOURCES['wayback'].url('example.com')
+    context = FakeContext({url: json.dumps([['http://a.example.com/']]).encode()})
+    assert pages('wayback', context) == ['a.example.com']
+    assert context.urls == [url + '&showNumPages=true', url]
+
+
+def test_otx_pages_follow_the_first_page_count():
+    url = f"{SOURCES['otx'].url('example.com')}?limit={OTX_PAGE_SIZE}&page="
+
+    def page(n):
+        return json.dumps({'count': 2 * OTX_PAGE_SIZE + 1,
+                           'passive_dns': [{'hostname': f'p{n}.example.com'}]}).encode()
+
+    context = FakeContext({f'{url}{n}': page(n) for n in (1, 2, 3, 4)})
+    assert sorted(pages('otx', context)) == ['p1.example.com', 'p2.example.com', 'p3.example.com']
+
+
+def test_certspotter_follows_the_cursor_until_it_stops_moving():
+    url = SOURCES['certspotter'].url('example.com')
+
+    def page(*ids):
+        return json.dumps([{'id': str(i), 'dns_names': [f'h{i}.example.com']} for i in ids]).encode()
+
+    context = FakeContext({url: page(1, 2), f'{url}&after=2': page(3), f'{url}&after=3': b'[]'})
+    assert pages('certspotter', context) == ['h1.example.com', 'h2.example.com', 'h3.example.com']
+    assert context.urls == [url, f'{url}&after=2', f'{url}&after=3']
@@ -0,0 +1,125 @@
+import asyncio
+import random
+
+import pytest
+
+from subdomainfinder import utils
+from subdomainfinder.utils import SubdomainValidator, bounded_as_completed, external_sorted_unique
+
+
+def collect(func, items, concurrency):
+    async def run():
+        return [result async for result in bounded_as_completed(func, items, concurrency)]
+    return asyncio.run(run())
+
+
+def test_bounded_as_completed_yields_every_result_and_drops_none():
+    async def double(n):
+        await asyncio.sleep(0)
+        return None if n % 3 == 0 else n * 2
+
+    assert sorted(collect(double, range(20), 4)) == [n * 2 for n in range(20) if n % 3]
+
+
+def test_bounded_as_completed_limits_calls_in_flight():
+    in_flight = peak = 0
+
+    async def track(n):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return n
+
+    assert len(collect(track, range(50), 5)) == 50
+    assert peak == 5
+
+
+def test_bounded_as_completed_pulls_items_lazily():
+    pulled = 0
+
+    def items():
+        nonlocal pulled
+        while True:
+            pulled += 1
+            yield pulled
+
+    async def take(count):
+        results = []
+        async for result in bounded_as_completed(lambda n: asyncio.sleep(0, n), items(), 3):
+            results.append(result)
+            if len(results) == count:
+                break
+        return results
+
+    assert len(asyncio.run(take(10))) == 10
+    assert pulled < 100
+
+
+def test_bounded_as_completed_raises_worker_errors():
+    async def fail_on_seven(n):
+        await asyncio.sleep(0)
+        if n == 7:
+            raise ValueError(n)
+        return n
+
+    with pytest.raises(ValueError):
+        collect(fail_on_seven, range(20), 4)
+
+
+def test_validator_accepts_hosts_strictly_below_the_base_domain():
+    validator = SubdomainValidator('Example.com.')
+    assert validator.is_valid('www.example.com')
+    assert validator.is_valid('a-b.c1.example.com')
+    assert not validator.is_valid('example.com')
+    assert not validator.is_valid('www.badexample.com')
+    assert not validator.is_valid('-www.example.com')
+    assert not validator.is_valid('www-.example.com')
+    assert not validator.is_valid('a..b.example.com')
+    assert not validator.is_valid('*.example.com')
+    assert not validator.is_valid('under_score.example.com')
+    assert not validator.is_valid('x' * 64 + '.example.com')
+    assert validator.is_valid('x' * 63 + '.example.com')
+
+
+def test_clean_splits_normalises_and_deduplicates():
+    raw = ['WWW.example.com', 'www.example.com', 'a.example.com\nb.example.com',
+           '*.c.example.com', 'd.example.com, e.example.com', '.f.example.com.', None, '',
+           'other.org', 'junk junk']
+    expected = ['a.example.com', 'b.example.com', 'd.example.com', 'e.example.com',
+                'f.example.com', 'www.example.com']
+    validator = SubdomainValidator('example.com')
+    assert validator.clean(raw) == expected
+    assert list(dict.fromkeys(validator.iter_valid(raw))) == ['www.example.com'] + expected[:-1]
+
+
+def test_clean_gives_the_same_result_with_a_tiny_rejected_memo():
+    raw = [f'junk {i % 5} x{i % 7}.example.com' for i in range(200)]
+    validator = SubdomainValidator('example.com')
+    assert validator.clean(raw, max_rejected=2) == validator.clean(raw)
+    assert validator.clean(raw) == [f'x{i}.example.com' for i in range(7)]
+
+
+def test_external_sort_in_memory():
+    assert list(external_sorted_unique(['b', 'a', 'b', 'c'])) == ['a', 'b', 'c']
+    assert list(external_sorted_unique([])) == []
+
+
+def test_external_sort_merges_more_runs_than_fan_in(tmp_path, monkeypatch):
+    merged = []
+    merge_runs = utils._merge_runs
+
+    def recording_merge(paths):
+        merged.append(len(paths))
+        return merge_runs(paths)
+
+    monkeypatch.setattr(utils, '_merge_runs', recording_merge)
+    random.seed(7)
+    items = [f'h{random.randrange(2000):04d}.example.com' for _ in range(5000)]
+    result = list(external_sorted_unique(items, max_items=50, tmp_dir=str(tmp_path), fan_in=4))
+
+    assert result == sorted(set(items))
+    assert len(merged) > 2  # the runs took several passes
+    assert max(merged) <= 4
+    assert list(tmp_path.iterdir()) == []
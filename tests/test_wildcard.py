@@ -0,0 +1,65 @@
+import asyncio
+
+from subdomainfinder.resolver import NOERROR, NXDOMAIN, DNSAnswer
+from subdomainfinder.wildcard import WildcardFilter
+
+
+class WildcardResolver:
+    """Every name below ``zone`` resolves to ``addresses``; other names do not exist."""
+
+    def __init__(self, zone, addresses):
+        self.zone = zone
+        self.addresses = addresses
+        self.queries = []
+
+    async def resolve(self, name, rdtype='A'):
+        self.queries.append(name)
+        await asyncio.sleep(0)
+        if name.endswith('.' + self.zone):
+            return DNSAnswer(name, rdtype, NOERROR, list(self.addresses))
+        return DNSAnswer(name, rdtype, NXDOMAIN)
+
+
+def answer(name, *addresses):
+    return DNSAnswer(name, 'A', NOERROR, list(addresses))
+
+
+async def passed(wildcards, answers):
+    async def source():
+        for item in answers:
+            yield item
+    return [item.name async for item in wildcards.filter(source())]
+
+
+def test_filter_drops_wildcard_matches_only():
+    wildcards = WildcardFilter(WildcardResolver('example.com', ['192.0.2.9']))
+    answers = [
+        answer('junk.example.com', '192.0.2.9'),
+        answer('www.example.com', '192.0.2.1'),
+        # a subset of the wildcard answer is still the wildcard
+        answer('more.example.com', '192.0.2.9'),
+    ]
+    assert asyncio.run(passed(wildcards, answers)) == ['www.example.com']
+    assert wildcards.dropped == 2
+    assert wildcards.wildcard_zones == {'example.com': frozenset({'192.0.2.9'})}
+
+
+def test_zone_without_wildcard_keeps_everything():
+    wildcards = WildcardFilter(WildcardResolver('other.org', ['192.0.2.9']))
+    answers = [answer('www.example.com', '192.0.2.9'), answer('api.example.com', '192.0.2.1')]
+    assert asyncio.run(passed(wildcards, answers)) == ['www.example.com', 'api.example.com']
+    assert wildcards.wildcard_zones == {}
+
+
+def test_each_zone_is_probed_once():
+    resolver = WildcardResolver('example.com', ['192.0.2.9'])
+    wildcards = WildcardFilter(resolver, probes=3)
+
+    async def run():
+        return await asyncio.gather(*(wildcards.is_wildcard(answer(f'h{i}.example.com', '192.0.2.1'))
+                                      for i in range(10)))
+
+    assert asyncio.run(run()) == [False] * 10
+    assert len(resolver.queries) == 3
+    assert wildcards.probed('example.com')
+    assert not wildcards.probed('sub.example.com')
@@ -0,0 +1,139 @@
+import asyncio
+import csv
+import json
+
+import pytest
+
+from subdomainfinder.enrichment import EnrichingWriter
+from subdomainfinder.enums import OutputFormat
+from subdomainfinder.writers import (ARCHIVE_MAGIC, ArchiveWriter, AsyncResultWriter, HostResult,
+                                     ResultWriter, format_for_path, open_writer, read_archive)
+
+from .fakes import FakeResolver, FakeSession
+
+RESULTS = [
+    HostResult('a.example.com', 'crtsh', ['192.0.2.1', '192.0.2.2'], 'AWS', 'nginx'),
+    HostResult('b.example.com', 'otx'),
+    'c.example.com',
+]
+
+
+def write(path, output_format=None, **kwargs):
+    with open_writer(path, output_format, **kwargs) as writer:
+        writer.write_many(RESULTS[:2])
+        writer.write(RESULTS[2])
+    return writer
+
+
+def test_format_for_path():
+    assert format_for_path('out.NDJSON') is OutputFormat.NDJSON
+    assert format_for_path('out.sfa') is OutputFormat.ARCHIVE
+    assert format_for_path('out.log') is OutputFormat.TEXT
+    assert format_for_path('out.log', OutputFormat.CSV) is OutputFormat.CSV
+
+
+def test_text_ndjson_and_csv(tmp_path):
+    assert write(tmp_path / 'out.txt').count == 3
+    assert (tmp_path / 'out.txt').read_text().split() == ['a.example.com', 'b.example.com', 'c.example.com']
+
+    write(tmp_path / 'out.ndjson')
+    rows = [json.loads(line) for line in (tmp_path / 'out.ndjson').read_text().splitlines()]
+    assert rows[0] == {'host': 'a.example.com', 'source': 'crtsh', 'ips': ['192.0.2.1', '192.0.2.2'],
+                       'cloud': 'AWS', 'server': 'nginx'}
+    assert rows[2] == {'host': 'c.example.com', 'source': None, 'ips': [], 'cloud': None, 'server': None}
+
+    write(tmp_path / 'out.csv')
+    with open(tmp_path / 'out.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['host', 'source', 'ips', 'cloud', 'server']
+    assert rows[1] == ['a.example.com', 'crtsh', '192.0.2.1 192.0.2.2', 'AWS', 'nginx']
+    assert rows[3] == ['c.example.com', '', '', '', '']
+
+
+def test_json_document_is_valid_once_closed(tmp_path):
+    write(tmp_path / 'out.json')
+    assert json.loads((tmp_path / 'out.json').read_text()) == {
+        'subdomains': ['a.example.com', 'b.example.com', 'c.example.com'], 'count': 3}
+    open_writer(tmp_path / 'empty.json').close()
+    assert json.loads((tmp_path / 'empty.json').read_text()) == {'subdomains': [], 'count': 0}
+
+
+def test_archive_round_trip_across_blocks(tmp_path):
+    path = tmp_path / 'out.sfa'
+    results = [HostResult(f'h{i}.example.com', 'crtsh', [f'192.0.2.{i % 256}'] if i % 3 else [],
+                          'GCP' if i % 2 else None) for i in range(25)]
+    with ArchiveWriter(path, block_rows=10) as writer:
+        writer.write_many(results)
+    assert list(read_archive(path)) == results
+
+
+def test_archive_reader_skips_a_truncated_block(tmp_path):
+    path = tmp_path / 'out.sfa'
+    with ArchiveWriter(path, block_rows=10) as writer:
+        writer.write_many(HostResult(f'h{i}.example.com') for i in range(15))
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    assert [r.host for r in read_archive(path)] == [f'h{i}.example.com' for i in range(10)]
+    path.write_bytes(b'not an archive')
+    with pytest.raises(ValueError):
+        list(read_archive(path))
+    assert data.startswith(ARCHIVE_MAGIC)
+
+
+def test_result_writer_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ResultWriter(tmp_path / 'out.txt')
+
+
+def test_async_writer_batches_and_closes(tmp_path):
+    writer = open_writer(tmp_path / 'out.txt')
+
+    async def feed():
+        async with AsyncResultWriter(writer, batch_size=4) as stream:
+            for i in range(10):
+                await stream.write(f'h{i}.example.com')
+
+    asyncio.run(feed())
+    assert writer._file.closed
+    assert (tmp_path / 'out.txt').read_text().split() == [f'h{i}.example.com' for i in range(10)]
+
+
+class CountingResolver(FakeResolver):
+    def __init__(self, records):
+        super().__init__(records)
+        self.in_flight = self.peak = 0
+
+    async def resolve(self, name, rdtype='A'):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return await super().resolve(name, rdtype)
+        finally:
+            self.in_flight -= 1
+
+
+def test_enriching_writer_fills_in_the_verdicts(tmp_path):
+    hosts = [f'h{i}.example.com' for i in range(6)]
+    resolver = CountingResolver({host: ['192.0.2.1'] for host in hosts[:3]})
+    session = FakeSession({f'https://{host}': (0.01, 200, {'Server': 'nginx'}) for host in hosts[:2]})
+    writer = open_writer(tmp_path / 'out.ndjson')
+
+    async def feed():
+        stream = EnrichingWriter(AsyncResultWriter(writer), concurrency=2)
+        await stream.session.close()
+        stream.resolver.close()
+        stream.resolver, stream.session = resolver, session
+        async with stream:
+            for host in hosts:
+                await stream.write(HostResult(host, 'crtsh'))
+
+    asyncio.run(feed())
+    assert resolver.peak == 2
+    rows = {row['host']: row for row in map(json.loads, (tmp_path / 'out.ndjson').read_text().splitlines())}
+    assert set(rows) == set(hosts)
+    assert rows['h0.example.com']['ips'] == ['192.0.2.1']
+    assert rows['h0.example.com']['server'] == 'nginx'
+    assert rows['h0.example.com']['source'] == 'crtsh'
+    assert rows['h2.example.com']['server'] == 'unreachable'
+    assert rows['h5.example.com']['ips'] == []
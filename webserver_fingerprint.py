@@ -1,13 +1,11 @@
 # webserver_fingerprint.py
 import requests
 
+from subdomainfinder.enrichment import fingerprint_headers
+
 def detect_webserver(subdomain):
     url_http = f"http://{subdomain}"
     url_https = f"https://{subdomain}"
-    
-    headers = {}
-    server = "unknown"
-    cdn = "no"
 
     try:
         r = requests.get(url_https, timeout=2, allow_redirects=True)
@@ -17,22 +15,7 @@ def detect_webserver(subdomain):
         except:
             return {"server": "unreachable", "cdn": "-"}
 
-    # Lấy Header nếu có
-    headers = r.headers
-
-    # Detect server header
-    if "Server" in headers:
-        server = headers["Server"].lower()
-
-    # Detect CDN
-    if "CF-Cache-Status" in headers or "CF-Ray" in headers:
-        cdn = "Cloudflare"
-    elif "X-Akamai-Transformed" in headers:
-        cdn = "Akamai"
-    elif "X-CDN" in headers:
-        cdn = headers["X-CDN"]
-
-    return {
-        "server": server,
-        "cdn": cdn
-    }
+    # Detect server header & CDN
+    # (subdomainfinder.enrichment.enrich_many does this for many hosts with
+    # one pooled HEAD request each)
+    return fingerprint_headers(r.headers)